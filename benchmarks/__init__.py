@@ -0,0 +1,3 @@
+"""
+Benchmarks de performance (exécutables sans Redshift ni Gemini)
+"""
@@ -0,0 +1,179 @@
+"""
+Benchmark hors ligne du pipeline de génération, étape par étape
+Schéma de démonstration en SQLite mémoire + modèle factice (LLM_PROVIDER=fake) :
+aucune connexion réseau, résultats reproductibles d'une exécution à l'autre
+
+Étapes : lecture du cache, chargement du schéma (froid / en cache),
+construction de la chaîne (neuve / pool), appel LLM, post-traitement,
+puis generate_sql de bout en bout (miss / hit) ; p50/p95/p99 par étape
+
+Usage : python -m benchmarks.bench_pipeline [--iterations 200]
+        [--llm-iterations 20] [--latency 0.05] [--json results.json]
+"""
+
+import os
+
+# Identifiants factices : aucune connexion n'est ouverte vers Redshift ou Gemini
+for _name in ("REDSHIFT_USER", "REDSHIFT_PASSWORD", "REDSHIFT_DB", "GOOGLE_API_KEY"):
+    os.environ.setdefault(_name, "bench")
+os.environ.setdefault("REDSHIFT_HOST", "10.255.255.1")
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+import argparse  # noqa: E402
+import json  # noqa: E402
+import statistics  # noqa: E402
+import time  # noqa: E402
+from typing import Callable, Dict, List  # noqa: E402
+from benchmarks.demo_schema import SCHEMA, create_demo_engine  # noqa: E402
+from sqlalchemy import inspect  # noqa: E402
+from infrastructure import fingerprint, generation  # noqa: E402
+from infrastructure.cache import CacheManager  # noqa: E402
+from infrastructure.fingerprint import GenerationFingerprint  # noqa: E402
+from infrastructure.llm import (  # noqa: E402
+    create_sql_query_chain_only,
+    gemini_model_params,
+    get_gemini_llm,
+)
+from infrastructure.llm_pool import ChainPool  # noqa: E402
+from infrastructure.rate_limit import LocalRateLimiter  # noqa: E402
+from infrastructure.sample_rows import SampleRowStore  # noqa: E402
+from infrastructure.schema_cache import SchemaCache  # noqa: E402
+from infrastructure.schema_index import TableSelector  # noqa: E402
+from infrastructure.settings import settings  # noqa: E402
+from infrastructure.sql_templates import DateTemplateCache  # noqa: E402
+
+QUESTION = "2025年5月1日から5月7日までの都道府県別の成約台数と掲載台数を集計して。"
+
+
+def _demo_schema_checksum(engine, schema: str) -> str:
+    """
+    Somme du schéma de démonstration : SQLite n'a pas d'information_schema,
+    les colonnes sont lues par l'inspecteur SQLAlchemy
+    """
+    inspector = inspect(engine)
+    return fingerprint._digest(
+        [
+            [table, column["name"], str(column["type"])]
+            for table in sorted(inspector.get_table_names(schema=schema))
+            for column in inspector.get_columns(table, schema=schema)
+        ]
+    )
+
+
+def _measure(fn: Callable[[int], None], iterations: int) -> List[float]:
+    """Durées (s) de fn(i) ; une exécution de chauffe non comptée"""
+    fn(-1)
+    durations = []
+    for i in range(iterations):
+        start = time.perf_counter()
+        fn(i)
+        durations.append(time.perf_counter() - start)
+    return durations
+
+
+def _percentiles(durations: List[float]) -> Dict[str, float]:
+    """p50/p95/p99 exacts en millisecondes"""
+    cuts = statistics.quantiles(durations, n=100, method="inclusive")
+    return {
+        "count": len(durations),
+        "p50_ms": cuts[49] * 1000,
+        "p95_ms": cuts[94] * 1000,
+        "p99_ms": cuts[98] * 1000,
+    }
+
+
+def run_suite(
+    iterations: int, llm_iterations: int, latency: float
+) -> Dict[str, Dict[str, float]]:
+    """Exécute toutes les étapes et retourne leurs percentiles"""
+    settings.llm_provider = "fake"
+    settings.fake_llm_latency = latency
+    settings.fake_llm_token_latency = 0.0
+
+    engine = create_demo_engine()
+    params = gemini_model_params()
+    tables = TableSelector(settings.schema_top_k).select(engine, SCHEMA, QUESTION)
+    inputs = {"question": QUESTION, "table_names_to_use": tables}
+
+    cache = CacheManager(sweep_interval=0)
+    questions = [f"{QUESTION} ({i})" for i in range(1000)]
+    for question in questions:
+        cache.cache_sql_result(question, "SELECT 1;", "bench")
+
+    schema_cache = SchemaCache(ttl=3600, sample_store=SampleRowStore(3))
+    db = schema_cache.get_db(engine, SCHEMA)
+    pool = ChainPool()
+    chain = pool.chain(db, params)
+    raw = chain.invoke(inputs)
+
+    # generate_sql branché sur le schéma de démonstration et un cache neuf
+    generation.connect_to_redshift = lambda: engine
+    generation.cache_manager = CacheManager(sweep_interval=0)
+    generation.date_templates = DateTemplateCache(generation.cache_manager)
+    generation.sql_fingerprint = GenerationFingerprint(lambda: engine, SCHEMA, ttl=3600)
+    # Somme du schéma de démonstration calculée d'avance : les mesures se font
+    # dans son espace de noms, pas dans celui du schéma inconnu
+    fingerprint.schema_checksum = _demo_schema_checksum
+    if generation.sql_fingerprint.refresh() is None:
+        raise RuntimeError("Demo schema checksum failed")
+    generation.llm_rate_limiter = LocalRateLimiter(0, 60)
+    generation.chain_pool = pool
+
+    def _cold_schema(i):
+        fresh = SchemaCache(ttl=3600, sample_store=SampleRowStore(3))
+        fresh.get_db(engine, SCHEMA).get_table_info(tables)
+
+    stages = {
+        "cache_lookup": (
+            lambda i: cache.get_cached_sql_result(questions[i % 1000], "bench"),
+            iterations,
+        ),
+        "schema_load_cold": (_cold_schema, iterations),
+        "schema_load_cached": (
+            lambda i: schema_cache.get_db(engine, SCHEMA).get_table_info(tables),
+            iterations,
+        ),
+        "chain_build_new": (
+            lambda i: create_sql_query_chain_only(get_gemini_llm(params), db),
+            iterations,
+        ),
+        "chain_build_pooled": (lambda i: pool.chain(db, params), iterations),
+        "llm_call": (lambda i: chain.invoke(inputs), llm_iterations),
+        "post_process": (lambda i: generation.clean_sql(raw), iterations),
+        "end_to_end_miss": (
+            lambda i: generation.generate_sql(f"成約台数を集計して（ケース{i + 1}）"),
+            llm_iterations,
+        ),
+        "end_to_end_hit": (lambda i: generation.generate_sql(QUESTION), iterations),
+    }
+    return {
+        name: _percentiles(_measure(fn, count)) for name, (fn, count) in stages.items()
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--llm-iterations", type=int, default=20)
+    parser.add_argument(
+        "--latency", type=float, default=0.05, help="latence du modèle factice (s)"
+    )
+    parser.add_argument("--json", help="écrit les résultats dans ce fichier")
+    args = parser.parse_args()
+
+    results = run_suite(args.iterations, args.llm_iterations, args.latency)
+
+    print(f"generation pipeline (fake LLM latency {args.latency * 1000:.0f} ms)")
+    print(f"  {'stage':<22} {'n':>5} {'p50 ms':>10} {'p95 ms':>10} {'p99 ms':>10}")
+    for name, stats in results.items():
+        print(
+            f"  {name:<22} {stats['count']:>5} {stats['p50_ms']:>10.3f}"
+            f" {stats['p95_ms']:>10.3f} {stats['p99_ms']:>10.3f}"
+        )
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
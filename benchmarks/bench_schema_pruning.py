@@ -0,0 +1,122 @@
+"""
+Benchmark de l'élagage du schéma : taille du prompt et latence, avant
+(toutes les tables) / après (top-k tables de l'index BM25)
+Schéma de démonstration en SQLite mémoire ; --live mesure aussi l'appel Gemini
+
+Usage : python -m benchmarks.bench_schema_pruning [--top-k 5] [--live]
+"""
+
+import os
+
+# Identifiants factices : aucune connexion n'est ouverte vers Redshift
+# (--live utilise la vraie clé GOOGLE_API_KEY si elle est définie)
+for _name in ("REDSHIFT_USER", "REDSHIFT_PASSWORD", "REDSHIFT_DB", "GOOGLE_API_KEY"):
+    os.environ.setdefault(_name, "bench")
+os.environ.setdefault("REDSHIFT_HOST", "10.255.255.1")
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+import argparse  # noqa: E402
+import statistics  # noqa: E402
+import time  # noqa: E402
+from langchain.chains import create_sql_query_chain  # noqa: E402
+from langchain_core.language_models.fake_chat_models import (  # noqa: E402
+    FakeListChatModel,
+)
+from langchain_core.runnables import RunnableSequence  # noqa: E402
+from benchmarks.demo_schema import SCHEMA, create_demo_engine  # noqa: E402
+from infrastructure.sample_rows import SampleRowStore  # noqa: E402
+from infrastructure.schema_cache import SchemaCache  # noqa: E402
+from infrastructure.schema_index import TableSelector  # noqa: E402
+
+QUESTIONS = [
+    "2025年5月1日から5月7日までの都道府県別の成約台数と掲載台数を集計して。",
+    "2025年5月1日時点で北海道の市区町村ごとのクライアント数をラベル（市・区・町・村・不明）別に集計して。",
+    "2025年4月の見積件数と来店予約件数をクライアント別に出して。",
+    "先月の電話の問い合わせ件数が多い車種トップ10は？",
+    "メーカー別の平均価格と平均走行距離を出して。",
+]
+
+
+def _render_prompt(db, question, tables) -> str:
+    """Prompt réellement envoyé par create_sql_query_chain (sans appel LLM)"""
+    chain = create_sql_query_chain(FakeListChatModel(responses=[""]), db)
+    inputs = {"question": question}
+    if tables:
+        inputs["table_names_to_use"] = tables
+    # Étapes avant le LLM : table_info, filtrage des clés, prompt
+    return RunnableSequence(*chain.steps[:3]).invoke(inputs).to_string()
+
+
+def _cold_table_info_ms(engine, tables) -> float:
+    """Latence de table_info sans cache (réflexion + lignes d'exemple)"""
+    db = SchemaCache(ttl=600, sample_store=SampleRowStore(3)).get_db(engine, SCHEMA)
+    start = time.perf_counter()
+    db.get_table_info(tables)
+    return (time.perf_counter() - start) * 1000
+
+
+def _live_latency_ms(engine, question, tables) -> float:
+    """Durée d'un appel Gemini réel pour le prompt complet ou élagué"""
+    from infrastructure.llm import get_gemini_llm
+
+    db = SchemaCache(ttl=600, sample_store=SampleRowStore(3)).get_db(engine, SCHEMA)
+    chain = create_sql_query_chain(get_gemini_llm(), db)
+    inputs = {"question": question}
+    if tables:
+        inputs["table_names_to_use"] = tables
+    start = time.perf_counter()
+    chain.invoke(inputs)
+    return (time.perf_counter() - start) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--live", action="store_true", help="appelle Gemini")
+    args = parser.parse_args()
+
+    engine = create_demo_engine()
+    db = SchemaCache(ttl=600, sample_store=SampleRowStore(3)).get_db(engine, SCHEMA)
+    selector = TableSelector(args.top_k)
+
+    full_sizes, pruned_sizes, select_ms, cold_full, cold_pruned = [], [], [], [], []
+    live_full, live_pruned = [], []
+    for question in QUESTIONS:
+        start = time.perf_counter()
+        tables = selector.select(engine, SCHEMA, question)
+        select_ms.append((time.perf_counter() - start) * 1000)
+
+        full_sizes.append(len(_render_prompt(db, question, None)))
+        pruned_sizes.append(len(_render_prompt(db, question, tables)))
+        cold_full.append(_cold_table_info_ms(engine, None))
+        cold_pruned.append(_cold_table_info_ms(engine, tables))
+        if args.live:
+            live_full.append(_live_latency_ms(engine, question, None))
+            live_pruned.append(_live_latency_ms(engine, question, tables))
+        print(f"{question[:30]:<32} -> {tables}")
+
+    def _row(label, before, after, unit):
+        ratio = statistics.mean(after) / statistics.mean(before)
+        print(
+            f"  {label:<26} {statistics.mean(before):10.1f} {statistics.mean(after):10.1f}"
+            f" {unit:<6} ({ratio:.0%})"
+        )
+
+    print(f"\nschema pruning (top_k={args.top_k}, {len(QUESTIONS)} questions)")
+    print(f"  {'':<26} {'before':>10} {'after':>10}")
+    _row("prompt size", full_sizes, pruned_sizes, "chars")
+    # Approximation : ~4 caractères par token pour la DDL (ASCII)
+    _row(
+        "prompt tokens (approx.)",
+        [s / 4 for s in full_sizes],
+        [s / 4 for s in pruned_sizes],
+        "tok",
+    )
+    _row("cold table_info", cold_full, cold_pruned, "ms")
+    if args.live:
+        _row("gemini latency", live_full, live_pruned, "ms")
+    print(f"  table selection: {statistics.median(select_ms[1:] or select_ms):.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+Benchmark du démarrage à froid : temps d'import des modules chargés par
+streamlit_app.py, Redshift injoignable (adresse non routable)
+
+Usage : python -m benchmarks.bench_startup [--runs 5]
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+# Modules importés avant le premier rendu de la page
+STARTUP_IMPORTS = (
+    "import infrastructure.database, infrastructure.generation, "
+    "ui.components.main_content, ui.components.sidebar"
+)
+
+# Adresse non routable : toute tentative de connexion attend le timeout
+UNREACHABLE_ENV = {
+    "REDSHIFT_USER": "bench",
+    "REDSHIFT_PASSWORD": "bench",
+    "REDSHIFT_HOST": "10.255.255.1",
+    "REDSHIFT_DB": "bench",
+    "GOOGLE_API_KEY": "bench",
+}
+
+
+def measure_startup(runs: int) -> list:
+    """Durées (s) d'import dans un interpréteur neuf, une par exécution"""
+    env = {**os.environ, **UNREACHABLE_ENV}
+    durations = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(
+            [sys.executable, "-c", STARTUP_IMPORTS],
+            env=env,
+            check=True,
+            capture_output=True,
+            timeout=120,
+        )
+        durations.append(time.perf_counter() - start)
+    return durations
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    durations = measure_startup(args.runs)
+    print(f"startup imports ({args.runs} runs, Redshift unreachable)")
+    print(f"  median: {statistics.median(durations) * 1000:8.1f} ms")
+    print(f"  max:    {max(durations) * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
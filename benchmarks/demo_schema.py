@@ -0,0 +1,71 @@
+"""
+Schéma de démonstration usedcar_dwh en SQLite mémoire pour les benchmarks
+Les 9 tables métier du prompt + des tables annexes, comme dans l'entrepôt réel
+"""
+
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import StaticPool
+
+SCHEMA = "usedcar_dwh"
+
+BUSINESS_TABLES = {
+    "sold_cars": "car_id, client_id, sold_date, price, maker_name, car_name, "
+    "model_year, mileage, prefecture_name, city_name",
+    "display_cars": "car_id, client_id, display_date, price, maker_name, car_name, "
+    "model_year, mileage, prefecture_name, city_name",
+    "clients": "client_id, client_name, prefecture_name, city_name, label, "
+    "contract_start_date, contract_end_date",
+    "estimates": "estimate_id, client_id, car_id, estimate_date, price, "
+    "prefecture_name",
+    "calls": "call_id, client_id, car_id, call_date, duration_sec, prefecture_name",
+    "reservations": "reservation_id, client_id, car_id, reservation_date, "
+    "visit_date, prefecture_name",
+    "car_effects": "car_id, effect_date, page_views, favorites, inquiries",
+    "client_effects": "client_id, effect_date, page_views, inquiries, calls",
+    "salesforce_account": "account_id, client_id, account_name, owner_name, "
+    "contract_type, updated_at",
+}
+
+# Tables présentes dans l'entrepôt mais hors du périmètre du prompt
+AUXILIARY_TABLES = {
+    f"{prefix}_{name}": "id, code, name, description, created_at, updated_at, "
+    "created_by, updated_by, status, sort_order"
+    for prefix in ("mst", "log", "tmp", "stg")
+    for name in (
+        "color",
+        "grade",
+        "option",
+        "equipment",
+        "staff",
+        "campaign",
+        "invoice",
+    )
+}
+
+
+def create_demo_engine() -> Engine:
+    """Moteur SQLite mémoire avec le schéma usedcar_dwh et 3 lignes par table"""
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+
+    @event.listens_for(engine, "connect")
+    def _attach(dbapi_connection, _):
+        dbapi_connection.execute(f"ATTACH DATABASE ':memory:' AS {SCHEMA}")
+
+    with engine.begin() as conn:
+        for table, columns in {**BUSINESS_TABLES, **AUXILIARY_TABLES}.items():
+            names = [c.strip() for c in columns.split(",")]
+            conn.execute(
+                text(
+                    f"CREATE TABLE {SCHEMA}.{table} "
+                    f"({', '.join(f'{n} TEXT' for n in names)})"
+                )
+            )
+            for i in range(3):
+                values = ", ".join(f"'{n}_{i}'" for n in names)
+                conn.execute(text(f"INSERT INTO {SCHEMA}.{table} VALUES ({values})"))
+    return engine
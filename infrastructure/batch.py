@@ -0,0 +1,139 @@
+"""
+Génération SQL par lot (listes de 50 à 200 questions)
+- questions dédoublonnées par leur forme canonique (même clé de cache)
+- génération concurrente bornée (pool de threads), quota LLM respecté en
+  attendant les jetons d'un seau dédié, plafonné à une part du quota global
+  (le reste et le seau de la session restent aux questions posées)
+- résultats produits au fil de l'eau pour la progression, export CSV
+"""
+
+import csv
+import io
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from infrastructure.cache import cache_manager
+from infrastructure.generation import generate_sql
+from infrastructure.settings import settings
+from infrastructure.logging import logger
+
+CSV_COLUMNS = ["question", "sql", "from_cache", "error"]
+
+
+def parse_questions(text: str, is_csv: bool = False) -> List[str]:
+    """
+    Une question par ligne ; en CSV, la colonne « question » si l'en-tête
+    existe, sinon la première colonne
+    """
+    if not is_csv:
+        return [line.strip() for line in text.splitlines() if line.strip()]
+
+    rows = [row for row in csv.reader(io.StringIO(text)) if row]
+    if not rows:
+        return []
+    header = [cell.strip().lower() for cell in rows[0]]
+    column = 0
+    if "question" in header:
+        column = header.index("question")
+        rows = rows[1:]
+    return [
+        row[column].strip() for row in rows if len(row) > column and row[column].strip()
+    ]
+
+
+def dedupe_questions(questions: List[str]) -> Tuple[List[str], List[int]]:
+    """
+    Retourne (questions uniques, index de la question unique pour chaque
+    question d'origine) ; deux variantes canoniques ne sont générées qu'une fois
+    """
+    unique: List[str] = []
+    positions: Dict[str, int] = {}
+    mapping: List[int] = []
+    for question in questions:
+        key = cache_manager.canonicalize(question)
+        if key not in positions:
+            positions[key] = len(unique)
+            unique.append(question)
+        mapping.append(positions[key])
+    return unique, mapping
+
+
+def _generate_row(
+    question: str, llm_config: Optional[Dict[str, Any]], session_id: Optional[str]
+) -> Dict[str, Any]:
+    """Une ligne de résultat ; l'erreur d'une question n'arrête pas le lot"""
+    try:
+        # Hors du chemin interactif : le lot ne consomme pas le seau de la
+        # session (réservé à ses questions) mais attend les jetons du seau des
+        # lots, plafonné à une part du quota global
+        sql, from_cache = generate_sql(
+            question, llm_config, max_wait=settings.batch_max_wait, batch=True
+        )
+        return {"question": question, "sql": sql, "from_cache": from_cache, "error": ""}
+    except Exception as e:
+        logger.warning(
+            "Batch question failed",
+            question=question[:50],
+            session=session_id,
+            error=str(e),
+        )
+        return {"question": question, "sql": "", "from_cache": False, "error": str(e)}
+
+
+def iter_batch(
+    questions: List[str],
+    llm_config: Optional[Dict[str, Any]] = None,
+    session_id: Optional[str] = None,
+    max_workers: Optional[int] = None,
+) -> Iterator[Tuple[int, Dict[str, Any]]]:
+    """
+    Génère les questions uniques en parallèle et produit (index, résultat)
+    dans l'ordre d'achèvement ; l'index se rapporte à la liste dédoublonnée
+    """
+    max_workers = max_workers or settings.batch_max_workers
+    logger.info("Batch started", questions=len(questions), workers=max_workers)
+    executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="batch")
+    try:
+        futures = {
+            executor.submit(_generate_row, question, llm_config, session_id): index
+            for index, question in enumerate(questions)
+        }
+        for future in as_completed(futures):
+            yield futures[future], future.result()
+    finally:
+        # Lot abandonné (rerun Streamlit) : les questions en file ne partent pas
+        # au LLM et l'appelant n'attend pas les générations en cours
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def run_batch(
+    questions: List[str],
+    llm_config: Optional[Dict[str, Any]] = None,
+    session_id: Optional[str] = None,
+    max_workers: Optional[int] = None,
+) -> List[Dict[str, Any]]:
+    """API bloquante : un résultat par question d'origine, dans l'ordre d'entrée"""
+    unique, mapping = dedupe_questions(questions)
+    results: List[Optional[Dict[str, Any]]] = [None] * len(unique)
+    for index, row in iter_batch(unique, llm_config, session_id, max_workers):
+        results[index] = row
+    return expand_results(questions, mapping, results)
+
+
+def expand_results(
+    questions: List[str], mapping: List[int], results: List[Dict[str, Any]]
+) -> List[Dict[str, Any]]:
+    """Remet un résultat en face de chaque question d'origine (doublons inclus)"""
+    return [
+        {**results[mapping[i]], "question": question}
+        for i, question in enumerate(questions)
+    ]
+
+
+def results_to_csv(results: List[Dict[str, Any]]) -> str:
+    """Export CSV (UTF-8 avec BOM pour l'ouverture directe dans Excel)"""
+    buffer = io.StringIO()
+    buffer.write("\ufeff")
+    writer = csv.DictWriter(buffer, fieldnames=CSV_COLUMNS)
+    writer.writeheader()
+    writer.writerows(results)
+    return buffer.getvalue()
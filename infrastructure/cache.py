@@ -1,19 +1,219 @@
 """
 Cache manager pour optimiser les performances (Version mémoire gratuite)
+Cache borné avec éviction LRU (nombre d'entrées et budget mémoire),
+partitionné en segments verrouillés indépendamment (lock striping)
+Les questions sont canonicalisées avant le calcul de la clé SQL
+Un tier L2 optionnel (Redis ou SQLite) partage le cache entre processus et réplicas
+Un thread de fond purge activement les entrées expirées (tas min des expires_at)
+Compteurs et histogrammes de latence exposés via stats() et les logs structurés
 """
 
 import hashlib
+import heapq
+import sys
+import threading
 import time
-from typing import Optional, Any, Dict
+import weakref
+from collections import OrderedDict
+from typing import Optional, Any, Dict, List, Tuple
+from infrastructure.cache_backends import CacheBackend, create_cache_backend
+from infrastructure.canonical import Canonicalizer, canonicalize_question
+from infrastructure.metrics import LatencyHistogram
 from infrastructure.settings import settings
 from infrastructure.logging import logger
 
 
+def _sizeof(value: Any) -> int:
+    """Estime la taille mémoire (en octets) d'une valeur mise en cache"""
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(_sizeof(k) + _sizeof(v) for k, v in value.items())
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        size += sum(_sizeof(item) for item in value)
+    return size
+
+
+class _CacheShard:
+    """Segment du cache : son propre dict LRU, son verrou et son budget"""
+
+    def __init__(self, max_entries: int, max_bytes: int):
+        self.lock = threading.Lock()
+        # OrderedDict : l'ordre d'insertion sert d'ordre LRU (get/set en O(1))
+        self.entries: "OrderedDict[str, Dict]" = OrderedDict()
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self.evictions = 0
+        self.hits = 0
+        self.misses = 0
+        # Hits obtenus grâce à la canonicalisation (variante de question inédite)
+        self.canonical_hits = 0
+        # Hits servis par le tier L2 (promus ensuite en L1)
+        self.backend_hits = 0
+        # Tas min (expires_at, clé) ; les doublons périmés sont ignorés au pop
+        self.expiry_heap: List[Tuple[float, str]] = []
+        self.expired_reclaimed = 0
+        # Entrées expirées découvertes à la lecture (purge paresseuse)
+        self.expirations = 0
+
+    def delete(self, key: str) -> None:
+        """Supprime une entrée (verrou déjà pris)"""
+        cache_item = self.entries.pop(key, None)
+        if cache_item is not None:
+            self.current_bytes -= cache_item["size"]
+
+    def evict(self) -> None:
+        """Évince les entrées LRU jusqu'à respecter les limites (verrou déjà pris)"""
+        while self.entries and (
+            (self.max_entries and len(self.entries) > self.max_entries)
+            or (self.max_bytes and self.current_bytes > self.max_bytes)
+        ):
+            _, cache_item = self.entries.popitem(last=False)
+            self.current_bytes -= cache_item["size"]
+            self.evictions += 1
+
+    def sweep(self, now: float, budget: int) -> int:
+        """Retire au plus budget entrées expirées (verrou déjà pris)"""
+        heap = self.expiry_heap
+        # Clés écrasées ou évincées : le tas est reconstruit s'il enfle trop
+        if len(heap) > 2 * len(self.entries) + 64:
+            heap[:] = [(item["expires_at"], key) for key, item in self.entries.items()]
+            heapq.heapify(heap)
+
+        removed = 0
+        while heap and budget > 0 and heap[0][0] <= now:
+            expires_at, key = heapq.heappop(heap)
+            budget -= 1
+            cache_item = self.entries.get(key)
+            if cache_item is not None and cache_item["expires_at"] == expires_at:
+                self.delete(key)
+                removed += 1
+        self.expired_reclaimed += removed
+        return removed
+
+
 class CacheManager:
-    def __init__(self):
+    def __init__(
+        self,
+        max_entries: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+        shards: Optional[int] = None,
+        canonicalizer: Optional[Canonicalizer] = None,
+        backend: Optional[CacheBackend] = None,
+        sweep_interval: Optional[float] = None,
+    ):
         # Cache mémoire gratuit au lieu de Redis
-        self.memory_cache: Dict[str, Dict] = {}
-        logger.info("In-memory cache initialized (FREE)")
+        # 0 = pas de limite
+        self.max_entries = (
+            settings.cache_max_entries if max_entries is None else max_entries
+        )
+        self.max_bytes = settings.cache_max_bytes if max_bytes is None else max_bytes
+        shard_count = max(1, settings.cache_shards if shards is None else shards)
+        self.canonicalize = canonicalizer or canonicalize_question
+        # Tier L2 optionnel sous le cache mémoire
+        self.backend = backend
+        self.get_latency = LatencyHistogram()
+        self.set_latency = LatencyHistogram()
+
+        # Chaque segment reçoit une part égale des limites globales
+        shard_entries = -(-self.max_entries // shard_count) if self.max_entries else 0
+        shard_bytes = -(-self.max_bytes // shard_count) if self.max_bytes else 0
+        self._shards: List[_CacheShard] = [
+            _CacheShard(shard_entries, shard_bytes) for _ in range(shard_count)
+        ]
+        logger.info(
+            "In-memory cache initialized (FREE)",
+            max_entries=self.max_entries,
+            max_bytes=self.max_bytes,
+            shards=shard_count,
+            backend=type(backend).__name__ if backend else None,
+        )
+
+        # Purge active des entrées expirées (0 = purge paresseuse uniquement)
+        self._stop_sweeper = threading.Event()
+        interval = (
+            settings.cache_sweep_interval if sweep_interval is None else sweep_interval
+        )
+        if interval > 0:
+            threading.Thread(
+                target=_sweep_loop,
+                args=(weakref.ref(self), interval, self._stop_sweeper),
+                name="cache-expiry-sweeper",
+                daemon=True,
+            ).start()
+
+    def __len__(self) -> int:
+        return sum(len(shard.entries) for shard in self._shards)
+
+    @property
+    def current_bytes(self) -> int:
+        """Taille totale estimée des entrées en cache"""
+        return sum(shard.current_bytes for shard in self._shards)
+
+    @property
+    def evictions(self) -> int:
+        """Nombre total d'entrées évincées par la politique LRU"""
+        return sum(shard.evictions for shard in self._shards)
+
+    def stats(self) -> Dict[str, Any]:
+        """Compteurs agrégés du cache (hit rate, expirations, latences)"""
+        hits = sum(shard.hits for shard in self._shards)
+        misses = sum(shard.misses for shard in self._shards)
+        lookups = hits + misses
+        return {
+            "entries": len(self),
+            "bytes": self.current_bytes,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "evictions": self.evictions,
+            "expirations": sum(shard.expirations for shard in self._shards),
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": hits / lookups if lookups else 0.0,
+            "canonical_hits": sum(shard.canonical_hits for shard in self._shards),
+            "backend_hits": sum(shard.backend_hits for shard in self._shards),
+            "expired_reclaimed": sum(shard.expired_reclaimed for shard in self._shards),
+            "get_latency": self.get_latency.snapshot(),
+            "set_latency": self.set_latency.snapshot(),
+        }
+
+    def log_stats(self) -> None:
+        """Émet les statistiques du cache dans les logs structurés"""
+        stats = self.stats()
+        get_latency = stats.pop("get_latency")
+        set_latency = stats.pop("set_latency")
+        logger.info(
+            "Cache stats",
+            **stats,
+            get_p50_ms=get_latency["p50_ms"],
+            get_p99_ms=get_latency["p99_ms"],
+            set_p50_ms=set_latency["p50_ms"],
+            set_p99_ms=set_latency["p99_ms"],
+        )
+
+    def sweep_expired(self, budget: Optional[int] = None) -> int:
+        """
+        Purge incrémentale : au plus budget entrées par segment,
+        un segment verrouillé à la fois pour ne jamais bloquer les requêtes
+        """
+        budget = settings.cache_sweep_batch if budget is None else budget
+        removed = 0
+        for shard in self._shards:
+            with shard.lock:
+                removed += shard.sweep(time.time(), budget)
+        if removed:
+            logger.debug("Expired cache entries reclaimed", removed=removed)
+        return removed
+
+    def close(self) -> None:
+        """Arrête le thread de purge et libère le tier L2"""
+        self._stop_sweeper.set()
+        if self.backend is not None:
+            self.backend.close()
+
+    def _shard_for(self, key: str) -> _CacheShard:
+        """Sélectionne le segment responsable d'une clé"""
+        return self._shards[hash(key) % len(self._shards)]
 
     def _is_expired(self, cache_item: Dict) -> bool:
         """Vérifie si l'item de cache a expiré"""
@@ -24,35 +224,182 @@ class CacheManager:
         hash_object = hashlib.md5(data.encode())
         return f"{prefix}:{hash_object.hexdigest()}"
 
+    def _get(self, key: str, variant: Optional[str] = None) -> Optional[Any]:
+        """Lecture chronométrée ; variant identifie la forme brute de la question"""
+        start = time.perf_counter()
+        value = self._lookup(key, variant)
+        self.get_latency.record(time.perf_counter() - start)
+        return value
+
+    def _lookup(self, key: str, variant: Optional[str]) -> Optional[Any]:
+        """Lecture L1 puis L2"""
+        shard = self._shard_for(key)
+        with shard.lock:
+            cache_item = shard.entries.get(key)
+            if cache_item is not None:
+                if not self._is_expired(cache_item):
+                    # Marque l'entrée comme la plus récemment utilisée
+                    shard.entries.move_to_end(key)
+                    shard.hits += 1
+                    variants = cache_item.get("variants")
+                    if variant is not None and variants is not None:
+                        if variant not in variants:
+                            variants.add(variant)
+                            shard.canonical_hits += 1
+                    return cache_item["value"]
+                else:
+                    # Supprime l'item expiré
+                    shard.delete(key)
+                    shard.expirations += 1
+
+        # Miss L1 : tier persistant (hors verrou, I/O possible)
+        if self.backend is not None:
+            stored = self.backend.get(key)
+            if stored is not None:
+                value, expires_at = stored
+                # Promotion en L1 avec le TTL restant
+                self._store_local(key, value, expires_at, variant)
+                with shard.lock:
+                    shard.hits += 1
+                    shard.backend_hits += 1
+                return value
+
+        with shard.lock:
+            shard.misses += 1
+        return None
+
     def get(self, key: str) -> Optional[Any]:
         """Récupère une valeur du cache mémoire"""
-        if key in self.memory_cache:
-            cache_item = self.memory_cache[key]
-            if not self._is_expired(cache_item):
-                return cache_item["value"]
+        return self._get(key)
+
+    def get_many(self, keys: List[str]) -> Dict[str, Any]:
+        """Lecture groupée : L1 puis un seul aller-retour L2 pour les manquants"""
+        found = {}
+        missing = []
+        for key in keys:
+            shard = self._shard_for(key)
+            with shard.lock:
+                cache_item = shard.entries.get(key)
+                if cache_item is not None and not self._is_expired(cache_item):
+                    shard.entries.move_to_end(key)
+                    shard.hits += 1
+                    found[key] = cache_item["value"]
+                    continue
+            missing.append(key)
+
+        stored = self.backend.get_many(missing) if self.backend and missing else {}
+        for key in missing:
+            shard = self._shard_for(key)
+            if key in stored:
+                value, expires_at = stored[key]
+                self._store_local(key, value, expires_at, None)
+                found[key] = value
+                with shard.lock:
+                    shard.hits += 1
+                    shard.backend_hits += 1
             else:
-                # Supprime l'item expiré
-                del self.memory_cache[key]
-        return None
+                with shard.lock:
+                    shard.misses += 1
+        return found
 
     def set(self, key: str, value: Any, ttl: int = None) -> bool:
         """Stocke une valeur dans le cache mémoire"""
+        return self._set(key, value, ttl)
+
+    def _set(
+        self, key: str, value: Any, ttl: int = None, variant: Optional[str] = None
+    ) -> bool:
+        """Écriture L1 + L2 ; variant amorce le suivi des formes de question"""
+        start = time.perf_counter()
         ttl = ttl or settings.cache_ttl
         expires_at = time.time() + ttl
+        stored = self._store_local(key, value, expires_at, variant)
+        if self.backend is not None:
+            stored = self.backend.set(key, value, expires_at) or stored
+        self.set_latency.record(time.perf_counter() - start)
+        return stored
+
+    def _store_local(
+        self, key: str, value: Any, expires_at: float, variant: Optional[str]
+    ) -> bool:
+        """Écriture sous verrou dans le segment L1"""
+        # Estimation de taille hors verrou pour limiter la contention
+        size = _sizeof(key) + _sizeof(value)
+        shard = self._shard_for(key)
 
-        self.memory_cache[key] = {"value": value, "expires_at": expires_at}
+        # Une valeur plus grosse que le budget du segment n'est jamais admise
+        if shard.max_bytes and size > shard.max_bytes:
+            logger.warning("Cache item too large, skipped", key=key, size=size)
+            return False
+
+        with shard.lock:
+            shard.delete(key)
+            shard.entries[key] = {
+                "value": value,
+                "expires_at": expires_at,
+                "size": size,
+            }
+            if variant is not None:
+                shard.entries[key]["variants"] = {variant}
+            heapq.heappush(shard.expiry_heap, (expires_at, key))
+            shard.current_bytes += size
+            shard.evict()
         return True
 
-    def cache_sql_result(self, query: str, result: Any) -> bool:
+    def sql_key(self, query: str, namespace: Optional[str] = None) -> str:
+        """Clé de cache (et de single-flight) d'une requête SQL canonicalisée"""
+        prefix = f"sql:{namespace}" if namespace else "sql"
+        return self._generate_key(prefix, self.canonicalize(query))
+
+    def _variant(self, query: str) -> str:
+        """Empreinte courte de la forme brute d'une question"""
+        return hashlib.md5(query.encode()).hexdigest()[:16]
+
+    def cache_sql_result(
+        self, query: str, result: Any, namespace: Optional[str] = None
+    ) -> bool:
         """Cache le résultat d'une requête SQL"""
-        key = self._generate_key("sql", query)
-        return self.set(key, result)
+        return self._set(
+            self.sql_key(query, namespace), result, variant=self._variant(query)
+        )
 
-    def get_cached_sql_result(self, query: str) -> Optional[Any]:
+    def get_cached_sql_result(
+        self, query: str, namespace: Optional[str] = None
+    ) -> Optional[Any]:
         """Récupère le résultat d'une requête SQL du cache"""
-        key = self._generate_key("sql", query)
-        return self.get(key)
+        return self._get(self.sql_key(query, namespace), variant=self._variant(query))
+
+    def invalidate_prefix(self, prefix: str) -> int:
+        """
+        Supprime du L1 les entrées dont la clé commence par prefix
+        (les copies L2 ne sont plus adressées et expirent avec leur TTL)
+        """
+        removed = 0
+        for shard in self._shards:
+            with shard.lock:
+                for key in [k for k in shard.entries if k.startswith(prefix)]:
+                    shard.delete(key)
+                    removed += 1
+        logger.info("Cache prefix invalidated", prefix=prefix, removed=removed)
+        return removed
+
+
+def _sweep_loop(ref: "weakref.ref", interval: float, stop: threading.Event) -> None:
+    """Boucle du thread de purge (et des logs de stats) ; s'arrête avec le CacheManager"""
+    last_log = time.time()
+    while not stop.wait(interval):
+        cache = ref()
+        if cache is None:
+            return
+        cache.sweep_expired()
+        if (
+            settings.cache_stats_log_interval
+            and time.time() - last_log >= settings.cache_stats_log_interval
+        ):
+            cache.log_stats()
+            last_log = time.time()
+        del cache
 
 
-# Instance globale
-cache_manager = CacheManager()
+# Instance globale (L2 selon settings.redis_url / settings.cache_disk_path)
+cache_manager = CacheManager(backend=create_cache_backend())
@@ -0,0 +1,287 @@
+"""
+Tiers de cache L2 placés sous le cache mémoire (L1) de CacheManager
+- SQLite en mode WAL : persistant, partagé entre les processus d'un même hôte
+- Redis : partagé entre les réplicas, TTL côté serveur, repli mémoire si indisponible
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterable, Optional, Tuple
+from infrastructure.settings import settings
+from infrastructure.logging import logger
+
+try:
+    import redis
+except ImportError:  # Dépendance optionnelle
+    redis = None
+
+
+class CacheBackend:
+    """Interface commune des tiers L2 (valeurs JSON, expiration absolue)"""
+
+    def get(self, key: str) -> Optional[Tuple[Any, float]]:
+        """Retourne (valeur, expires_at) si la clé existe et n'a pas expiré"""
+        raise NotImplementedError
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, Tuple[Any, float]]:
+        """Lecture groupée ; seules les clés trouvées sont retournées"""
+        found = {}
+        for key in keys:
+            stored = self.get(key)
+            if stored is not None:
+                found[key] = stored
+        return found
+
+    def set(self, key: str, value: Any, expires_at: float) -> bool:
+        """Stocke une valeur sérialisable en JSON jusqu'à expires_at"""
+        raise NotImplementedError
+
+    def delete(self, key: str) -> None:
+        """Supprime une clé"""
+        raise NotImplementedError
+
+    def close(self) -> None:
+        """Libère les ressources du tier"""
+
+
+class SQLiteBackend(CacheBackend):
+    def __init__(self, path: str, compact_interval: int = 0):
+        self.path = path
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+
+        # Une connexion par thread : sqlite3 interdit le partage entre threads
+        self._local = threading.local()
+        conn = self._connection()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_cache_expires_at ON cache (expires_at)"
+        )
+
+        self._stop = threading.Event()
+        self._compactor: Optional[threading.Thread] = None
+        if compact_interval > 0:
+            self._compactor = threading.Thread(
+                target=self._compact_loop,
+                args=(compact_interval,),
+                name="sqlite-cache-compactor",
+                daemon=True,
+            )
+            self._compactor.start()
+
+        logger.info("SQLite cache tier initialized", path=path)
+
+    def _connection(self) -> sqlite3.Connection:
+        """Connexion SQLite du thread courant (créée à la demande)"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # isolation_level=None : autocommit, chaque requête est atomique
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=5000")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str) -> Optional[Tuple[Any, float]]:
+        try:
+            row = (
+                self._connection()
+                .execute(
+                    "SELECT value, expires_at FROM cache WHERE key = ? AND expires_at > ?",
+                    (key, time.time()),
+                )
+                .fetchone()
+            )
+        except sqlite3.Error as e:
+            logger.warning("SQLite cache read failed", error=str(e))
+            return None
+        if row is None:
+            return None
+        return json.loads(row[0]), row[1]
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, Tuple[Any, float]]:
+        keys = list(keys)
+        if not keys:
+            return {}
+        placeholders = ",".join("?" * len(keys))
+        try:
+            rows = (
+                self._connection()
+                .execute(
+                    f"SELECT key, value, expires_at FROM cache "
+                    f"WHERE key IN ({placeholders}) AND expires_at > ?",
+                    (*keys, time.time()),
+                )
+                .fetchall()
+            )
+        except sqlite3.Error as e:
+            logger.warning("SQLite cache read failed", error=str(e))
+            return {}
+        return {key: (json.loads(value), expires_at) for key, value, expires_at in rows}
+
+    def set(self, key: str, value: Any, expires_at: float) -> bool:
+        payload = _dumps(value, key)
+        if payload is None:
+            return False
+        try:
+            self._connection().execute(
+                "INSERT OR REPLACE INTO cache (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, payload, expires_at),
+            )
+        except sqlite3.Error as e:
+            logger.warning("SQLite cache write failed", error=str(e))
+            return False
+        return True
+
+    def delete(self, key: str) -> None:
+        try:
+            self._connection().execute("DELETE FROM cache WHERE key = ?", (key,))
+        except sqlite3.Error as e:
+            logger.warning("SQLite cache delete failed", error=str(e))
+
+    def compact(self) -> int:
+        """Supprime les entrées expirées et tronque le WAL ; retourne le nombre supprimé"""
+        try:
+            conn = self._connection()
+            removed = conn.execute(
+                "DELETE FROM cache WHERE expires_at <= ?", (time.time(),)
+            ).rowcount
+            conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        except sqlite3.Error as e:
+            logger.warning("SQLite cache compaction failed", error=str(e))
+            return 0
+        if removed:
+            logger.info("SQLite cache compacted", removed=removed)
+        return removed
+
+    def _compact_loop(self, interval: int) -> None:
+        """Compaction périodique en arrière-plan"""
+        while not self._stop.wait(interval):
+            self.compact()
+
+    def close(self) -> None:
+        """Arrête la compaction et ferme la connexion du thread courant"""
+        self._stop.set()
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+class RedisBackend(CacheBackend):
+    def __init__(
+        self,
+        url: Optional[str] = None,
+        client: Any = None,
+        prefix: str = "",
+        retry_interval: int = 30,
+    ):
+        if client is None:
+            # Pool de connexions partagé par tous les threads du processus
+            pool = redis.ConnectionPool.from_url(
+                url,
+                max_connections=settings.cache_redis_max_connections,
+                socket_timeout=settings.cache_redis_timeout,
+                socket_connect_timeout=settings.cache_redis_timeout,
+            )
+            client = redis.Redis(connection_pool=pool)
+        self.client = client
+        self.prefix = prefix
+        self.retry_interval = retry_interval
+        # Tant que Redis est injoignable, CacheManager se replie sur la mémoire
+        self._down_until = 0.0
+        logger.info("Redis cache tier initialized", prefix=prefix)
+
+    @property
+    def available(self) -> bool:
+        """False pendant la période de repli après une erreur Redis"""
+        return time.time() >= self._down_until
+
+    def _failed(self, error: Exception) -> None:
+        """Met le tier en repli pendant retry_interval secondes"""
+        self._down_until = time.time() + self.retry_interval
+        logger.warning(
+            "Redis unreachable, falling back to memory cache",
+            error=str(error),
+            retry_in=self.retry_interval,
+        )
+
+    def get(self, key: str) -> Optional[Tuple[Any, float]]:
+        return self.get_many([key]).get(key)
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, Tuple[Any, float]]:
+        keys = list(keys)
+        if not keys or not self.available:
+            return {}
+        try:
+            # MGET : un seul aller-retour pour toutes les clés
+            payloads = self.client.mget([self.prefix + key for key in keys])
+        except redis.RedisError as e:
+            self._failed(e)
+            return {}
+        found = {}
+        for key, payload in zip(keys, payloads):
+            if payload is not None:
+                item = json.loads(payload)
+                found[key] = (item["value"], item["expires_at"])
+        return found
+
+    def set(self, key: str, value: Any, expires_at: float) -> bool:
+        if not self.available:
+            return False
+        ttl_ms = int((expires_at - time.time()) * 1000)
+        payload = _dumps({"value": value, "expires_at": expires_at}, key)
+        if payload is None or ttl_ms <= 0:
+            return False
+        try:
+            # Expiration gérée par le serveur Redis
+            self.client.set(self.prefix + key, payload, px=ttl_ms)
+        except redis.RedisError as e:
+            self._failed(e)
+            return False
+        return True
+
+    def delete(self, key: str) -> None:
+        if not self.available:
+            return
+        try:
+            self.client.delete(self.prefix + key)
+        except redis.RedisError as e:
+            self._failed(e)
+
+    def close(self) -> None:
+        self.client.close()
+
+
+def _dumps(value: Any, key: str) -> Optional[str]:
+    """Sérialise en JSON ; None si la valeur doit rester en mémoire"""
+    try:
+        return json.dumps(value, ensure_ascii=False)
+    except (TypeError, ValueError):
+        logger.debug("Value not JSON serializable, kept in memory only", key=key)
+        return None
+
+
+def create_cache_backend() -> Optional[CacheBackend]:
+    """Construit le tier L2 configuré dans les settings (None = mémoire seule)"""
+    if settings.redis_url:
+        if redis is not None:
+            return RedisBackend(
+                settings.redis_url,
+                prefix=settings.cache_redis_prefix,
+                retry_interval=settings.cache_redis_retry_interval,
+            )
+        logger.warning("redis package not installed, Redis cache disabled")
+    if settings.cache_disk_path:
+        return SQLiteBackend(
+            settings.cache_disk_path,
+            compact_interval=settings.cache_disk_compact_interval,
+        )
+    return None
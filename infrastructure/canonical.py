@@ -0,0 +1,138 @@
+"""
+Canonicalisation des questions avant le calcul de la clé de cache
+Pipeline d'étapes enfichables : NFKC, ponctuation, espaces, nombres et dates japonais
+"""
+
+import re
+import unicodedata
+from typing import Callable, List, Optional
+
+Canonicalizer = Callable[[str], str]
+
+# Ponctuation japonaise non couverte par NFKC
+_PUNCTUATION_MAP = str.maketrans(
+    {
+        "。": ".",
+        "、": ",",
+        "〜": "~",
+        "～": "~",
+        "「": '"',
+        "」": '"',
+        "『": '"',
+        "』": '"',
+    }
+)
+
+# Ponctuation finale sans incidence sur le sens de la question
+_TRAILING_PUNCTUATION = re.compile(r"[\s.!?,]+$")
+
+# Caractères japonais (hiragana, katakana, kanji, ponctuation CJK)
+_CJK = r"　-ヿ㐀-䶿一-鿿"
+_SPACE_BEFORE_CJK = re.compile(rf"\s+(?=[{_CJK}])")
+_SPACE_AFTER_CJK = re.compile(rf"(?<=[{_CJK}])\s+")
+_WHITESPACE = re.compile(r"\s+")
+
+_KANJI_DIGITS = {
+    "〇": 0,
+    "零": 0,
+    "一": 1,
+    "二": 2,
+    "三": 3,
+    "四": 4,
+    "五": 5,
+    "六": 6,
+    "七": 7,
+    "八": 8,
+    "九": 9,
+}
+_KANJI_UNITS = {"十": 10, "百": 100, "千": 1000}
+
+# Nombres en kanji suivis d'une unité de date ou de comptage
+_KANJI_NUMBER = re.compile(
+    r"([〇零一二三四五六七八九十百千]+)(?=年|月|日|週|台|件|人|社|位|ヶ月|か月|カ月)"
+)
+
+# 2025/5/1, 2025-05-01, 2025.5.1
+_NUMERIC_DATE = re.compile(r"(?<!\d)(\d{4})[/\-.](\d{1,2})[/\-.](\d{1,2})(?!\d)")
+# 2025年05月01日 -> suppression des zéros de tête
+_PADDED_DATE_PART = re.compile(r"(?<!\d)0+(\d)(?=月|日)")
+
+# Ères japonaises : année de l'ère + décalage = année grégorienne
+_ERAS = {"令和": 2018, "平成": 1988}
+_ERA_YEAR = re.compile(r"(令和|平成)(元|\d{1,2})年")
+
+
+def _kanji_to_int(text: str) -> int:
+    """Convertit un nombre en kanji (五, 十二, 二〇二五, 三十一) en entier"""
+    if not any(char in _KANJI_UNITS for char in text):
+        # Notation chiffre par chiffre : 二〇二五 -> 2025
+        return int("".join(str(_KANJI_DIGITS[char]) for char in text))
+
+    total, current = 0, 0
+    for char in text:
+        if char in _KANJI_DIGITS:
+            current = _KANJI_DIGITS[char]
+        else:
+            total += (current or 1) * _KANJI_UNITS[char]
+            current = 0
+    return total + current
+
+
+def normalize_unicode(text: str) -> str:
+    """NFKC : chiffres et lettres pleine chasse -> demi-chasse, espaces idéographiques"""
+    return unicodedata.normalize("NFKC", text)
+
+
+def fold_punctuation(text: str) -> str:
+    """Unifie la ponctuation japonaise et retire la ponctuation finale"""
+    return _TRAILING_PUNCTUATION.sub("", text.translate(_PUNCTUATION_MAP))
+
+
+def fold_whitespace(text: str) -> str:
+    """Réduit les espaces et supprime ceux adjacents au texte japonais"""
+    text = _SPACE_BEFORE_CJK.sub("", text.strip())
+    text = _SPACE_AFTER_CJK.sub("", text)
+    return _WHITESPACE.sub(" ", text)
+
+
+def normalize_japanese_numbers(text: str) -> str:
+    """Convertit les nombres en kanji des dates et comptages (五月一日 -> 5月1日)"""
+    return _KANJI_NUMBER.sub(lambda m: str(_kanji_to_int(m.group(1))), text)
+
+
+def normalize_dates(text: str) -> str:
+    """Réécrit les dates au format 2025年5月1日 (ères et formats numériques inclus)"""
+
+    def _era(match):
+        year = 1 if match.group(2) == "元" else int(match.group(2))
+        return f"{_ERAS[match.group(1)] + year}年"
+
+    text = _ERA_YEAR.sub(_era, text)
+    text = _NUMERIC_DATE.sub(
+        lambda m: f"{int(m.group(1))}年{int(m.group(2))}月{int(m.group(3))}日", text
+    )
+    return _PADDED_DATE_PART.sub(r"\1", text)
+
+
+# Pipeline par défaut (l'ordre compte : NFKC avant les expressions régulières)
+CANONICALIZERS: List[Canonicalizer] = [
+    normalize_unicode,
+    fold_punctuation,
+    fold_whitespace,
+    normalize_japanese_numbers,
+    normalize_dates,
+]
+
+
+def register_canonicalizer(step: Canonicalizer) -> None:
+    """Ajoute une étape en fin de pipeline"""
+    CANONICALIZERS.append(step)
+
+
+def canonicalize_question(
+    text: str, steps: Optional[List[Canonicalizer]] = None
+) -> str:
+    """Applique le pipeline de canonicalisation à une question"""
+    for step in CANONICALIZERS if steps is None else steps:
+        text = step(text)
+    return text
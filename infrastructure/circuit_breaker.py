@@ -0,0 +1,177 @@
+"""
+Disjoncteurs (closed / open / half-open) devant Redshift et Gemini
+- closed : appels normaux, les échecs consécutifs sont comptés
+- open : échec immédiat (CircuitOpenError) pendant reset_timeout secondes
+- half-open : un seul appel d'essai ; succès -> closed, échec -> open
+Seules les erreurs de disponibilité comptent (is_failure) : une requête SQL
+invalide ou une question refusée ne coupent pas le circuit
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, Optional, TypeVar
+from sqlalchemy import exc as sa_exc
+from tenacity import RetryError
+from infrastructure.llm_calls import is_transient
+from infrastructure.settings import settings
+from infrastructure.logging import logger
+
+T = TypeVar("T")
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """Dépendance indisponible : appel refusé sans attendre"""
+
+    def __init__(self, name: str, retry_after: float):
+        super().__init__(f"{name} unavailable, retry in {retry_after:.0f}s")
+        self.name = name
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0,
+        is_failure: Optional[Callable[[BaseException], bool]] = None,
+    ):
+        self.name = name
+        # Échecs consécutifs avant ouverture
+        self.failure_threshold = failure_threshold
+        # Durée d'ouverture avant l'appel d'essai
+        self.reset_timeout = reset_timeout
+        self.is_failure = is_failure or (lambda error: True)
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_running = False
+        self.rejected = 0
+        self.trips = 0
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == OPEN and self._retry_after() <= 0:
+                return HALF_OPEN
+            return self._state
+
+    def _retry_after(self) -> float:
+        return self._opened_at + self.reset_timeout - time.monotonic()
+
+    def _before_call(self) -> None:
+        """Laisse passer l'appel ou lève CircuitOpenError"""
+        with self._lock:
+            if self._state == CLOSED:
+                return
+            retry_after = self._retry_after()
+            if retry_after <= 0 and not self._trial_running:
+                # Délai écoulé : un seul appel d'essai à la fois
+                self._state = HALF_OPEN
+                self._trial_running = True
+                return
+            self.rejected += 1
+        raise CircuitOpenError(self.name, max(retry_after, 1.0))
+
+    def _on_success(self) -> None:
+        with self._lock:
+            if self._state != CLOSED:
+                logger.info("Circuit closed", circuit=self.name)
+            self._state = CLOSED
+            self._failures = 0
+            self._trial_running = False
+
+    def _on_failure(self, error: BaseException) -> None:
+        with self._lock:
+            self._failures += 1
+            self._trial_running = False
+            if self._state == HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != OPEN:
+                    self.trips += 1
+                    logger.warning(
+                        "Circuit opened",
+                        circuit=self.name,
+                        failures=self._failures,
+                        error=str(error),
+                        reset_in=self.reset_timeout,
+                    )
+                self._state = OPEN
+                self._opened_at = time.monotonic()
+
+    @contextmanager
+    def guard(self) -> Iterator[None]:
+        """Protège un bloc (utilisable autour d'un générateur)"""
+        self._before_call()
+        try:
+            yield
+        except Exception as error:
+            if self.is_failure(error):
+                self._on_failure(error)
+            else:
+                self._on_success()
+            raise
+        except BaseException:
+            # Générateur abandonné par l'appelant : la dépendance a répondu
+            self._on_success()
+            raise
+        else:
+            self._on_success()
+
+    def call(self, fn: Callable[[], T]) -> T:
+        with self.guard():
+            return fn()
+
+    def reset(self) -> None:
+        with self._lock:
+            self._state = CLOSED
+            self._failures = 0
+            self._trial_running = False
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            retry_after = max(self._retry_after(), 0.0) if self._state == OPEN else 0.0
+        return {
+            "state": self.state,
+            "failures": self._failures,
+            "retry_after": retry_after,
+            "rejected": self.rejected,
+            "trips": self.trips,
+        }
+
+
+def is_db_failure(error: BaseException) -> bool:
+    """Redshift injoignable ou saturé (pas une erreur de syntaxe SQL)"""
+    if isinstance(error, RetryError):
+        # Connexion retentée par tenacity : on juge la dernière erreur
+        error = error.last_attempt.exception()
+    return isinstance(
+        error,
+        (
+            sa_exc.OperationalError,
+            sa_exc.InterfaceError,
+            sa_exc.TimeoutError,
+            ConnectionError,
+            TimeoutError,
+        ),
+    )
+
+
+# Instances globales, partagées par toutes les sessions
+db_breaker = CircuitBreaker(
+    "redshift",
+    settings.circuit_failure_threshold,
+    settings.circuit_reset_timeout,
+    is_failure=is_db_failure,
+)
+llm_breaker = CircuitBreaker(
+    "gemini",
+    settings.circuit_failure_threshold,
+    settings.circuit_reset_timeout,
+    is_failure=is_transient,
+)
@@ -1,20 +1,81 @@
 """
 Gestion robuste des connexions Redshift avec retry et pooling
 Compatible avec LLMManagerSQLChain (utilise uniquement le SQLAlchemy Engine)
+Connexion paresseuse : établie au premier usage ou par un warm-up en arrière-plan
+Disjoncteur : Redshift indisponible -> échec immédiat au lieu d'attendre les délais
 """
 
+import re
+import threading
+from typing import Iterator, List, Optional, Tuple
 from sqlalchemy.engine import Engine, create_engine
 from sqlalchemy.pool import QueuePool
-from sqlalchemy import inspect
+from sqlalchemy import inspect, text
 from tenacity import retry, stop_after_attempt, wait_exponential
+from infrastructure.circuit_breaker import db_breaker
 from infrastructure.settings import settings
 from infrastructure.logging import logger
 
+# Instructions interdites dans une requête exécutée depuis l'interface
+_WRITE_KEYWORDS = re.compile(
+    r"\b(insert|update|delete|merge|drop|alter|create|truncate|grant|revoke"
+    r"|copy|unload|vacuum|analyze|call)\b",
+    re.IGNORECASE,
+)
+_SQL_COMMENTS = re.compile(r"--[^\n]*|/\*.*?\*/", re.DOTALL)
+
+
+def is_read_only_sql(sql: str) -> bool:
+    """Vérifie qu'il s'agit d'une seule requête SELECT/WITH sans écriture"""
+    statement = _SQL_COMMENTS.sub("", sql).strip().rstrip(";").strip()
+    if not statement or ";" in statement:
+        return False
+    first_keyword = statement.split(None, 1)[0].lower()
+    return first_keyword in ("select", "with") and not _WRITE_KEYWORDS.search(statement)
+
 
 class DatabaseManager:
     def __init__(self):
-        self.engine: Engine | None = None
-        self._connect()
+        # Aucune connexion à l'import : le premier rendu ne dépend pas de Redshift
+        self._engine: Engine | None = None
+        self._lock = threading.Lock()
+        self._warmup_thread: threading.Thread | None = None
+
+    @property
+    def engine(self) -> Engine:
+        """Moteur SQLAlchemy, connecté au premier accès"""
+        if self._engine is None:
+            with self._lock:
+                if self._engine is None:
+                    db_breaker.call(self._connect)
+        return self._engine
+
+    @property
+    def is_connected(self) -> bool:
+        """Vrai si le moteur a déjà été initialisé avec succès"""
+        return self._engine is not None
+
+    def warm_up(self, background: bool = True) -> None:
+        """Établit la connexion à l'avance, sur un thread dédié par défaut"""
+        if self.is_connected or (
+            self._warmup_thread is not None and self._warmup_thread.is_alive()
+        ):
+            return
+
+        def _warm_up():
+            try:
+                self.engine
+            except Exception as e:
+                # Le prochain usage retentera la connexion
+                logger.warning("Database warm-up failed", error=str(e))
+
+        if not background:
+            _warm_up()
+            return
+        self._warmup_thread = threading.Thread(
+            target=_warm_up, name="db-warm-up", daemon=True
+        )
+        self._warmup_thread.start()
 
     @retry(
         stop=stop_after_attempt(2), wait=wait_exponential(multiplier=1, min=2, max=5)
@@ -30,7 +91,7 @@ class DatabaseManager:
             )
 
             # Création du moteur SQLAlchemy avec configuration robuste
-            self.engine = create_engine(
+            engine = create_engine(
                 settings.redshift_dsn,
                 poolclass=QueuePool,
                 pool_size=settings.db_pool_size,
@@ -46,17 +107,19 @@ class DatabaseManager:
             )
 
             # Test simple de connectivité
-            with self.engine.connect() as conn:
-                conn.execute("SELECT 1")
+            with engine.connect() as conn:
+                conn.execute(text("SELECT 1"))
 
             # Introspection des tables (log des 5 premières)
-            inspector = inspect(self.engine)
+            inspector = inspect(engine)
             tables = inspector.get_table_names(schema=settings.redshift_schema)
             logger.info(
                 "Database connection successful",
                 tables_count=len(tables),
                 tables=tables[:5],
             )
+            # Publié seulement une fois la connexion validée
+            self._engine = engine
 
         except Exception as e:
             logger.error(
@@ -68,20 +131,50 @@ class DatabaseManager:
         """Vérifie la santé de la connexion"""
         try:
             with self.engine.connect() as conn:
-                conn.execute("SELECT 1")
+                conn.execute(text("SELECT 1"))
             return True
         except Exception as e:
             logger.error("Database health check failed", error=str(e))
             return False
 
+    def stream_query(
+        self, sql: str, chunk_size: Optional[int] = None
+    ) -> Iterator[Tuple[List[str], List[tuple]]]:
+        """
+        Exécute une requête en lecture seule via un curseur serveur (nommé)
+        et produit (colonnes, lignes) par paquets de chunk_size lignes
+        """
+        if not is_read_only_sql(sql):
+            raise ValueError("Only a single read-only SELECT/WITH query can be run")
+
+        chunk_size = chunk_size or settings.query_chunk_size
+        # SQL du modèle exécuté tel quel : ni « :nom » (text()) ni « % »
+        # (paramstyle du pilote) ne sont interprétés comme des paramètres
+        statement = sql.strip().rstrip(";")
+
+        engine = self.engine
+        with db_breaker.guard(), engine.connect() as conn:
+            # stream_results : psycopg2 déclare un curseur nommé côté serveur,
+            # les lignes ne sont rapatriées qu'au fil des fetchmany
+            result = conn.execution_options(
+                stream_results=True, max_row_buffer=chunk_size, no_parameters=True
+            ).exec_driver_sql(statement)
+            columns = list(result.keys())
+            while True:
+                rows = result.fetchmany(chunk_size)
+                if not rows:
+                    break
+                yield columns, [tuple(row) for row in rows]
+
     def close(self):
         """Ferme proprement les connexions"""
-        if self.engine:
-            self.engine.dispose()
+        if self._engine:
+            self._engine.dispose()
+            self._engine = None
             logger.info("Database connections closed")
 
 
-# Instance globale (singleton)
+# Instance globale (singleton, connexion paresseuse)
 db_manager = DatabaseManager()
 
 
@@ -0,0 +1,92 @@
+"""
+Modèle de chat hors ligne substituable à Gemini (LLM_PROVIDER=fake)
+Latence configurable (premier token puis par token), streaming et SQL
+prédéfini : mesures de performance reproductibles sans réseau
+"""
+
+import itertools
+import re
+import time
+from typing import Any, Iterator, List, Optional
+from langchain_core.callbacks import CallbackManagerForLLMRun
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from pydantic import Field, PrivateAttr
+
+# Réponse type au format imposé par PROMPT_TEMPLATE_EN
+DEFAULT_SQL = """```sql
+WITH range_date AS (
+  SELECT
+    to_date('2025-05-01', 'yyyy-mm-dd') AS start_date,
+    to_date('2025-05-07', 'yyyy-mm-dd') AS end_date
+)
+SELECT
+  sc.prefecture_name,
+  COUNT(*) AS sold_count
+FROM usedcar_dwh.sold_cars AS sc
+JOIN range_date AS rd
+  ON sc.sold_date >= rd.start_date
+  AND sc.sold_date <= rd.end_date
+WHERE sc.price != 999999999
+  AND sc.prefecture_name IS NOT NULL
+GROUP BY
+  sc.prefecture_name
+ORDER BY
+  sold_count DESC
+LIMIT 10;
+```"""
+
+# Un token : un mot et les espaces qui le suivent
+_TOKEN = re.compile(r"\S+\s*|\s+")
+
+
+class FakeSQLChatModel(BaseChatModel):
+    """Réponses prédéfinies, servies à tour de rôle, avec une latence simulée"""
+
+    responses: List[str] = Field(default_factory=lambda: [DEFAULT_SQL])
+    # Délai avant le premier token, puis entre deux tokens (secondes)
+    latency: float = 0.5
+    token_latency: float = 0.0
+    # Paramètres acceptés comme Gemini (sans effet sur la réponse)
+    model: str = "fake-sql"
+    temperature: Optional[float] = None
+    max_tokens: Optional[int] = None
+    _cycle: Any = PrivateAttr(default=None)
+
+    def model_post_init(self, __context: Any) -> None:
+        self._cycle = itertools.cycle(self.responses)
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-sql"
+
+    def _tokens(self) -> List[str]:
+        return _TOKEN.findall(next(self._cycle))
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        tokens = self._tokens()
+        time.sleep(self.latency + self.token_latency * len(tokens))
+        message = AIMessage(content="".join(tokens))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _stream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> Iterator[ChatGenerationChunk]:
+        time.sleep(self.latency)
+        for token in self._tokens():
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=token))
+            if run_manager:
+                run_manager.on_llm_new_token(token, chunk=chunk)
+            yield chunk
+            time.sleep(self.token_latency)
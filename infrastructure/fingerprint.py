@@ -0,0 +1,171 @@
+"""
+Empreinte de version de la génération SQL (prompt, modèle, schéma)
+Sert d'espace de noms aux clés du cache : un changement de prompt, de
+modèle ou de schéma invalide uniquement les entrées concernées
+La somme du schéma est recalculée en arrière-plan : le chemin des requêtes
+(cache hits compris) ne se connecte jamais à Redshift
+"""
+
+import hashlib
+import json
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from langchain_core.prompts import BasePromptTemplate
+from infrastructure.llm import sql_prompt
+from infrastructure.logging import logger
+
+# Requête catalogue unique, bien moins coûteuse qu'une réflexion SQLAlchemy
+SCHEMA_COLUMNS_QUERY = text(
+    "SELECT table_name, column_name, data_type "
+    "FROM information_schema.columns "
+    "WHERE table_schema = :schema "
+    "ORDER BY table_name, ordinal_position"
+)
+
+# Schéma jamais lu (démarrage à froid, Redshift injoignable)
+UNKNOWN_SCHEMA = "unknown"
+
+# Nouvel essai après un échec du catalogue (secondes, borné par le TTL)
+_RETRY_INTERVAL = 30
+
+# Durée de conservation de la dernière somme connue dans le tier persistant :
+# elle doit survivre aux entrées SQL qu'elle permet de retrouver
+_STORE_TTL = 30 * 24 * 3600
+
+
+def _digest(payload: Any) -> str:
+    """Hash court et stable d'une structure JSON"""
+    data = json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.md5(data.encode()).hexdigest()[:12]
+
+
+def schema_checksum(engine: Engine, schema: str) -> str:
+    """Somme de contrôle des tables/colonnes/types du schéma"""
+    with engine.connect() as conn:
+        rows = conn.execute(SCHEMA_COLUMNS_QUERY, {"schema": schema}).fetchall()
+    return _digest([list(row) for row in rows])
+
+
+class GenerationFingerprint:
+    def __init__(
+        self,
+        engine_provider: Callable[[], Engine],
+        schema: str,
+        ttl: int,
+        on_change: Optional[Callable[[str, str], None]] = None,
+        prompt: Optional[BasePromptTemplate] = None,
+        store: Optional[Any] = None,
+    ):
+        self.engine_provider = engine_provider
+        # Prompt réellement envoyé par la chaîne (défaut LangChain du dialecte)
+        self.prompt = prompt if prompt is not None else sql_prompt()
+        self.schema = schema
+        # Durée entre deux vérifications du schéma
+        self.ttl = ttl
+        # Appelé avec (ancienne, nouvelle) empreinte de base
+        self.on_change = on_change
+        # Cache (get/set) où persister la dernière somme connue entre redémarrages
+        self.store = store
+        self._store_key = f"fingerprint:schema:{schema}"
+        self._loaded = store is None
+        self._lock = threading.Lock()
+        self._schema_checksum: Optional[str] = None
+        # Incrémenté à chaque nouvelle somme : l'empreinte de base en découle
+        self._checksum_version = 0
+        # Prochaine vérification du schéma (0 = dès que possible)
+        self._next_check = 0.0
+        self._refreshing = False
+        self._base: Optional[str] = None
+        self._base_version = -1
+        self._base_known = False
+
+    def _refresh_schema_checksum(self) -> str:
+        """
+        Dernière somme de contrôle connue, sans jamais attendre Redshift ;
+        après le TTL, un seul thread la recalcule en arrière-plan
+        """
+        if not self._loaded:
+            self._load_persisted()
+        with self._lock:
+            if time.time() >= self._next_check and not self._refreshing:
+                self._refreshing = True
+                threading.Thread(
+                    target=self.refresh, name="schema-fingerprint", daemon=True
+                ).start()
+            return self._schema_checksum or UNKNOWN_SCHEMA
+
+    def refresh(self) -> Optional[str]:
+        """Recalcule la somme de contrôle (I/O hors verrou) ; None en cas d'échec"""
+        try:
+            checksum = schema_checksum(self.engine_provider(), self.schema)
+        except Exception as e:
+            # On garde la dernière valeur connue pour ne pas refroidir le cache
+            logger.warning("Schema checksum failed", error=str(e))
+            checksum = None
+        with self._lock:
+            if checksum is not None:
+                if checksum != self._schema_checksum:
+                    self._schema_checksum = checksum
+                    self._checksum_version += 1
+                self._next_check = time.time() + self.ttl
+            else:
+                self._next_check = time.time() + min(self.ttl, _RETRY_INTERVAL)
+            self._refreshing = False
+        if checksum is not None and self.store is not None:
+            self.store.set(self._store_key, checksum, ttl=_STORE_TTL)
+        return checksum
+
+    def _load_persisted(self) -> None:
+        """
+        Reprend la somme du dernier processus : après un redémarrage pendant
+        une panne de Redshift, l'espace de noms (et le tier L2) reste le même
+        """
+        try:
+            persisted = self.store.get(self._store_key)
+        except Exception as e:
+            logger.warning("Persisted schema checksum unreadable", error=str(e))
+            persisted = None
+        with self._lock:
+            if not self._loaded:
+                self._loaded = True
+                if self._schema_checksum is None and persisted:
+                    self._schema_checksum = persisted
+                    self._checksum_version += 1
+
+    def base(self) -> str:
+        """Empreinte du prompt et du schéma (hors paramètres du modèle)"""
+        self._refresh_schema_checksum()
+        with self._lock:
+            # Somme lue et empreinte remplacée dans la même section : chaque
+            # nouvelle somme ne produit qu'un seul changement, dans l'ordre
+            if self._base_version == self._checksum_version:
+                return self._base
+            checksum = self._schema_checksum or UNKNOWN_SCHEMA
+            base = _digest(
+                {
+                    "prompt": self.prompt.template,
+                    "prompt_variables": self.prompt.partial_variables,
+                    "schema": checksum,
+                }
+            )
+            previous, self._base = self._base, base
+            known, self._base_known = self._base_known, checksum != UNKNOWN_SCHEMA
+            self._base_version = self._checksum_version
+        if previous is not None and previous != base:
+            logger.info("Generation fingerprint changed", previous=previous, new=base)
+            # Premier calcul après un démarrage à froid : le schéma n'a pas changé
+            if self.on_change is not None and known:
+                self.on_change(previous, base)
+        return base
+
+    def current(self, model_params: Dict[str, Any]) -> str:
+        """Espace de noms complet : base + paramètres du modèle"""
+        return f"{self.base()}:{_digest(model_params)}"
+
+    def invalidate(self) -> None:
+        """Force la revérification du schéma au prochain appel"""
+        with self._lock:
+            self._next_check = 0.0
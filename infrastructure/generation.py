@@ -0,0 +1,288 @@
+"""
+Pipeline de génération SQL partagé : cache -> single-flight -> LLM
+Utilisé par l'interface Streamlit, indépendant de st.session_state
+Les clés de cache sont préfixées par l'empreinte prompt/modèle/schéma
+Les questions qui ne diffèrent que par leurs dates réutilisent un gabarit SQL
+Seules les tables pertinentes pour la question sont décrites dans le prompt
+En mode streaming, le SQL partiel est transmis au fil des tokens
+Appels au modèle bornés dans le temps, retentés et couverts (llm_calls)
+Redshift ou Gemini indisponible (disjoncteur ouvert) : échec immédiat, ou SQL
+déjà en cache pour la configuration par défaut lorsqu'il existe
+"""
+
+from typing import Any, Callable, Dict, Optional, Tuple
+from langchain_core.runnables import Runnable, RunnableSequence
+from infrastructure.cache import cache_manager
+from infrastructure.circuit_breaker import CircuitOpenError, db_breaker, llm_breaker
+from infrastructure.database import connect_to_redshift
+from infrastructure.fingerprint import GenerationFingerprint
+from infrastructure.llm import (
+    DEFAULT_LLM_CONFIG,
+    SQL_SCHEMA,
+    gemini_model_params,
+    get_sql_db,
+)
+from infrastructure.llm_calls import llm_caller
+from infrastructure.llm_pool import chain_pool
+from infrastructure.rate_limit import (
+    RateLimitExceeded,
+    batch_rate_limiter,
+    llm_rate_limiter,
+)
+from infrastructure.schema_cache import schema_cache
+from infrastructure.schema_index import table_selector
+from infrastructure.settings import settings
+from infrastructure.singleflight import sql_flight
+from infrastructure.sql_templates import DateTemplateCache
+from infrastructure.logging import logger
+
+
+def _drop_stale_namespace(previous: str, new: str) -> None:
+    """Libère les entrées de l'ancienne empreinte, le reste du cache reste chaud"""
+    cache_manager.invalidate_prefix(f"sql:{previous}:")
+    cache_manager.invalidate_prefix(f"sqltpl:{previous}:")
+    # Le schéma a changé : les métadonnées réfléchies sont périmées
+    schema_cache.invalidate()
+    table_selector.invalidate()
+
+
+# Empreinte partagée par tout le processus (schéma revérifié selon le TTL)
+sql_fingerprint = GenerationFingerprint(
+    connect_to_redshift,
+    SQL_SCHEMA,
+    ttl=settings.schema_fingerprint_ttl,
+    on_change=_drop_stale_namespace,
+    store=cache_manager,
+)
+
+# Gabarits de dates stockés dans le même cache que le SQL
+date_templates = DateTemplateCache(cache_manager)
+
+
+# Ordre significatif : "```sql" avant "```"
+_OUTPUT_MARKERS = ("```sql", "```", "SQLQuery:")
+
+
+def clean_sql(result: str) -> str:
+    """Nettoie la sortie du LLM (balises markdown, préfixe SQLQuery:)"""
+    for marker in _OUTPUT_MARKERS:
+        result = result.replace(marker, "")
+    return result.strip()
+
+
+class IncrementalSQLCleaner:
+    """
+    Applique clean_sql au fil des tokens : un marqueur coupé entre deux
+    morceaux (« ``` » puis « sql ») est retenu jusqu'à être complet
+    """
+
+    def __init__(self):
+        self._raw = ""
+        self._pending = ""
+        self._text = ""
+
+    def _held_length(self) -> int:
+        """Longueur du plus long suffixe qui peut encore devenir un marqueur"""
+        for length in range(min(len(self._pending), 8), 0, -1):
+            suffix = self._pending[-length:]
+            if any(m != suffix and m.startswith(suffix) for m in _OUTPUT_MARKERS):
+                return length
+        return 0
+
+    def feed(self, chunk: str) -> str:
+        """Ajoute un morceau et retourne le SQL nettoyé disponible"""
+        self._raw += chunk
+        self._pending += chunk
+        held = self._held_length()
+        ready = self._pending[: len(self._pending) - held]
+        self._pending = self._pending[len(ready) :]
+        for marker in _OUTPUT_MARKERS:
+            ready = ready.replace(marker, "")
+        self._text += ready
+        return self._text.strip()
+
+    def finish(self) -> str:
+        """SQL final, identique à clean_sql sur la sortie complète"""
+        return clean_sql(self._raw)
+
+
+def _prepare_inputs(sql_chain: Runnable, inputs: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Première étape de la chaîne : question formatée et table_info (réflexion
+    du schéma et lignes d'exemple, seul travail Redshift de la chaîne)
+    """
+    return sql_chain.steps[0].invoke(inputs)
+
+
+def _model_chain(sql_chain: Runnable) -> Runnable:
+    """Étapes qui suivent la préparation : prompt, modèle, nettoyage"""
+    return RunnableSequence(*sql_chain.steps[1:])
+
+
+def _streaming_chain(sql_chain: Runnable) -> Runnable:
+    """
+    Étapes du modèle sans la dernière (_strip) : une fonction simple bufferise
+    tout le flux, le nettoyage final est fait par IncrementalSQLCleaner
+    """
+    return RunnableSequence(*sql_chain.steps[1:-1])
+
+
+def generation_params(model_params: Dict[str, Any]) -> Dict[str, Any]:
+    """Paramètres qui influencent le SQL généré (hors prompt et schéma)"""
+    return {
+        **model_params,
+        "llm_provider": settings.llm_provider,
+        "schema_top_k": table_selector.top_k,
+    }
+
+
+def _run_sql_chain(
+    question: str,
+    model_params: Dict[str, Any],
+    on_partial: Optional[Callable[[str], None]] = None,
+) -> str:
+    """
+    Appelle la chaîne LangChain et retourne le SQL nettoyé ;
+    avec on_partial, le SQL partiel est transmis à chaque token
+    """
+    engine = connect_to_redshift()
+    inputs = {"question": question}
+    with db_breaker.guard():
+        db = get_sql_db(engine)
+        # Élagage du schéma : DDL des seules tables pertinentes
+        tables = table_selector.select(engine, SQL_SCHEMA, question)
+        if tables:
+            inputs["table_names_to_use"] = tables
+        # Client et chaîne réutilisés : seul l'appel au modèle reste par requête
+        sql_chain = chain_pool.chain(db, model_params)
+        # Travail Redshift fait ici, sous le disjoncteur de la base : hors du
+        # délai des appels LLM et jamais dupliqué par la couverture
+        prepared = _prepare_inputs(sql_chain, inputs)
+
+    if on_partial is None:
+        model_chain = _model_chain(sql_chain)
+        return clean_sql(
+            llm_breaker.call(
+                lambda: llm_caller.call(lambda: model_chain.invoke(prepared))
+            )
+        )
+
+    # Délai, couverture et nouvelles tentatives jusqu'au premier morceau ;
+    # ensuite le flux gagnant est lu jusqu'au bout (délai borné par le client)
+    shown = ""
+    cleaner = IncrementalSQLCleaner()
+    streaming_chain = _streaming_chain(sql_chain)
+    with llm_breaker.guard():
+        for chunk in llm_caller.stream(lambda: streaming_chain.stream(prepared)):
+            partial = cleaner.feed(chunk)
+            # Pas de rendu pour un morceau retenu ou fait d'espaces
+            if partial and partial != shown:
+                on_partial(partial)
+                shown = partial
+    return cleaner.finish()
+
+
+def _generate_and_cache(
+    question: str,
+    namespace: str,
+    model_params: Dict[str, Any],
+    on_partial: Optional[Callable[[str], None]] = None,
+    session_id: Optional[str] = None,
+    max_wait: Optional[float] = None,
+    batch: bool = False,
+) -> str:
+    """Génère le SQL (leader du single-flight) et le met en cache"""
+    # Un autre leader a pu terminer entre la lecture du cache et notre tour
+    cached_sql = cache_manager.get_cached_sql_result(question, namespace)
+    if cached_sql:
+        return cached_sql
+
+    # Quota Gemini : attente bornée puis RateLimitExceeded
+    if batch:
+        # Lot plafonné à une part du quota global : les sessions gardent le reste
+        batch_rate_limiter.acquire(max_wait=max_wait)
+    llm_rate_limiter.acquire(session_id, max_wait)
+    cleaned_sql = _run_sql_chain(question, model_params, on_partial)
+    if cleaned_sql:
+        cache_manager.cache_sql_result(question, cleaned_sql, namespace)
+        date_templates.remember(question, cleaned_sql, namespace)
+    return cleaned_sql
+
+
+def generate_sql(
+    question: str,
+    llm_config: Optional[Dict[str, Any]] = None,
+    on_partial: Optional[Callable[[str], None]] = None,
+    session_id: Optional[str] = None,
+    max_wait: Optional[float] = None,
+    batch: bool = False,
+) -> Tuple[str, bool]:
+    """
+    Retourne (sql, from_cache) pour une question.
+    llm_config : configuration de session (temperature, max_tokens).
+    on_partial : reçoit le SQL partiel en streaming (appelant leader uniquement).
+    session_id : session débitée par le limiteur de débit des appels LLM.
+    max_wait : attente maximale d'un jeton (par défaut celle du limiteur).
+    batch : appel d'un lot, débité aussi du seau dédié aux lots.
+    Les appels simultanés pour la même question partagent un seul appel LLM.
+    """
+    model_params = gemini_model_params(llm_config)
+    namespace = sql_fingerprint.current(generation_params(model_params))
+    cached_sql = cache_manager.get_cached_sql_result(question, namespace)
+    if cached_sql:
+        return cached_sql, True
+
+    # Même question à d'autres dates : substitution sans appel LLM
+    templated_sql = date_templates.reuse(question, namespace)
+    if templated_sql:
+        cache_manager.cache_sql_result(question, templated_sql, namespace)
+        return templated_sql, True
+
+    key = cache_manager.sql_key(question, namespace)
+    led = False
+
+    def _lead() -> str:
+        nonlocal led
+        led = True
+        return _generate_and_cache(
+            question, namespace, model_params, on_partial, session_id, max_wait, batch
+        )
+
+    try:
+        while True:
+            try:
+                sql = sql_flight.do(key, _lead)
+                break
+            except RateLimitExceeded:
+                # Quota épuisé de la session d'un autre leader : on rejoue avec
+                # la nôtre (leader ou nouvel appel partagé)
+                if led:
+                    raise
+    except CircuitOpenError as e:
+        fallback_sql = _degraded_sql(question, model_params)
+        if fallback_sql is None:
+            raise
+        logger.warning("Serving cached SQL while circuit is open", circuit=e.name)
+        return fallback_sql, True
+    logger.info("SQL generated", key=key, empty=not sql)
+    return sql, False
+
+
+def _degraded_sql(question: str, model_params: Dict[str, Any]) -> Optional[str]:
+    """
+    SQL déjà généré pour la question avec les réglages par défaut (session
+    puis modèle), utilisé quand une dépendance est coupée
+    """
+    for default_params in (
+        gemini_model_params(DEFAULT_LLM_CONFIG),
+        gemini_model_params(),
+    ):
+        if default_params == model_params:
+            continue
+        namespace = sql_fingerprint.current(generation_params(default_params))
+        sql = cache_manager.get_cached_sql_result(
+            question, namespace
+        ) or date_templates.reuse(question, namespace)
+        if sql:
+            return sql
+    return None
@@ -0,0 +1,134 @@
+"""
+File de travaux de génération SQL, hors du thread du script Streamlit
+- chaque génération est un travail identifié, exécuté par un pool partagé
+  et borné (toutes les sessions) ; l'interface interroge son état
+- le SQL partiel (streaming) et le résultat restent disponibles après un
+  rerun de la page, jusqu'à expiration (job_retention)
+"""
+
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Optional
+from infrastructure.generation import generate_sql
+from infrastructure.settings import settings
+from infrastructure.logging import logger
+
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+
+class GenerationJob:
+    def __init__(
+        self,
+        question: str,
+        llm_config: Optional[Dict[str, Any]] = None,
+        session_id: Optional[str] = None,
+    ):
+        self.id = uuid.uuid4().hex
+        self.question = question
+        self.llm_config = llm_config
+        self.session_id = session_id
+        self.status = PENDING
+        # SQL partiel reçu au fil des tokens (remplacé à chaque morceau)
+        self.partial = ""
+        self.sql = ""
+        self.from_cache = False
+        self.error: Optional[BaseException] = None
+        self.submitted_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status in (DONE, FAILED)
+
+    def _set_partial(self, partial: str) -> None:
+        self.partial = partial
+
+    def run(self) -> None:
+        self.status = RUNNING
+        self.started_at = time.time()
+        try:
+            on_partial = self._set_partial if settings.llm_streaming else None
+            self.sql, self.from_cache = generate_sql(
+                self.question, self.llm_config, on_partial, session_id=self.session_id
+            )
+            self.status = DONE
+        except Exception as e:
+            # L'erreur est rendue par l'interface au prochain rafraîchissement
+            self.error = e
+            self.status = FAILED
+            logger.warning("Generation job failed", job=self.id, error=str(e))
+        finally:
+            self.finished_at = time.time()
+
+
+class JobManager:
+    def __init__(self, max_workers: int = 8, retention: int = 600):
+        self.max_workers = max_workers
+        # Durée de conservation d'un travail terminé (secondes)
+        self.retention = retention
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="generation"
+        )
+        self._lock = threading.Lock()
+        self._jobs: "OrderedDict[str, GenerationJob]" = OrderedDict()
+
+    def submit(
+        self,
+        question: str,
+        llm_config: Optional[Dict[str, Any]] = None,
+        session_id: Optional[str] = None,
+    ) -> str:
+        """Met la génération en file et retourne l'identifiant du travail"""
+        with self._lock:
+            self._prune()
+            # Double clic : le travail en cours de la session est réutilisé
+            for job in self._jobs.values():
+                if (
+                    not job.finished
+                    and job.session_id == session_id
+                    and job.question == question
+                    and job.llm_config == llm_config
+                ):
+                    return job.id
+            job = GenerationJob(question, llm_config, session_id)
+            self._jobs[job.id] = job
+        self._executor.submit(job.run)
+        logger.info("Generation job submitted", job=job.id, session=session_id)
+        return job.id
+
+    def get(self, job_id: str) -> Optional[GenerationJob]:
+        """Travail par identifiant (None s'il a expiré)"""
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def _prune(self) -> None:
+        """Oublie les travaux terminés depuis plus de retention secondes"""
+        limit = time.time() - self.retention
+        for job_id in [
+            job_id
+            for job_id, job in self._jobs.items()
+            if job.finished and job.finished_at < limit
+        ]:
+            del self._jobs[job_id]
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            statuses = [job.status for job in self._jobs.values()]
+        return {
+            "workers": self.max_workers,
+            "pending": statuses.count(PENDING),
+            "running": statuses.count(RUNNING),
+            "done": statuses.count(DONE),
+            "failed": statuses.count(FAILED),
+        }
+
+
+# Instance globale, partagée par toutes les sessions
+job_manager = JobManager(settings.job_workers, settings.job_retention)
@@ -0,0 +1,21 @@
+"""
+Persistance JSON sur disque partagée par les caches (schéma, journal des questions)
+"""
+
+import json
+import os
+from typing import Any
+
+
+def write_json_atomic(path: str, data: Any) -> None:
+    """
+    Écrit data en JSON via un fichier temporaire propre au processus puis
+    os.replace : un lecteur (ou un autre processus) ne voit jamais un fichier
+    à moitié écrit. Lève OSError, journalisée par l'appelant
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
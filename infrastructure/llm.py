@@ -1,41 +1,100 @@
 import logging
-from sqlalchemy.engine import Engine
+from typing import Optional
+from sqlalchemy.engine import Engine, make_url
 
 # from langchain.sql_database import SQLDatabase
 from langchain_community.utilities import SQLDatabase
 
 from langchain.chains import create_sql_query_chain, LLMChain
+from langchain.chains.sql_database.prompt import PROMPT, SQL_PROMPTS
+from langchain_core.prompts import BasePromptTemplate
 from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_core.language_models.chat_models import BaseChatModel
 from langchain.prompts import PromptTemplate
 from infrastructure.settings import settings
 from infrastructure.prompts import PROMPT_TEMPLATE_EN
-
+from infrastructure.schema_cache import schema_cache
 
 logger = logging.getLogger(__name__)
 
+GEMINI_MODEL = "gemini-2.5-flash"
+GEMINI_TEMPERATURE = 0
+GEMINI_MAX_TOKENS = None
+SQL_SCHEMA = "usedcar_dwh"
+# Dialecte de la base cible, connu sans connexion (préfixe du DSN)
+SQL_DIALECT = make_url(settings.redshift_dsn).get_backend_name()
+# Réglages de session par défaut (onglet Paramètres) : la plupart des
+# sessions génèrent avec ces valeurs, le préchargement du cache aussi
+DEFAULT_LLM_CONFIG = {"temperature": 0.0, "max_tokens": 1000}
+
+
+def gemini_model_params(llm_config: Optional[dict] = None) -> dict:
+    """
+    Paramètres du modèle (inclus dans l'empreinte des clés de cache),
+    surchargés par la configuration de session (temperature, max_tokens).
+    """
+    params = {
+        "model": GEMINI_MODEL,
+        "temperature": GEMINI_TEMPERATURE,
+        "max_tokens": GEMINI_MAX_TOKENS,
+    }
+    if llm_config:
+        # Arrondi : les curseurs produisent des flottants bruités (0.15000000000000002)
+        if llm_config.get("temperature") is not None:
+            params["temperature"] = round(float(llm_config["temperature"]), 2)
+        if llm_config.get("max_tokens"):
+            params["max_tokens"] = int(llm_config["max_tokens"])
+    return params
+
 
-def get_gemini_llm() -> BaseChatModel:
+def get_gemini_llm(params: Optional[dict] = None) -> BaseChatModel:
     """
-    Initialise et retourne un modèle Gemini avec API Key.
+    Initialise et retourne un modèle Gemini avec API Key
+    (ou le modèle hors ligne si LLM_PROVIDER=fake).
     """
+    params = params or gemini_model_params()
+    if settings.llm_provider == "fake":
+        # Import local : le modèle factice n'est chargé qu'à la demande
+        from infrastructure.fake_llm import FakeSQLChatModel
+
+        return FakeSQLChatModel(
+            latency=settings.fake_llm_latency,
+            token_latency=settings.fake_llm_token_latency,
+            **params,
+        )
+    # Un seul essai côté client : délais et nouvelles tentatives gérés par llm_calls
     return ChatGoogleGenerativeAI(
-        model="gemini-2.5-flash", temperature=0, google_api_key=settings.google_api_key
+        **params,
+        google_api_key=settings.google_api_key,
+        timeout=settings.llm_timeout,
+        max_retries=1,
     )
 
 
 def get_sql_db(engine: Engine) -> SQLDatabase:
     """
-    Initialise SQLDatabase avec le schéma utilisé.
+    Retourne le SQLDatabase du schéma utilisé (partagé par le processus,
+    métadonnées et table_info mis en cache).
+    """
+    return schema_cache.get_db(engine, SQL_SCHEMA)
+
+
+def sql_prompt(dialect: str = SQL_DIALECT) -> BasePromptTemplate:
+    """
+    Prompt choisi par create_sql_query_chain pour ce dialecte (dialecte déjà
+    appliqué) : c'est lui qui est envoyé au modèle et haché dans l'empreinte.
     """
-    return SQLDatabase(engine, schema="usedcar_dwh")
+    prompt = SQL_PROMPTS.get(dialect, PROMPT)
+    if "dialect" in prompt.input_variables:
+        prompt = prompt.partial(dialect=dialect)
+    return prompt
 
 
 def create_sql_query_chain_only(llm: BaseChatModel, db: SQLDatabase):
     """
     Crée un SQL Query Chain qui génère du SQL uniquement (version standard).
     """
-    return create_sql_query_chain(llm, db)
+    return create_sql_query_chain(llm, db, prompt=sql_prompt(db.dialect))
 
 
 def create_custom_sql_query_chain(llm: BaseChatModel) -> LLMChain:
@@ -0,0 +1,255 @@
+"""
+Appels LLM bornés dans le temps
+- délai maximal par appel (un appel abandonné se termine en arrière-plan)
+- nouvelles tentatives avec attente exponentielle aléatoire (erreurs transitoires)
+- requête de couverture (hedging) lancée après le p95 observé : la première
+  bonne réponse gagne, un budget borne le nombre d'appels supplémentaires
+- en streaming, délai et couverture portent sur le premier morceau : deux flux
+  font la course, le perdant est fermé et la suite est lue sur le gagnant
+"""
+
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Iterable, Iterator, Optional, Set, Tuple, TypeVar
+from tenacity import (
+    RetryCallState,
+    Retrying,
+    retry_if_exception,
+    stop_after_attempt,
+    wait_random_exponential,
+)
+from infrastructure.metrics import LatencyHistogram
+from infrastructure.settings import settings
+from infrastructure.logging import logger
+
+try:
+    from google.api_core import exceptions as google_exceptions
+except ImportError:  # Dépendance de langchain-google-genai
+    google_exceptions = None
+
+T = TypeVar("T")
+
+# Mesures nécessaires avant de se fier au p95 pour déclencher la couverture
+_MIN_HEDGE_SAMPLES = 20
+
+
+# Flux terminé sans aucun morceau
+_END = object()
+
+
+class LLMTimeout(TimeoutError):
+    """Aucune réponse du modèle dans le délai imparti"""
+
+
+class _StreamDiscarded(Exception):
+    """Flux ouvert après que la course au premier morceau a été gagnée"""
+
+
+def _close(iterator: Iterator[Any]) -> None:
+    close = getattr(iterator, "close", None)
+    if close is not None:
+        close()
+
+
+def is_transient(error: BaseException) -> bool:
+    """Erreur qui justifie une nouvelle tentative (délai, réseau, 429, 5xx)"""
+    if isinstance(error, (TimeoutError, ConnectionError)):
+        return True
+    if google_exceptions is not None:
+        return isinstance(
+            error, (google_exceptions.TooManyRequests, google_exceptions.ServerError)
+        )
+    return False
+
+
+class HedgedCaller:
+    def __init__(
+        self,
+        timeout: float,
+        first_token_timeout: Optional[float] = None,
+        max_attempts: int = 3,
+        retry_wait_max: float = 8.0,
+        hedge: bool = True,
+        hedge_min_delay: float = 1.0,
+        hedge_budget: float = 0.1,
+        max_workers: int = 16,
+    ):
+        self.timeout = timeout
+        # Délai maximal avant le premier morceau d'un flux (défaut : timeout)
+        self.first_token_timeout = first_token_timeout or timeout
+        self.max_attempts = max_attempts
+        self.retry_wait_max = retry_wait_max
+        self.hedge = hedge
+        self.hedge_min_delay = hedge_min_delay
+        # Part maximale d'appels doublés (0.1 = au plus 10 % de surcoût)
+        self.hedge_budget = hedge_budget
+        # Durées des appels réussis : source du délai de couverture
+        self.latency = LatencyHistogram()
+        # Délais avant le premier morceau des flux : source de leur couverture
+        self.first_token = LatencyHistogram()
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="llm-call"
+        )
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+        self.retries = 0
+        self.timeouts = 0
+
+    def hedge_delay(
+        self, latency: Optional[LatencyHistogram] = None
+    ) -> Optional[float]:
+        """Délai avant la couverture (p95, au moins hedge_min_delay), None sans historique"""
+        latency = latency or self.latency
+        if not self.hedge or latency.count < _MIN_HEDGE_SAMPLES:
+            return None
+        return max(latency.percentile(95), self.hedge_min_delay)
+
+    def _take_hedge(self) -> bool:
+        """Débite le budget de couverture ; False s'il est épuisé"""
+        with self._lock:
+            if self.hedged + 1 > self.hedge_budget * self.calls:
+                return False
+            self.hedged += 1
+            return True
+
+    def _attempt(
+        self,
+        fn: Callable[[], T],
+        latency: Optional[LatencyHistogram] = None,
+        timeout: Optional[float] = None,
+    ) -> T:
+        """Un essai : appel principal, couverture éventuelle, délai maximal"""
+        latency = latency or self.latency
+        timeout = timeout or self.timeout
+        start = time.monotonic()
+        deadline = start + timeout
+        delay = self.hedge_delay(latency)
+        hedge_at = start + delay if delay is not None and delay < timeout else None
+        with self._lock:
+            self.calls += 1
+
+        pending: Set[Future] = {self._executor.submit(fn)}
+        hedge: Optional[Future] = None
+        error: Optional[BaseException] = None
+        while pending:
+            now = time.monotonic()
+            if now >= deadline:
+                break
+            if hedge_at is not None and now >= hedge_at:
+                hedge_at = None
+                if self._take_hedge():
+                    logger.info("LLM call hedged", after=round(now - start, 3))
+                    hedge = self._executor.submit(fn)
+                    pending.add(hedge)
+            until = min(deadline, hedge_at) if hedge_at is not None else deadline
+            done, pending = wait(
+                pending, timeout=until - now, return_when=FIRST_COMPLETED
+            )
+            for future in done:
+                if future.exception() is None:
+                    latency.record(time.monotonic() - start)
+                    if future is hedge:
+                        self.hedge_wins += 1
+                    return future.result()
+                error = future.exception()
+
+        if not pending and error is not None:
+            raise error
+        # Les appels en cours ne sont pas interrompus : leur réponse est ignorée
+        for future in pending:
+            future.cancel()
+        self.timeouts += 1
+        logger.warning("LLM call timed out", timeout=timeout)
+        raise LLMTimeout(f"LLM call exceeded {timeout:.0f}s")
+
+    def _before_sleep(self, state: RetryCallState) -> None:
+        self.retries += 1
+        logger.warning(
+            "Retrying LLM call",
+            attempt=state.attempt_number,
+            error=str(state.outcome.exception()),
+            wait=round(state.next_action.sleep, 3),
+        )
+
+    def retrying(
+        self, should_retry: Optional[Callable[[BaseException], bool]] = None
+    ) -> Retrying:
+        """Politique de nouvelles tentatives ; should_retry restreint les cas"""
+        return Retrying(
+            stop=stop_after_attempt(self.max_attempts),
+            wait=wait_random_exponential(multiplier=0.5, max=self.retry_wait_max),
+            retry=retry_if_exception(
+                lambda e: is_transient(e) and (should_retry is None or should_retry(e))
+            ),
+            before_sleep=self._before_sleep,
+            reraise=True,
+        )
+
+    def call(self, fn: Callable[[], T]) -> T:
+        """Appelle fn avec délai maximal, couverture et nouvelles tentatives"""
+        return self.retrying()(self._attempt, fn)
+
+    def _first_chunk(
+        self, open_stream: Callable[[], Iterable[T]]
+    ) -> Tuple[Any, Iterator[T]]:
+        """Un essai : premier morceau du flux le plus rapide, les autres sont fermés"""
+        lock = threading.Lock()
+        decided = [False]
+
+        def _open() -> Tuple[Any, Iterator[T]]:
+            iterator = iter(open_stream())
+            first = next(iterator, _END)
+            with lock:
+                if not decided[0]:
+                    decided[0] = True
+                    return first, iterator
+            # Course déjà gagnée (ou délai dépassé) : ce flux n'est pas lu
+            _close(iterator)
+            raise _StreamDiscarded()
+
+        try:
+            return self._attempt(_open, self.first_token, self.first_token_timeout)
+        finally:
+            with lock:
+                decided[0] = True
+
+    def stream(self, open_stream: Callable[[], Iterable[T]]) -> Iterator[T]:
+        """
+        Flux dont le premier morceau est borné, couvert et retenté comme un
+        appel ; la suite est lue sur le flux gagnant (délai du client)
+        """
+        first, iterator = self.retrying()(self._first_chunk, open_stream)
+        if first is _END:
+            return
+        try:
+            yield first
+            yield from iterator
+        finally:
+            _close(iterator)
+
+    def stats(self) -> dict:
+        return {
+            "calls": self.calls,
+            "hedged": self.hedged,
+            "hedge_wins": self.hedge_wins,
+            "retries": self.retries,
+            "timeouts": self.timeouts,
+            "latency": self.latency.snapshot(),
+            "first_token": self.first_token.snapshot(),
+        }
+
+
+# Instance globale, partagée par toutes les sessions
+llm_caller = HedgedCaller(
+    timeout=settings.llm_timeout,
+    first_token_timeout=settings.llm_first_token_timeout,
+    max_attempts=settings.llm_max_attempts,
+    retry_wait_max=settings.llm_retry_wait_max,
+    hedge=settings.llm_hedge_enabled,
+    hedge_min_delay=settings.llm_hedge_min_delay,
+    hedge_budget=settings.llm_hedge_budget,
+    max_workers=settings.llm_call_workers,
+)
@@ -0,0 +1,89 @@
+"""
+Pool borné (LRU) de clients LLM et de chaînes SQL à l'échelle du processus
+Un client Gemini garde son canal ouvert (keep-alive) : le réutiliser évite la
+configuration du client et les handshakes à chaque génération. Les sessions de
+même configuration partagent un client chaud, les configurations rares sont
+évincées. Les chaînes LangChain sont sans état, une même instance sert tous
+les threads
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+from langchain_community.utilities import SQLDatabase
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.runnables import Runnable
+from infrastructure.llm import (
+    create_sql_query_chain_only,
+    gemini_model_params,
+    get_gemini_llm,
+)
+from infrastructure.settings import settings
+from infrastructure.logging import logger
+
+
+def _llm_key(params: Dict[str, Any]) -> Tuple:
+    """(modèle, température, max_tokens)"""
+    return (params["model"], params["temperature"], params.get("max_tokens"))
+
+
+class ChainPool:
+    def __init__(self, max_clients: int = 8):
+        # Nombre de configurations gardées chaudes (0 = pas de limite)
+        self.max_clients = max_clients
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._llms: "OrderedDict[Tuple, BaseChatModel]" = OrderedDict()
+        # (modèle, température, max_tokens, schéma) -> (SQLDatabase, chaîne)
+        self._chains: Dict[Tuple, Tuple[SQLDatabase, Runnable]] = {}
+
+    def _llm_locked(self, params: Dict[str, Any]) -> BaseChatModel:
+        key = _llm_key(params)
+        llm = self._llms.get(key)
+        if llm is not None:
+            self._llms.move_to_end(key)
+            return llm
+        llm = get_gemini_llm(params)
+        self._llms[key] = llm
+        logger.info(
+            "LLM client created", model=key[0], temperature=key[1], max_tokens=key[2]
+        )
+        while self.max_clients and len(self._llms) > self.max_clients:
+            evicted, _ = self._llms.popitem(last=False)
+            # Les chaînes de ce client partent avec lui
+            for chain_key in [k for k in self._chains if k[:3] == evicted]:
+                del self._chains[chain_key]
+            self.evictions += 1
+            logger.info("LLM client evicted", model=evicted[0], temperature=evicted[1])
+        return llm
+
+    def llm(self, params: Optional[Dict[str, Any]] = None) -> BaseChatModel:
+        """Client partagé pour ces paramètres"""
+        with self._lock:
+            return self._llm_locked(params or gemini_model_params())
+
+    def chain(
+        self, db: SQLDatabase, params: Optional[Dict[str, Any]] = None
+    ) -> Runnable:
+        """Chaîne SQL partagée pour ces paramètres et ce schéma"""
+        params = params or gemini_model_params()
+        key = (*_llm_key(params), db._schema)
+        with self._lock:
+            entry = self._chains.get(key)
+            # Le SQLDatabase est recréé quand le cache du schéma expire
+            if entry is not None and entry[0] is db:
+                self._llms.move_to_end(key[:3])
+                return entry[1]
+            chain = create_sql_query_chain_only(self._llm_locked(params), db)
+            self._chains[key] = (db, chain)
+            return chain
+
+    def clear(self) -> None:
+        """Oublie les clients et chaînes (nouvelle clé API, tests)"""
+        with self._lock:
+            self._llms.clear()
+            self._chains.clear()
+
+
+# Instance globale
+chain_pool = ChainPool(settings.llm_pool_size)
@@ -0,0 +1,60 @@
+"""
+Métriques légères pour le chemin critique (cache, LLM)
+Histogrammes à seaux logarithmiques : enregistrement en O(log n), sans verrou
+"""
+
+from bisect import bisect_left
+from typing import Dict, List
+
+
+class LatencyHistogram:
+    def __init__(
+        self, min_value: float = 1e-6, max_value: float = 60.0, growth: float = 1.25
+    ):
+        # Bornes hautes des seaux : 1µs, 1.25µs, ... jusqu'à max_value
+        self.bounds: List[float] = []
+        bound = min_value
+        while bound < max_value:
+            self.bounds.append(bound)
+            bound *= growth
+        self.bounds.append(max_value)
+        # Dernier seau : valeurs au-delà de max_value
+        self.counts: List[int] = [0] * (len(self.bounds) + 1)
+
+    def record(self, seconds: float) -> None:
+        """
+        Enregistre une durée. L'incrément n'est pas atomique entre threads :
+        une mesure peut exceptionnellement être perdue, ce qui est acceptable
+        pour des percentiles et évite tout verrou sur le chemin critique.
+        """
+        self.counts[bisect_left(self.bounds, seconds)] += 1
+
+    @property
+    def count(self) -> int:
+        return sum(self.counts)
+
+    def percentile(self, p: float) -> float:
+        """Percentile approché (borne haute du seau), p entre 0 et 100"""
+        counts = list(self.counts)
+        total = sum(counts)
+        if not total:
+            return 0.0
+        rank = total * p / 100
+        cumulative = 0
+        for index, bucket_count in enumerate(counts):
+            cumulative += bucket_count
+            if cumulative >= rank and bucket_count:
+                return self.bounds[min(index, len(self.bounds) - 1)]
+        return self.bounds[-1]
+
+    def snapshot(self) -> Dict[str, float]:
+        """Résumé : nombre de mesures et p50/p95/p99 en millisecondes"""
+        return {
+            "count": self.count,
+            "p50_ms": self.percentile(50) * 1000,
+            "p95_ms": self.percentile(95) * 1000,
+            "p99_ms": self.percentile(99) * 1000,
+        }
+
+    def reset(self) -> None:
+        self.counts = [0] * len(self.counts)
@@ -0,0 +1,267 @@
+"""
+Limitation du débit des appels LLM (quota Gemini partagé)
+- seau à jetons global + un seau par session, vérification en O(1)
+- mise en file d'attente bornée (max_wait) plutôt qu'un refus immédiat
+- variante Redis (fenêtre glissante) pour plusieurs réplicas
+"""
+
+import math
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, List, Optional, Tuple
+from infrastructure.settings import settings
+from infrastructure.logging import logger
+
+try:
+    import redis
+except ImportError:  # Dépendance optionnelle
+    redis = None
+
+# Nombre de seaux de session gardés en mémoire (les plus anciens sont oubliés)
+_MAX_SESSION_BUCKETS = 10000
+
+
+class RateLimitExceeded(Exception):
+    """Quota atteint et attente maximale dépassée"""
+
+    def __init__(self, retry_after: float):
+        super().__init__(f"Rate limit exceeded, retry in {retry_after:.0f}s")
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    def __init__(self, capacity: float, refill_per_second: float):
+        self.capacity = capacity
+        self.refill_per_second = refill_per_second
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+
+    def wait_time(self, now: float) -> float:
+        """Secondes avant qu'un jeton soit disponible (0 = disponible)"""
+        # Seau créé après la lecture de l'horloge : pas de temps négatif
+        elapsed = max(now - self.updated_at, 0.0)
+        self.tokens = min(self.capacity, self.tokens + elapsed * self.refill_per_second)
+        self.updated_at = now
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.refill_per_second
+
+    def take(self) -> None:
+        self.tokens -= 1
+
+
+class RateLimiter:
+    """Boucle d'attente commune ; _try_acquire est propre à chaque variante"""
+
+    def __init__(self, max_wait: float):
+        # Attente maximale avant refus (0 = refus immédiat)
+        self.max_wait = max_wait
+        self.rejected = 0
+        self.waited = 0
+
+    def _try_acquire(self, session_id: Optional[str]) -> float:
+        """Prend un jeton et retourne 0, ou retourne l'attente nécessaire"""
+        raise NotImplementedError
+
+    def acquire(
+        self, session_id: Optional[str] = None, max_wait: Optional[float] = None
+    ) -> float:
+        """Attend un jeton (au plus max_wait secondes) ; retourne le temps attendu"""
+        max_wait = self.max_wait if max_wait is None else max_wait
+        start = time.monotonic()
+        waited = 0.0
+        while True:
+            wait = self._try_acquire(session_id)
+            if wait <= 0:
+                if waited:
+                    self.waited += 1
+                return waited
+            remaining = max_wait - (time.monotonic() - start)
+            if wait > remaining:
+                self.rejected += 1
+                logger.warning(
+                    "LLM rate limit exceeded", session=session_id, retry_after=wait
+                )
+                raise RateLimitExceeded(wait)
+            time.sleep(wait)
+            waited = time.monotonic() - start
+
+
+class LocalRateLimiter(RateLimiter):
+    def __init__(
+        self,
+        requests: int,
+        window: int,
+        session_requests: int = 0,
+        max_wait: float = 0.0,
+    ):
+        super().__init__(max_wait)
+        self.window = window
+        self.session_requests = session_requests
+        self._lock = threading.Lock()
+        self._global = TokenBucket(requests, requests / window) if requests else None
+        self._sessions: "OrderedDict[str, TokenBucket]" = OrderedDict()
+
+    def _session_bucket(self, session_id: str) -> TokenBucket:
+        bucket = self._sessions.get(session_id)
+        if bucket is None:
+            bucket = TokenBucket(
+                self.session_requests, self.session_requests / self.window
+            )
+            self._sessions[session_id] = bucket
+            if len(self._sessions) > _MAX_SESSION_BUCKETS:
+                self._sessions.popitem(last=False)
+        else:
+            self._sessions.move_to_end(session_id)
+        return bucket
+
+    def _try_acquire(self, session_id: Optional[str]) -> float:
+        now = time.monotonic()
+        with self._lock:
+            buckets: List[TokenBucket] = []
+            if self._global is not None:
+                buckets.append(self._global)
+            if session_id and self.session_requests:
+                buckets.append(self._session_bucket(session_id))
+            # Les deux seaux sont vérifiés avant d'en débiter un seul
+            wait = max((b.wait_time(now) for b in buckets), default=0.0)
+            if wait > 0:
+                return wait
+            for bucket in buckets:
+                bucket.take()
+            return 0.0
+
+
+class RedisRateLimiter(RateLimiter):
+    """
+    Fenêtre glissante approchée (deux compteurs INCR par clé) partagée entre
+    réplicas ; repli sur un limiteur local tant que Redis est injoignable
+    """
+
+    def __init__(
+        self,
+        client: Any,
+        requests: int,
+        window: int,
+        session_requests: int = 0,
+        max_wait: float = 0.0,
+        prefix: str = "",
+        retry_interval: int = 30,
+        fallback: Optional[RateLimiter] = None,
+    ):
+        super().__init__(max_wait)
+        self.client = client
+        self.requests = requests
+        self.window = window
+        self.session_requests = session_requests
+        self.prefix = prefix
+        self.retry_interval = retry_interval
+        self.fallback = fallback or LocalRateLimiter(
+            requests, window, session_requests, max_wait
+        )
+        self._down_until = 0.0
+
+    def _limits(self, session_id: Optional[str]) -> List[Tuple[str, int]]:
+        limits = []
+        if self.requests:
+            limits.append((f"{self.prefix}ratelimit:global", self.requests))
+        if session_id and self.session_requests:
+            limits.append(
+                (f"{self.prefix}ratelimit:session:{session_id}", self.session_requests)
+            )
+        return limits
+
+    def _try_acquire(self, session_id: Optional[str]) -> float:
+        if time.time() < self._down_until:
+            return self.fallback._try_acquire(session_id)
+        limits = self._limits(session_id)
+        if not limits:
+            return 0.0
+        now = time.time()
+        index, offset = divmod(now, self.window)
+        index = int(index)
+        elapsed = offset / self.window
+        try:
+            pipe = self.client.pipeline()
+            for name, _ in limits:
+                pipe.incr(f"{name}:{index}")
+                pipe.expire(f"{name}:{index}", self.window * 2)
+                pipe.get(f"{name}:{index - 1}")
+            results = pipe.execute()
+
+            wait = 0.0
+            for i, (_, limit) in enumerate(limits):
+                current = int(results[i * 3])
+                previous = int(results[i * 3 + 2] or 0)
+                # Part de la fenêtre précédente encore couverte par la fenêtre glissante
+                if previous * (1 - elapsed) + current <= limit:
+                    continue
+                if current > limit or not previous:
+                    needed = 1 - elapsed
+                else:
+                    needed = max(1 - (limit - current) / previous - elapsed, 0.0)
+                wait = max(wait, needed * self.window, 0.01)
+            if wait > 0:
+                # Refus : on rend les jetons pris par INCR
+                pipe = self.client.pipeline()
+                for name, _ in limits:
+                    pipe.decr(f"{name}:{index}")
+                pipe.execute()
+            return wait
+        except redis.RedisError as e:
+            self._down_until = time.time() + self.retry_interval
+            logger.warning(
+                "Redis unreachable, falling back to local rate limiter",
+                error=str(e),
+                retry_in=self.retry_interval,
+            )
+            return self.fallback._try_acquire(session_id)
+
+
+def create_rate_limiter(
+    requests: Optional[int] = None,
+    session_requests: Optional[int] = None,
+    name: str = "",
+) -> RateLimiter:
+    """
+    Limiteur configuré : Redis si disponible, sinon local au processus.
+    requests / session_requests : quotas propres (par défaut ceux des settings).
+    name : espace de clés Redis d'un seau dédié (ex. « batch: »).
+    """
+    limits = dict(
+        requests=settings.rate_limit_requests if requests is None else requests,
+        window=settings.rate_limit_window,
+        session_requests=(
+            settings.rate_limit_session_requests
+            if session_requests is None
+            else session_requests
+        ),
+        max_wait=settings.rate_limit_max_wait,
+    )
+    if settings.redis_url and redis is not None:
+        client = redis.Redis.from_url(
+            settings.redis_url,
+            socket_timeout=settings.cache_redis_timeout,
+            socket_connect_timeout=settings.cache_redis_timeout,
+        )
+        return RedisRateLimiter(
+            client,
+            prefix=settings.cache_redis_prefix + name,
+            retry_interval=settings.cache_redis_retry_interval,
+            **limits,
+        )
+    return LocalRateLimiter(**limits)
+
+
+# Instance globale, placée devant chaque appel LLM
+llm_rate_limiter = create_rate_limiter()
+
+# Seau des lots, pris en plus du quota global : un lot n'en consomme qu'une
+# part (0 = sans limite, comme le quota global), le reste reste disponible
+# pour les questions interactives
+batch_rate_limiter = create_rate_limiter(
+    requests=math.ceil(settings.rate_limit_requests * settings.batch_rate_limit_share),
+    session_requests=0,
+    name="batch:",
+)
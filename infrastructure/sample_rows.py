@@ -0,0 +1,150 @@
+"""
+Instantané des lignes d'exemple affichées dans table_info
+Les SELECT ... LIMIT n par table sont exécutés au warm-up puis rafraîchis en
+arrière-plan : la construction du prompt lit la mémoire, pas le cluster
+"""
+
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Engine
+from infrastructure.settings import settings
+from infrastructure.logging import logger
+
+# Même troncature que LangChain pour garder le prompt compact
+_MAX_VALUE_LENGTH = 100
+
+
+class SampleRowStore:
+    def __init__(self, rows: int):
+        # Nombre de lignes par table (0 = pas d'exemples dans le prompt)
+        self.rows = rows
+        self._lock = threading.Lock()
+        # (schéma, table) -> bloc formaté
+        self._blocks: Dict[Tuple[str, str], str] = {}
+        self._refreshed_at: Optional[float] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    @property
+    def refreshed_at(self) -> Optional[float]:
+        """Horodatage du dernier rafraîchissement complet"""
+        return self._refreshed_at
+
+    def _fetch(self, engine: Engine, schema: str, table: str) -> str:
+        """Lit les lignes d'exemple d'une table et les formate comme LangChain"""
+        preparer = engine.dialect.identifier_preparer
+        query = text(
+            f"SELECT * FROM {preparer.quote_schema(schema)}.{preparer.quote(table)} "
+            f"LIMIT {int(self.rows)}"
+        )
+        with engine.connect() as conn:
+            result = conn.execute(query)
+            columns = "\t".join(result.keys())
+            rows = "\n".join(
+                "\t".join(str(value)[:_MAX_VALUE_LENGTH] for value in row)
+                for row in result.fetchall()
+            )
+        return f"\n\n/*\n{self.rows} rows from {table} table:\n{columns}\n{rows}\n*/"
+
+    def block(self, engine: Engine, schema: str, table: str) -> str:
+        """Bloc d'exemples d'une table, lu une seule fois si absent de l'instantané"""
+        if self.rows <= 0:
+            return ""
+        key = (schema, table)
+        block = self._blocks.get(key)
+        if block is None:
+            try:
+                block = self._fetch(engine, schema, table)
+            except Exception as e:
+                # Table illisible : pas d'exemples plutôt qu'une génération en
+                # échec ; rien n'est gardé, la lecture suivante réessaie
+                logger.warning("Sample rows fetch failed", table=table, error=str(e))
+                return ""
+            with self._lock:
+                self._blocks.setdefault(key, block)
+        return block
+
+    def refresh(
+        self, engine: Engine, schema: str, tables: Optional[List[str]] = None
+    ) -> int:
+        """
+        Recharge l'instantané des tables (toutes celles du schéma par défaut) ;
+        une table en échec garde son bloc précédent, et l'erreur remonte si
+        aucune table n'a pu être lue (instantané inchangé)
+        """
+        if self.rows <= 0:
+            return 0
+        if tables is None:
+            tables = inspect(engine).get_table_names(schema=schema)
+        blocks: Dict[Tuple[str, str], str] = {}
+        failed: List[str] = []
+        error: Optional[Exception] = None
+        for table in tables:
+            try:
+                blocks[(schema, table)] = self._fetch(engine, schema, table)
+            except Exception as e:
+                failed.append(table)
+                error = e
+        if error is not None and not blocks:
+            raise error
+        with self._lock:
+            previous = self._blocks
+            for table in failed:
+                if (schema, table) in previous:
+                    blocks[(schema, table)] = previous[(schema, table)]
+            # Remplacement en bloc : les lecteurs voient l'ancien ou le nouvel état
+            self._blocks = {
+                **{k: v for k, v in previous.items() if k[0] != schema},
+                **blocks,
+            }
+            self._refreshed_at = time.time()
+        if failed:
+            logger.warning(
+                "Sample rows kept for unreadable tables",
+                schema=schema,
+                tables=failed,
+                error=str(error),
+            )
+        logger.info(
+            "Sample rows refreshed", schema=schema, tables=len(tables) - len(failed)
+        )
+        return len(tables) - len(failed)
+
+    def start_refresh(
+        self, engine_provider: Callable[[], Engine], schema: str, interval: int
+    ) -> None:
+        """Rafraîchit tout de suite puis toutes les interval secondes (thread démon)"""
+        if self.rows <= 0 or (self._thread is not None and self._thread.is_alive()):
+            return
+        self._stop.clear()
+
+        def _loop():
+            while not self._stop.is_set():
+                try:
+                    self.refresh(engine_provider(), schema)
+                except Exception as e:
+                    # L'instantané existant reste servi jusqu'au prochain essai
+                    logger.warning("Sample rows refresh failed", error=str(e))
+                if interval <= 0 or self._stop.wait(interval):
+                    break
+
+        self._thread = threading.Thread(
+            target=_loop, name="sample-rows-refresh", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Arrête le rafraîchissement périodique"""
+        self._stop.set()
+
+    def invalidate(self) -> None:
+        """Oublie l'instantané (schéma modifié)"""
+        with self._lock:
+            self._blocks = {}
+            self._refreshed_at = None
+
+
+# Instance globale
+sample_rows = SampleRowStore(settings.sample_rows_in_table_info)
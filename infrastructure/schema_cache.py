@@ -0,0 +1,161 @@
+"""
+Cache du schéma à l'échelle du processus pour la génération SQL
+- instance SQLDatabase réutilisée (plus de réflexion du catalogue à chaque appel)
+- texte table_info mémorisé avec TTL, persistable sur disque (démarrage à chaud)
+- lignes d'exemple lues depuis l'instantané SampleRowStore, pas depuis le cluster
+"""
+
+import json
+import os
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+from sqlalchemy.engine import Engine
+from langchain_community.utilities import SQLDatabase
+from infrastructure.json_file import write_json_atomic
+from infrastructure.sample_rows import SampleRowStore, sample_rows
+from infrastructure.singleflight import SingleFlight
+from infrastructure.settings import settings
+from infrastructure.logging import logger
+
+
+class CachedSQLDatabase(SQLDatabase):
+    """SQLDatabase à réflexion paresseuse dont table_info est servi par SchemaCache"""
+
+    def __init__(self, engine: Engine, schema: str, schema_cache: "SchemaCache"):
+        self._schema_cache = schema_cache
+        # Réflexion des tables seulement si table_info doit être recalculé ;
+        # les lignes d'exemple viennent de l'instantané, pas de LangChain
+        super().__init__(
+            engine,
+            schema=schema,
+            lazy_table_reflection=True,
+            sample_rows_in_table_info=0,
+        )
+
+    def get_table_info(
+        self, table_names: Optional[List[str]] = None, get_col_comments: bool = False
+    ) -> str:
+        compute = super().get_table_info
+        names = sorted(table_names or self.get_usable_table_names())
+        # DDL mémorisé par table, complété par le bloc d'exemples en mémoire
+        return "\n\n".join(
+            self._schema_cache.table_info(
+                self._schema, [name], lambda: compute([name], get_col_comments)
+            )
+            + self._schema_cache.sample_store.block(self._engine, self._schema, name)
+            for name in names
+        )
+
+
+class SchemaCache:
+    def __init__(
+        self,
+        ttl: int,
+        path: Optional[str] = None,
+        sample_store: Optional[SampleRowStore] = None,
+    ):
+        self.ttl = ttl
+        self.path = path
+        self.sample_store = sample_store or SampleRowStore(
+            settings.sample_rows_in_table_info
+        )
+        self._lock = threading.Lock()
+        # (url, schéma) -> (SQLDatabase, expires_at)
+        self._databases: Dict[Tuple[str, str], Tuple[SQLDatabase, float]] = {}
+        # "schéma|tables" -> {"text": ..., "expires_at": ...}
+        self._table_infos: Dict[str, Dict] = self._load()
+        # Réflexions en cours, une par clé
+        self._flight = SingleFlight()
+        # Incrémenté à chaque invalidation
+        self._generation = 0
+
+    def get_db(self, engine: Engine, schema: str) -> SQLDatabase:
+        """SQLDatabase partagé par le processus, reconstruit après le TTL"""
+        key = (str(engine.url), schema)
+        with self._lock:
+            cached = self._databases.get(key)
+            if cached is not None and cached[1] > time.time():
+                return cached[0]
+            db = CachedSQLDatabase(engine, schema, self)
+            self._databases[key] = (db, time.time() + self.ttl)
+            logger.info("Schema metadata loaded", schema=schema)
+            return db
+
+    def table_info(
+        self,
+        schema: str,
+        table_names: Optional[List[str]],
+        compute: Callable[[], str],
+    ) -> str:
+        """Texte table_info mémorisé ; compute n'est appelé qu'en cas de miss"""
+        key = f"{schema}|{','.join(sorted(table_names)) if table_names else '*'}"
+        text = self._cached_table_info(key)
+        if text is not None:
+            return text
+        # Réflexion hors verrou : une seule par clé même en cas d'afflux, les
+        # tables déjà en cache restent servies pendant ce temps
+        return self._flight.do(key, lambda: self._compute_table_info(key, compute))
+
+    def _cached_table_info(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._table_infos.get(key)
+            if entry is not None and entry["expires_at"] > time.time():
+                return entry["text"]
+            return None
+
+    def _compute_table_info(self, key: str, compute: Callable[[], str]) -> str:
+        """Leader du single-flight : calcule puis mémorise le texte"""
+        # Un autre leader a pu terminer entre la lecture et notre tour
+        text = self._cached_table_info(key)
+        if text is not None:
+            return text
+        generation = self._generation
+        text = compute()
+        with self._lock:
+            # Schéma invalidé pendant le calcul : le texte n'est pas gardé
+            if generation == self._generation:
+                self._table_infos[key] = {
+                    "text": text,
+                    "expires_at": time.time() + self.ttl,
+                }
+                self._save()
+        return text
+
+    def invalidate(self) -> None:
+        """Oublie les métadonnées (schéma modifié) ; le prochain appel recharge"""
+        with self._lock:
+            self._generation += 1
+            self._databases.clear()
+            self._table_infos.clear()
+            self._save()
+        self.sample_store.invalidate()
+        logger.info("Schema cache invalidated")
+
+    def _load(self) -> Dict[str, Dict]:
+        """Charge les table_info persistés encore valides"""
+        if not self.path or not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                entries = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning("Schema cache file unreadable", error=str(e))
+            return {}
+        now = time.time()
+        return {k: v for k, v in entries.items() if v.get("expires_at", 0) > now}
+
+    def _save(self) -> None:
+        """Persiste les table_info (écriture atomique, verrou déjà pris)"""
+        if not self.path:
+            return
+        try:
+            write_json_atomic(self.path, self._table_infos)
+        except OSError as e:
+            logger.warning("Schema cache file not saved", error=str(e))
+
+
+# Instance globale
+schema_cache = SchemaCache(
+    settings.schema_cache_ttl, settings.schema_cache_path, sample_rows
+)
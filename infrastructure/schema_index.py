@@ -0,0 +1,167 @@
+"""
+Index local des tables pour élaguer le schéma envoyé au LLM
+BM25 sur des n-grammes de caractères (adapté au japonais, sans espaces) des
+noms de tables et colonnes, de leurs commentaires et de synonymes japonais
+"""
+
+import math
+import re
+import threading
+import unicodedata
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import inspect
+from sqlalchemy.engine import Engine
+from infrastructure.circuit_breaker import is_db_failure
+from infrastructure.settings import settings
+from infrastructure.logging import logger
+
+# Vocabulaire métier japonais par nom de table ou de colonne
+SYNONYMS: Dict[str, List[str]] = {
+    "sold_cars": ["成約", "成約台数", "販売", "売れた", "売上", "販売台数"],
+    "display_cars": ["掲載", "掲載台数", "在庫", "展示", "出品"],
+    "clients": ["クライアント", "顧客", "加盟店", "販売店", "店舗"],
+    "estimates": ["見積", "見積もり", "査定"],
+    "calls": ["電話", "架電", "入電", "通話", "問い合わせ"],
+    "reservations": ["予約", "来店", "来店予約"],
+    "car_effects": ["車両", "反響", "閲覧", "効果"],
+    "client_effects": ["クライアント", "反響", "効果"],
+    "salesforce_account": ["取引先", "アカウント", "契約"],
+    "prefecture_name": ["都道府県", "県", "地域"],
+    "city_name": ["市区町村", "市", "区", "町", "村"],
+    "price": ["価格", "金額", "値段"],
+    "maker_name": ["メーカー", "ブランド"],
+    "car_name": ["車種", "車名", "モデル"],
+    "mileage": ["走行距離"],
+    "model_year": ["年式"],
+}
+
+_SEPARATORS = re.compile(r"[\s_.,:;()/\[\]「」、。・]+")
+
+
+def register_synonyms(name: str, terms: List[str]) -> None:
+    """Ajoute des synonymes pour une table ou une colonne"""
+    SYNONYMS.setdefault(name, []).extend(terms)
+
+
+def tokenize(text: str, sizes: Tuple[int, ...] = (2, 3)) -> List[str]:
+    """Mots ASCII entiers + n-grammes de caractères de chaque segment"""
+    tokens: List[str] = []
+    for segment in _SEPARATORS.split(unicodedata.normalize("NFKC", text).lower()):
+        if not segment:
+            continue
+        if segment.isascii() or len(segment) == 1:
+            tokens.append(segment)
+        for n in sizes:
+            tokens.extend(segment[i : i + n] for i in range(len(segment) - n + 1))
+    return tokens
+
+
+class SchemaIndex:
+    def __init__(self, documents: Dict[str, str], k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._tf = {name: Counter(tokenize(doc)) for name, doc in documents.items()}
+        self._length = {name: sum(tf.values()) for name, tf in self._tf.items()}
+        self._avg_length = sum(self._length.values()) / max(len(self._tf), 1) or 1.0
+        df: Counter = Counter()
+        for tf in self._tf.values():
+            df.update(tf.keys())
+        total = len(self._tf)
+        self._idf = {
+            term: math.log(1 + (total - n + 0.5) / (n + 0.5)) for term, n in df.items()
+        }
+
+    @property
+    def tables(self) -> List[str]:
+        return list(self._tf)
+
+    def scores(self, question: str) -> Dict[str, float]:
+        """Score BM25 de chaque table pour la question"""
+        terms = set(tokenize(question))
+        scores = {}
+        for name, tf in self._tf.items():
+            norm = self.k1 * (
+                1 - self.b + self.b * self._length[name] / self._avg_length
+            )
+            scores[name] = sum(
+                self._idf[term] * tf[term] * (self.k1 + 1) / (tf[term] + norm)
+                for term in terms
+                if term in tf
+            )
+        return scores
+
+    def search(self, question: str, top_k: int) -> List[str]:
+        """Les top_k tables pertinentes (score > 0), de la plus pertinente à la moins"""
+        ranked = sorted(self.scores(question).items(), key=lambda x: (-x[1], x[0]))
+        return [name for name, score in ranked[:top_k] if score > 0]
+
+
+def build_documents(engine: Engine, schema: str) -> Dict[str, str]:
+    """Document texte par table : nom, commentaires, colonnes et synonymes"""
+    inspector = inspect(engine)
+    documents = {}
+    for table in inspector.get_table_names(schema=schema):
+        parts = [table, *SYNONYMS.get(table, [])]
+        try:
+            comment = inspector.get_table_comment(table, schema=schema).get("text")
+        except NotImplementedError:
+            comment = None
+        if comment:
+            parts.append(comment)
+        for column in inspector.get_columns(table, schema=schema):
+            parts.append(column["name"])
+            if column.get("comment"):
+                parts.append(column["comment"])
+            parts.extend(SYNONYMS.get(column["name"], []))
+        documents[table] = " ".join(parts)
+    return documents
+
+
+class TableSelector:
+    def __init__(self, top_k: int):
+        # Nombre de tables envoyées au LLM (0 = schéma complet)
+        self.top_k = top_k
+        self._lock = threading.Lock()
+        self._indexes: Dict[Tuple[str, str], SchemaIndex] = {}
+
+    def _index_for(self, engine: Engine, schema: str) -> SchemaIndex:
+        """Index construit une fois par processus (une réflexion du catalogue)"""
+        key = (str(engine.url), schema)
+        with self._lock:
+            index = self._indexes.get(key)
+            if index is None:
+                index = SchemaIndex(build_documents(engine, schema))
+                self._indexes[key] = index
+                logger.info(
+                    "Schema index built", schema=schema, tables=len(index.tables)
+                )
+            return index
+
+    def select(self, engine: Engine, schema: str, question: str) -> Optional[List[str]]:
+        """Tables à décrire dans le prompt, ou None pour le schéma complet"""
+        if self.top_k <= 0:
+            return None
+        try:
+            index = self._index_for(engine, schema)
+        except Exception as e:
+            if is_db_failure(e):
+                # Redshift injoignable : compté par le disjoncteur de l'appelant
+                raise
+            # Sans index, le prompt reste complet plutôt que la génération échoue
+            logger.warning("Schema index unavailable", error=str(e))
+            return None
+        tables = index.search(question, self.top_k)
+        if not tables:
+            return None
+        logger.debug("Tables selected", tables=tables)
+        return tables
+
+    def invalidate(self) -> None:
+        """Oublie les index (schéma modifié)"""
+        with self._lock:
+            self._indexes.clear()
+
+
+# Instance globale
+table_selector = TableSelector(settings.schema_top_k)
@@ -33,12 +33,65 @@ class Settings(BaseSettings):
     db_pool_size: int = 10
     db_pool_overflow: int = 20
     db_pool_timeout: int = 30
+    db_warmup_on_start: bool = True
+
+    query_chunk_size: int = 500
+    query_max_display_rows: int = 5000
 
     rate_limit_requests: int = 100
     rate_limit_window: int = 3600
+    rate_limit_session_requests: int = 20
+    rate_limit_max_wait: float = 10.0
 
     redis_url: Optional[str] = None
+    cache_redis_prefix: str = "texttosql:"
+    cache_redis_max_connections: int = 50
+    cache_redis_timeout: float = 0.5
+    cache_redis_retry_interval: int = 30
     cache_ttl: int = 3600
+    cache_max_entries: int = 10000
+    cache_max_bytes: int = 64 * 1024 * 1024
+    cache_shards: int = 16
+    cache_disk_path: Optional[str] = None
+    cache_disk_compact_interval: int = 300
+    cache_sweep_interval: float = 1.0
+    cache_sweep_batch: int = 256
+    cache_stats_log_interval: int = 300
+    schema_fingerprint_ttl: int = 600
+    schema_cache_ttl: int = 3600
+    schema_cache_path: Optional[str] = None
+    sample_rows_in_table_info: int = 3
+    sample_rows_refresh_interval: int = 3600
+    schema_top_k: int = 5
+    llm_pool_size: int = 8
+    llm_provider: str = "gemini"
+    fake_llm_latency: float = 0.5
+    fake_llm_token_latency: float = 0.01
+    llm_streaming: bool = True
+    llm_timeout: float = 30.0
+    llm_first_token_timeout: float = 10.0
+    llm_max_attempts: int = 3
+    llm_retry_wait_max: float = 8.0
+    llm_hedge_enabled: bool = True
+    llm_hedge_min_delay: float = 1.0
+    llm_hedge_budget: float = 0.1
+    llm_call_workers: int = 16
+    circuit_failure_threshold: int = 5
+    circuit_reset_timeout: float = 30.0
+    batch_max_workers: int = 4
+    batch_max_wait: float = 3600.0
+    batch_rate_limit_share: float = 0.5
+    job_workers: int = 8
+    job_retention: int = 600
+    job_poll_interval: float = 0.5
+    warmup_on_start: bool = True
+    warmup_top_n: int = 20
+    warmup_interval: float = 2.0
+    warmup_budget: int = 10
+    warmup_max_wait: float = 600.0
+    question_log_path: Optional[str] = None
+    question_log_save_interval: int = 60
+    batch_max_questions: int = 500
 
     log_level: str = "INFO"
     log_format: str = "json"
@@ -0,0 +1,74 @@
+"""
+Single-flight : regroupe les appels concurrents identiques en un seul
+Les appelants d'une même clé attendent l'unique exécution en cours et
+reçoivent tous son résultat (ou son exception)
+"""
+
+import threading
+from typing import Any, Callable, Dict, Optional
+
+
+class _Call:
+    """Exécution en cours pour une clé"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        # Appelants qui attendent le résultat du leader
+        self.waiters = 0
+
+
+class SingleFlight:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[str, _Call] = {}
+        # Appels servis par l'exécution d'un autre appelant (cumul)
+        self.shared = 0
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Any:
+        """Exécute fn une seule fois pour tous les appelants simultanés de key"""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+            else:
+                call.waiters += 1
+                self.shared += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
+
+    def in_flight(self) -> int:
+        """Nombre de clés en cours d'exécution"""
+        with self._lock:
+            return len(self._calls)
+
+    def stats(self) -> Dict[str, int]:
+        """Clés en cours, appelants en attente et appels partagés"""
+        with self._lock:
+            return {
+                "in_flight": len(self._calls),
+                "waiters": sum(call.waiters for call in self._calls.values()),
+                "shared": self.shared,
+            }
+
+
+# Instance globale pour la génération SQL
+sql_flight = SingleFlight()
@@ -0,0 +1,131 @@
+"""
+Réutilisation du SQL par gabarit de dates
+Une question qui ne diffère d'une précédente que par ses dates réutilise le
+SQL déjà généré en substituant les littéraux de range_date, sans appel LLM
+"""
+
+import re
+from datetime import date
+from typing import Any, List, Optional, Tuple
+from infrastructure.logging import logger
+
+# Dates au format canonique (2025年5月1日) ; l'année peut être héritée (5月7日),
+# l'année suivante si la date recule (2025年12月25日から1月5日 -> 2026-01-05)
+_QUESTION_DATE = re.compile(r"(?:(\d{4})年)?(\d{1,2})月(\d{1,2})日")
+# Littéraux ISO du SQL : to_date('2025-05-01', 'yyyy-mm-dd')
+_SQL_ISO_DATE = re.compile(r"(?<![\d-])\d{4}-\d{2}-\d{2}(?![\d-])")
+# Autres formats de date que la substitution ne saurait pas réécrire
+_SQL_OTHER_DATE = re.compile(r"\d{4}/\d{1,2}/\d{1,2}|(?<!\d)\d{8}(?!\d)")
+
+
+def extract_dates(question: str) -> Optional[Tuple[str, List[date]]]:
+    """
+    Retourne (gabarit, dates) pour une question canonicalisée, ou None si
+    elle ne contient pas de date complète résoluble
+    """
+    dates: List[date] = []
+    year: Optional[int] = None
+
+    def _placeholder(match):
+        nonlocal year
+        if match.group(1):
+            year = int(match.group(1))
+        if year is None:
+            raise ValueError("date without year")
+        value = date(year, int(match.group(2)), int(match.group(3)))
+        if not match.group(1) and dates and value < dates[-1]:
+            # Année héritée : la période passe au 1er janvier suivant
+            year += 1
+            value = date(year, value.month, value.day)
+        dates.append(value)
+        return f"{{d{len(dates) - 1}}}"
+
+    try:
+        template = _QUESTION_DATE.sub(_placeholder, question)
+    except ValueError:
+        # Date sans année ou invalide (2月30日) : pas de gabarit
+        return None
+    if not dates:
+        return None
+    return template, dates
+
+
+def is_templatable(sql: str, dates: List[date]) -> bool:
+    """
+    Vrai si toutes les dates du SQL sont des littéraux ISO issus de la question :
+    une date dérivée (fin + 1 jour), un autre format ou l'année en clair
+    ailleurs dans la requête rendraient la substitution incorrecte
+    """
+    iso_dates = {d.isoformat() for d in dates}
+    if len(iso_dates) != len(dates):
+        return False
+    literals = set(_SQL_ISO_DATE.findall(sql))
+    if literals != iso_dates or _SQL_OTHER_DATE.search(sql):
+        return False
+    remainder = _SQL_ISO_DATE.sub("", sql)
+    return not any(str(d.year) in remainder for d in dates)
+
+
+def _same_order(before: List[date], after: List[date]) -> bool:
+    """
+    Vrai si les nouvelles dates gardent l'ordre des dates du gabarit : une
+    période début -> fin ne doit pas devenir une période inversée (vide)
+    """
+
+    def _direction(first: date, second: date) -> int:
+        return (second > first) - (second < first)
+
+    return all(
+        _direction(before[i], before[i + 1]) * _direction(after[i], after[i + 1]) >= 0
+        for i in range(len(before) - 1)
+    )
+
+
+class DateTemplateCache:
+    def __init__(self, cache: Any):
+        self.cache = cache
+        self.hits = 0
+        self.misses = 0
+
+    def _key(self, template: str, namespace: Optional[str]) -> str:
+        prefix = f"sqltpl:{namespace}" if namespace else "sqltpl"
+        return self.cache._generate_key(prefix, template)
+
+    def remember(
+        self, question: str, sql: str, namespace: Optional[str] = None
+    ) -> bool:
+        """Enregistre le SQL généré comme gabarit si ses dates sont substituables"""
+        extracted = extract_dates(self.cache.canonicalize(question))
+        if extracted is None:
+            return False
+        template, dates = extracted
+        if not is_templatable(sql, dates):
+            logger.debug("SQL not templatable", template=template)
+            return False
+        return self.cache.set(
+            self._key(template, namespace),
+            {"sql": sql, "dates": [d.isoformat() for d in dates]},
+        )
+
+    def reuse(self, question: str, namespace: Optional[str] = None) -> Optional[str]:
+        """Construit le SQL d'une question à partir d'un gabarit connu"""
+        extracted = extract_dates(self.cache.canonicalize(question))
+        if extracted is None:
+            return None
+        template, dates = extracted
+        entry = self.cache.get(self._key(template, namespace))
+        if not entry or len(entry["dates"]) != len(dates):
+            self.misses += 1
+            return None
+        if not _same_order([date.fromisoformat(d) for d in entry["dates"]], dates):
+            # Dates dans un autre ordre que le SQL connu : le LLM tranche
+            logger.info("Date template order mismatch", template=template)
+            self.misses += 1
+            return None
+
+        mapping = dict(zip(entry["dates"], (d.isoformat() for d in dates)))
+        # Substitution en une passe : pas de réécriture en chaîne
+        sql = _SQL_ISO_DATE.sub(lambda m: mapping[m.group(0)], entry["sql"])
+        self.hits += 1
+        logger.info("SQL reused from date template", template=template)
+        return sql
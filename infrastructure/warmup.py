@@ -0,0 +1,187 @@
+"""
+Préchargement du cache SQL au démarrage (hors du chemin des requêtes)
+- journal de fréquence des questions posées (forme canonique), persisté en JSON
+- génération en arrière-plan des questions d'exemple puis des N questions
+  les plus fréquentes, espacée et bornée par un budget d'appels LLM explicite
+  (débité du quota global en attendant les jetons, sans seau de session)
+"""
+
+import json
+import os
+import threading
+import time
+from typing import Dict, List, Optional
+from infrastructure.cache import cache_manager
+from infrastructure.circuit_breaker import CircuitOpenError
+from infrastructure.generation import generate_sql, sql_fingerprint
+from infrastructure.json_file import write_json_atomic
+from infrastructure.llm import DEFAULT_LLM_CONFIG
+from infrastructure.rate_limit import RateLimitExceeded
+from infrastructure.settings import settings
+from infrastructure.logging import logger
+
+# Questions des boutons d'exemple (clé de traduction du libellé -> question)
+EXAMPLE_QUESTIONS = {
+    "example_prefecture_sales": (
+        "2025年5月1日から5月7日までの都道府県別の成約台数と掲載台数を集計して。"
+    ),
+    "example_city_label": (
+        "2025年5月1日時点で北海道の市区町村ごとのクライアント数をラベル"
+        "（市・区・町・村・不明）別に集計して。"
+    ),
+}
+
+
+class QuestionLog:
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        save_interval: float = 60.0,
+        max_entries: int = 5000,
+    ):
+        self.path = path
+        # Délai minimal entre deux écritures du fichier
+        self.save_interval = save_interval
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        # Forme canonique -> {"question": dernière formulation, "count": n}
+        self._entries: Dict[str, Dict] = self._load()
+        self._saved_at = time.time()
+
+    def record(self, question: str) -> None:
+        """Compte une question posée depuis l'interface"""
+        key = cache_manager.canonicalize(question)
+        with self._lock:
+            entry = self._entries.setdefault(key, {"question": question, "count": 0})
+            entry["question"] = question
+            entry["count"] += 1
+            if len(self._entries) > self.max_entries:
+                # Les questions les plus rares sont oubliées
+                rarest = min(self._entries, key=lambda k: self._entries[k]["count"])
+                del self._entries[rarest]
+            if time.time() - self._saved_at >= self.save_interval:
+                self._save()
+
+    def top(self, n: int) -> List[str]:
+        """Les n questions les plus fréquentes"""
+        with self._lock:
+            entries = sorted(self._entries.values(), key=lambda e: -e["count"])
+        return [entry["question"] for entry in entries[:n]]
+
+    def save(self) -> None:
+        with self._lock:
+            self._save()
+
+    def _load(self) -> Dict[str, Dict]:
+        if not self.path or not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning("Question log unreadable", error=str(e))
+            return {}
+
+    def _save(self) -> None:
+        """Persiste le journal (écriture atomique, verrou déjà pris)"""
+        self._saved_at = time.time()
+        if not self.path:
+            return
+        try:
+            write_json_atomic(self.path, self._entries)
+        except OSError as e:
+            logger.warning("Question log not saved", error=str(e))
+
+
+class CacheWarmer:
+    def __init__(
+        self,
+        log: QuestionLog,
+        top_n: int = 20,
+        interval: float = 2.0,
+        budget: int = 10,
+        max_wait: float = 600.0,
+    ):
+        self.log = log
+        self.top_n = top_n
+        # Pause après chaque appel LLM (les réponses déjà en cache n'attendent pas)
+        self.interval = interval
+        # Appels LLM au plus par démarrage (part du quota global laissée aux
+        # utilisateurs) et attente maximale d'un jeton de ce quota
+        self.budget = budget
+        self.max_wait = max_wait
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def questions(self) -> List[str]:
+        """Questions d'exemple puis les plus fréquentes, sans doublon canonique"""
+        questions, seen = [], set()
+        for question in [*EXAMPLE_QUESTIONS.values(), *self.log.top(self.top_n)]:
+            key = cache_manager.canonicalize(question)
+            if key not in seen:
+                seen.add(key)
+                questions.append(question)
+        return questions
+
+    def run(self) -> Dict[str, int]:
+        """Précharge les questions avec les réglages de session par défaut"""
+        counts = {"cached": 0, "generated": 0, "failed": 0}
+        # Somme du schéma lue d'abord : sans elle, le SQL serait rangé sous
+        # l'espace de noms du schéma inconnu, abandonné dès qu'elle arrive
+        if sql_fingerprint.refresh() is None:
+            logger.warning("Cache warm-up skipped, schema checksum unavailable")
+            return counts
+        for question in self.questions():
+            if self._stop.is_set():
+                break
+            if counts["generated"] + counts["failed"] >= self.budget:
+                logger.info("Cache warm-up budget spent", budget=self.budget)
+                break
+            try:
+                _, from_cache = generate_sql(
+                    question, DEFAULT_LLM_CONFIG, max_wait=self.max_wait
+                )
+            except (RateLimitExceeded, CircuitOpenError) as e:
+                # Quota ou dépendance en difficulté : les utilisateurs passent d'abord
+                logger.warning("Cache warm-up stopped", error=str(e))
+                break
+            except Exception as e:
+                counts["failed"] += 1
+                logger.warning(
+                    "Cache warm-up question failed",
+                    question=question[:50],
+                    error=str(e),
+                )
+                continue
+            if from_cache:
+                counts["cached"] += 1
+            else:
+                counts["generated"] += 1
+                self._stop.wait(self.interval)
+        logger.info("Cache warm-up finished", **counts)
+        return counts
+
+    def start(self) -> None:
+        """Lance le préchargement une seule fois par processus (thread démon)"""
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(
+            target=self.run, name="cache-warm-up", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+
+# Instances globales, partagées par toutes les sessions
+question_log = QuestionLog(
+    settings.question_log_path, settings.question_log_save_interval
+)
+cache_warmer = CacheWarmer(
+    question_log,
+    settings.warmup_top_n,
+    settings.warmup_interval,
+    settings.warmup_budget,
+    settings.warmup_max_wait,
+)
@@ -14,7 +14,12 @@ from ui.styles.themes import load_custom_css, apply_theme
 
 # Imports pour l'initialisation
 from langue.translator import set_language
+from infrastructure.database import connect_to_redshift, db_manager
+from infrastructure.llm import SQL_SCHEMA
+from infrastructure.sample_rows import sample_rows
+from infrastructure.warmup import cache_warmer
 from infrastructure.logging import logger
+from infrastructure.settings import settings
 
 
 def initialize_app():
@@ -38,6 +43,18 @@ def initialize_app():
     # Chargement des styles personnalisés
     load_custom_css()
 
+    # Connexion Redshift préparée en arrière-plan (ne bloque pas le rendu)
+    if settings.db_warmup_on_start:
+        db_manager.warm_up()
+        # Instantané des lignes d'exemple du prompt, rafraîchi périodiquement
+        sample_rows.start_refresh(
+            connect_to_redshift, SQL_SCHEMA, settings.sample_rows_refresh_interval
+        )
+
+    # Cache SQL préchargé en arrière-plan (exemples et questions fréquentes)
+    if settings.warmup_on_start:
+        cache_warmer.start()
+
     # Log de démarrage
     logger.info("Streamlit application started")
 
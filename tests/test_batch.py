@@ -0,0 +1,173 @@
+import csv
+import io
+import threading
+import time
+from unittest.mock import Mock, patch
+from infrastructure import batch, generation
+from infrastructure.cache import CacheManager
+from infrastructure.rate_limit import LocalRateLimiter, RateLimitExceeded
+from infrastructure.sql_templates import DateTemplateCache
+
+
+def test_parse_questions_text():
+    """Test une question par ligne, lignes vides ignorées"""
+    assert batch.parse_questions("q1\n\n  q2  \n") == ["q1", "q2"]
+
+
+def test_parse_questions_csv_header():
+    """Test la colonne « question » d'un CSV avec en-tête"""
+    text = 'id,Question\n1,"成約台数, 都道府県別"\n2,掲載台数\n'
+    assert batch.parse_questions(text, is_csv=True) == [
+        "成約台数, 都道府県別",
+        "掲載台数",
+    ]
+
+
+def test_parse_questions_csv_first_column():
+    """Test la première colonne d'un CSV sans en-tête"""
+    assert batch.parse_questions("q1,x\nq2,y\n", is_csv=True) == ["q1", "q2"]
+
+
+def test_dedupe_questions_canonical():
+    """Test que les variantes canoniques ne sont générées qu'une fois"""
+    unique, mapping = batch.dedupe_questions(["成約台数", "成約台数 ", "掲載台数"])
+    assert unique == ["成約台数", "掲載台数"]
+    assert mapping == [0, 0, 1]
+
+
+def test_run_batch_order_and_duplicates():
+    """Test un résultat par question d'origine, dans l'ordre d'entrée"""
+    with patch.object(
+        batch, "generate_sql", side_effect=lambda q, *a, **k: (f"SELECT '{q}';", False)
+    ) as generate:
+        results = batch.run_batch(["a", "b", "a"], max_workers=2)
+    assert [r["question"] for r in results] == ["a", "b", "a"]
+    assert results[2]["sql"] == "SELECT 'a';"
+    assert generate.call_count == 2
+
+
+def test_run_batch_bounded_concurrency():
+    """Test que le nombre de générations simultanées est borné"""
+    lock = threading.Lock()
+    active, peak = [0], [0]
+
+    def _generate(question, *args, **kwargs):
+        with lock:
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+        time.sleep(0.02)
+        with lock:
+            active[0] -= 1
+        return "SELECT 1;", False
+
+    with patch.object(batch, "generate_sql", side_effect=_generate):
+        batch.run_batch([f"q{i}" for i in range(12)], max_workers=3)
+    assert peak[0] == 3
+
+
+def test_run_batch_errors_do_not_stop_batch():
+    """Test qu'une question en erreur (quota, LLM) n'arrête pas le lot"""
+
+    def _generate(question, *args, **kwargs):
+        if question == "b":
+            raise RateLimitExceeded(30)
+        return "SELECT 1;", True
+
+    with patch.object(batch, "generate_sql", side_effect=_generate):
+        results = batch.run_batch(["a", "b", "c"])
+    assert [bool(r["error"]) for r in results] == [False, True, False]
+
+
+def test_batch_rows_use_batch_bucket():
+    """Test que le lot attend le seau des lots sans débiter celui de la session"""
+    with patch.object(
+        batch, "generate_sql", return_value=("SELECT 1;", False)
+    ) as generate:
+        batch.run_batch(["a"], session_id="s1")
+    assert generate.call_args.kwargs == {
+        "max_wait": batch.settings.batch_max_wait,
+        "batch": True,
+    }
+
+
+def test_interactive_quota_left_while_batch_runs(monkeypatch):
+    """Test qu'une question interactive obtient un jeton pendant un lot"""
+    monkeypatch.setattr(generation, "cache_manager", CacheManager(sweep_interval=0))
+    monkeypatch.setattr(
+        generation, "sql_fingerprint", Mock(current=Mock(return_value="base:params"))
+    )
+    monkeypatch.setattr(
+        generation, "date_templates", DateTemplateCache(generation.cache_manager)
+    )
+    # Quota global de 3 appels, dont 2 au plus pour les lots
+    monkeypatch.setattr(generation, "llm_rate_limiter", LocalRateLimiter(3, 3600))
+    monkeypatch.setattr(generation, "batch_rate_limiter", LocalRateLimiter(2, 3600))
+    monkeypatch.setattr(batch.settings, "batch_max_wait", 0)
+    release = threading.Event()
+    started = []
+
+    def _run(question, *args):
+        if question.startswith("q"):
+            started.append(question)
+            release.wait(5)
+        return "SELECT 1;"
+
+    with patch.object(generation, "_run_sql_chain", side_effect=_run):
+        rows = {}
+        worker = threading.Thread(
+            target=lambda: rows.update(
+                enumerate(batch.run_batch([f"q{i}" for i in range(4)], max_workers=4))
+            )
+        )
+        worker.start()
+        deadline = time.monotonic() + 5
+        while len(started) < 2 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        # Lot en cours : le quota global n'est pas épuisé par le lot
+        assert generation.generate_sql("interactive", session_id="s1") == (
+            "SELECT 1;",
+            False,
+        )
+        release.set()
+        worker.join(5)
+    assert sum(not row["error"] for row in rows.values()) == 2
+
+
+def test_iter_batch_streams_progress():
+    """Test que chaque résultat est produit dès qu'il est prêt"""
+    with patch.object(batch, "generate_sql", return_value=("SELECT 1;", False)):
+        indexes = [index for index, _ in batch.iter_batch(["a", "b", "c"])]
+    assert sorted(indexes) == [0, 1, 2]
+
+
+def test_iter_batch_close_cancels_queued_questions():
+    """Test qu'un lot abandonné n'attend pas et n'envoie plus de questions"""
+    release = threading.Event()
+    calls = []
+
+    def _generate(question, *args, **kwargs):
+        calls.append(question)
+        if question != "q0":
+            release.wait(1)
+        return "SELECT 1;", False
+
+    with patch.object(batch, "generate_sql", side_effect=_generate):
+        rows = batch.iter_batch([f"q{i}" for i in range(12)], max_workers=2)
+        assert next(rows)[0] == 0
+        start = time.monotonic()
+        rows.close()
+        assert time.monotonic() - start < 0.5
+        release.set()
+        time.sleep(0.05)
+    assert len(calls) < 12
+
+
+def test_results_to_csv():
+    """Test l'export CSV (BOM pour Excel, SQL multiligne préservé)"""
+    rows = [
+        {"question": "q", "sql": "SELECT 1\nLIMIT 10;", "from_cache": True, "error": ""}
+    ]
+    content = batch.results_to_csv(rows)
+    assert content.startswith("\ufeff")
+    parsed = list(csv.DictReader(io.StringIO(content.lstrip("\ufeff"))))
+    assert parsed[0]["sql"] == "SELECT 1\nLIMIT 10;"
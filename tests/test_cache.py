@@ -1,12 +1,15 @@
 import pytest
+import threading
 import time
+from unittest.mock import patch
 from infrastructure.cache import CacheManager
 
 
 @pytest.fixture
 def cache():
     """Fixture pour créer une instance propre du CacheManager pour chaque test"""
-    return CacheManager()
+    # Sans purge de fond : les tests d'expiration restent déterministes
+    return CacheManager(sweep_interval=0)
 
 
 def test_cache_set_and_get(cache):
@@ -64,3 +67,176 @@ def test_cache_overwrite(cache):
     cache.set("test_key", "value1")
     cache.set("test_key", "value2")
     assert cache.get("test_key") == "value2"
+
+
+def test_cache_lru_eviction_by_entries():
+    """Test l'éviction LRU quand le nombre max d'entrées est atteint"""
+    cache = CacheManager(max_entries=2, max_bytes=0, shards=1)
+    cache.set("a", "1")
+    cache.set("b", "2")
+    # "a" devient la plus récemment utilisée
+    assert cache.get("a") == "1"
+    cache.set("c", "3")
+
+    assert cache.get("b") is None
+    assert cache.get("a") == "1"
+    assert cache.get("c") == "3"
+    assert cache.evictions == 1
+    assert len(cache) == 2
+
+
+def test_cache_lru_eviction_by_bytes():
+    """Test l'éviction quand le budget mémoire est dépassé"""
+    cache = CacheManager(max_entries=0, max_bytes=2000, shards=1)
+    for i in range(20):
+        cache.set(f"key{i}", "x" * 200)
+
+    assert cache.current_bytes <= 2000
+    assert cache.get("key19") is not None
+    assert cache.get("key0") is None
+
+
+def test_cache_oversized_item_rejected():
+    """Test qu'une valeur plus grosse que le budget n'est pas stockée"""
+    cache = CacheManager(max_entries=0, max_bytes=500, shards=1)
+    assert cache.set("big", "x" * 1000) is False
+    assert cache.get("big") is None
+    assert cache.current_bytes == 0
+
+
+def test_cache_overwrite_keeps_byte_count(cache):
+    """Test que l'écrasement ne compte pas deux fois la taille"""
+    cache.set("test_key", "value")
+    size = cache.current_bytes
+    cache.set("test_key", "value")
+    assert cache.current_bytes == size
+
+
+def test_cache_concurrent_stress():
+    """Test de charge : plusieurs threads lisent et écrivent en parallèle"""
+    cache = CacheManager(max_entries=200, max_bytes=0, shards=8)
+    errors = []
+    start = threading.Barrier(16)
+
+    def worker(worker_id):
+        try:
+            start.wait()
+            for i in range(2000):
+                query = f"question {(worker_id * 7 + i) % 500}"
+                cache.cache_sql_result(query, f"SELECT {query}")
+                cached = cache.get_cached_sql_result(query)
+                # Une entrée peut être évincée, mais jamais corrompue
+                assert cached in (None, f"SELECT {query}")
+        except Exception as e:  # pragma: no cover - remonté via la liste
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(16)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert errors == []
+    assert len(cache) <= 200
+    # La comptabilité mémoire reste cohérente avec le contenu réel
+    assert cache.current_bytes == sum(
+        item["size"] for shard in cache._shards for item in shard.entries.values()
+    )
+
+
+def test_sql_cache_canonical_variants(cache):
+    """Test que les variantes d'une question partagent la même entrée"""
+    cache.cache_sql_result("2025年5月1日の台数を集計して。", "SELECT 1;")
+
+    assert (
+        cache.get_cached_sql_result("２０２５年５月１日の台数を集計して") == "SELECT 1;"
+    )
+    assert cache.get_cached_sql_result("2025年5月1日の台数を集計して。") == "SELECT 1;"
+    assert cache.get_cached_sql_result("2025年5月2日の台数を集計して") is None
+
+    stats = cache.stats()
+    assert stats["hits"] == 2
+    assert stats["misses"] == 1
+    # Seule la variante pleine chasse doit son hit à la canonicalisation
+    assert stats["canonical_hits"] == 1
+    assert stats["hit_rate"] == pytest.approx(2 / 3)
+
+
+def test_sweep_expired_reclaims_cold_keys():
+    """Test que la purge active retire les clés expirées jamais relues"""
+    cache = CacheManager(shards=2, sweep_interval=0)
+    cache.set("cold", "value", ttl=1)
+    cache.set("hot", "value", ttl=60)
+    time.sleep(1.1)
+
+    assert cache.sweep_expired() == 1
+    assert len(cache) == 1
+    assert cache.stats()["expired_reclaimed"] == 1
+
+
+def test_sweep_expired_is_incremental():
+    """Test que chaque passe est bornée par le budget"""
+    cache = CacheManager(shards=1, sweep_interval=0)
+    for i in range(10):
+        cache.set(f"key{i}", "value", ttl=1)
+    time.sleep(1.1)
+
+    assert cache.sweep_expired(budget=4) == 4
+    assert cache.sweep_expired(budget=4) == 4
+    assert cache.sweep_expired(budget=4) == 2
+    assert len(cache) == 0
+
+
+def test_sweep_ignores_overwritten_entries():
+    """Test qu'une clé réécrite avec un TTL plus long n'est pas purgée"""
+    cache = CacheManager(shards=1, sweep_interval=0)
+    cache.set("key", "old", ttl=1)
+    cache.set("key", "new", ttl=60)
+    time.sleep(1.1)
+
+    assert cache.sweep_expired() == 0
+    assert cache.get("key") == "new"
+
+
+def test_background_sweeper():
+    """Test que le thread de fond purge sans lecture de la clé"""
+    cache = CacheManager(sweep_interval=0.1)
+    cache.set("cold", "value", ttl=1)
+    time.sleep(1.5)
+    assert len(cache) == 0
+    cache.close()
+
+
+def test_cache_stats_counters(cache):
+    """Test les compteurs d'expiration et les histogrammes de latence"""
+    cache.set("short", "value", ttl=1)
+    cache.get("short")
+    time.sleep(1.1)
+    assert cache.get("short") is None
+
+    stats = cache.stats()
+    assert stats["expirations"] == 1
+    assert stats["get_latency"]["count"] == 2
+    assert stats["set_latency"]["count"] == 1
+    assert stats["get_latency"]["p99_ms"] > 0
+
+
+def test_cache_log_stats(cache):
+    """Test l'émission des statistiques dans les logs structurés"""
+    with patch("infrastructure.cache.logger") as mock_logger:
+        cache.log_stats()
+    assert mock_logger.info.call_args[0][0] == "Cache stats"
+    assert "hit_rate" in mock_logger.info.call_args[1]
+
+
+def test_sql_namespaces_and_prefix_invalidation(cache):
+    """Test l'isolation des espaces de noms et l'invalidation ciblée"""
+    cache.cache_sql_result("question", "SELECT old;", "v1:p")
+    cache.cache_sql_result("question", "SELECT new;", "v2:p")
+    cache.set("other", "value")
+
+    assert cache.get_cached_sql_result("question", "v1:p") == "SELECT old;"
+    assert cache.invalidate_prefix("sql:v1:") == 1
+    assert cache.get_cached_sql_result("question", "v1:p") is None
+    assert cache.get_cached_sql_result("question", "v2:p") == "SELECT new;"
+    assert cache.get("other") == "value"
@@ -0,0 +1,152 @@
+import multiprocessing
+import time
+import pytest
+from unittest.mock import Mock
+from infrastructure.cache import CacheManager
+from infrastructure.cache_backends import SQLiteBackend
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    """Chemin de base SQLite temporaire"""
+    return str(tmp_path / "cache" / "sql_cache.db")
+
+
+@pytest.fixture
+def backend(db_path):
+    """Tier SQLite sans compaction en arrière-plan"""
+    backend = SQLiteBackend(db_path)
+    yield backend
+    backend.close()
+
+
+def test_sqlite_set_and_get(backend):
+    """Test l'écriture et la lecture du tier SQLite"""
+    expires_at = time.time() + 60
+    assert backend.set("sql:1", {"sql": "SELECT 1"}, expires_at) is True
+    assert backend.get("sql:1") == ({"sql": "SELECT 1"}, expires_at)
+    assert backend.get("sql:missing") is None
+
+
+def test_sqlite_expired_entries_not_returned(backend):
+    """Test que les lectures ignorent les entrées expirées"""
+    backend.set("sql:old", "SELECT 1", time.time() - 1)
+    assert backend.get("sql:old") is None
+
+
+def test_sqlite_compact(backend):
+    """Test que la compaction supprime uniquement les entrées expirées"""
+    backend.set("sql:old", "SELECT 1", time.time() - 1)
+    backend.set("sql:new", "SELECT 2", time.time() + 60)
+    assert backend.compact() == 1
+    assert backend.get("sql:new") is not None
+
+
+def test_sqlite_non_serializable_value(backend):
+    """Test qu'une valeur non sérialisable est refusée sans erreur"""
+    assert backend.set("sql:obj", object(), time.time() + 60) is False
+
+
+def test_cache_survives_restart(db_path):
+    """Test qu'un nouveau CacheManager retrouve le cache persisté"""
+    first = CacheManager(backend=SQLiteBackend(db_path))
+    first.cache_sql_result("question", "SELECT 1;")
+
+    # Nouveau processus simulé : L1 vide, même fichier L2
+    second = CacheManager(backend=SQLiteBackend(db_path))
+    assert second.get_cached_sql_result("question") == "SELECT 1;"
+    assert second.stats()["backend_hits"] == 1
+
+    # La valeur a été promue en L1
+    assert second.get_cached_sql_result("question") == "SELECT 1;"
+    assert second.stats()["backend_hits"] == 1
+
+
+def _write_entries(path, worker_id):
+    backend = SQLiteBackend(path)
+    for i in range(50):
+        backend.set(f"sql:{worker_id}:{i}", f"SELECT {i}", time.time() + 60)
+    backend.close()
+
+
+def test_sqlite_shared_between_processes(db_path):
+    """Test des écritures concurrentes depuis plusieurs processus"""
+    SQLiteBackend(db_path).close()
+    processes = [
+        multiprocessing.Process(target=_write_entries, args=(db_path, n))
+        for n in range(4)
+    ]
+    for p in processes:
+        p.start()
+    for p in processes:
+        p.join()
+        assert p.exitcode == 0
+
+    backend = SQLiteBackend(db_path)
+    assert all(
+        backend.get(f"sql:{n}:{i}") is not None for n in range(4) for i in range(50)
+    )
+    backend.close()
+
+
+@pytest.fixture
+def redis_backend():
+    """Tier Redis branché sur fakeredis"""
+    fakeredis = pytest.importorskip("fakeredis")
+    from infrastructure.cache_backends import RedisBackend
+
+    return RedisBackend(client=fakeredis.FakeRedis(), prefix="test:")
+
+
+def test_redis_set_and_get(redis_backend):
+    """Test l'écriture et la lecture du tier Redis"""
+    expires_at = time.time() + 60
+    assert redis_backend.set("sql:1", "SELECT 1", expires_at) is True
+    assert redis_backend.get("sql:1") == ("SELECT 1", expires_at)
+    # TTL posé côté serveur
+    assert 0 < redis_backend.client.pttl("test:sql:1") <= 60000
+
+
+def test_redis_get_many(redis_backend):
+    """Test la lecture groupée en un seul aller-retour"""
+    redis_backend.set("a", "1", time.time() + 60)
+    redis_backend.set("b", "2", time.time() + 60)
+    found = redis_backend.get_many(["a", "b", "c"])
+    assert {key: value for key, (value, _) in found.items()} == {"a": "1", "b": "2"}
+
+
+def test_redis_shared_between_replicas(redis_backend):
+    """Test que deux réplicas partagent le même cache Redis"""
+    first = CacheManager(backend=redis_backend)
+    second = CacheManager(backend=redis_backend)
+    first.cache_sql_result("question", "SELECT 1;")
+    assert second.get_cached_sql_result("question") == "SELECT 1;"
+    assert second.get_many([second.sql_key("question"), "sql:missing"]) == {
+        second.sql_key("question"): "SELECT 1;"
+    }
+
+
+def test_redis_unreachable_falls_back_to_memory():
+    """Test le repli sur la mémoire quand Redis est injoignable"""
+    redis = pytest.importorskip("redis")
+    from infrastructure.cache_backends import RedisBackend
+
+    client = Mock()
+    client.mget.side_effect = redis.ConnectionError("down")
+    client.set.side_effect = redis.ConnectionError("down")
+    backend = RedisBackend(client=client, retry_interval=60)
+    cache = CacheManager(backend=backend)
+
+    cache.cache_sql_result("question", "SELECT 1;")
+    assert backend.available is False
+    assert cache.get_cached_sql_result("question") == "SELECT 1;"
+    assert cache.get_cached_sql_result("other") is None
+    # Pendant le repli, Redis n'est plus sollicité
+    client.mget.assert_not_called()
+
+
+def test_sqlite_get_many(backend):
+    """Test la lecture groupée du tier SQLite"""
+    backend.set("a", "1", time.time() + 60)
+    backend.set("b", "2", time.time() - 1)
+    assert list(backend.get_many(["a", "b", "c"])) == ["a"]
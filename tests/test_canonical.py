@@ -0,0 +1,58 @@
+import pytest
+from infrastructure.canonical import (
+    canonicalize_question,
+    fold_whitespace,
+    normalize_dates,
+    normalize_japanese_numbers,
+)
+
+QUESTION = "2025年5月1日から5月7日までの都道府県別の成約台数と掲載台数を集計して"
+
+
+@pytest.mark.parametrize(
+    "variant",
+    [
+        QUESTION,
+        QUESTION + "。",
+        QUESTION + "  ",
+        "２０２５年５月１日から５月７日までの都道府県別の成約台数と掲載台数を集計して。",
+        "2025年05月01日から05月07日までの都道府県別の成約台数と掲載台数を集計して",
+        "2025/5/1 から 5月7日 までの 都道府県別の成約台数と掲載台数を集計して",
+        "二〇二五年五月一日から五月七日までの都道府県別の成約台数と掲載台数を集計して",
+        "令和7年5月1日から5月7日までの都道府県別の成約台数と掲載台数を集計して",
+    ],
+)
+def test_canonicalize_variants(variant):
+    """Test que les variantes d'une même question ont la même forme canonique"""
+    assert canonicalize_question(variant) == QUESTION
+
+
+def test_canonicalize_keeps_different_questions_apart():
+    """Test que des questions différentes restent différentes"""
+    assert canonicalize_question(QUESTION) != canonicalize_question(
+        QUESTION.replace("5月7日", "5月8日")
+    )
+
+
+def test_fold_whitespace_keeps_latin_spacing():
+    """Test que les espaces entre mots latins sont conservés"""
+    assert fold_whitespace("  How many   cars ") == "How many cars"
+
+
+def test_normalize_japanese_numbers():
+    """Test la conversion des nombres en kanji"""
+    assert normalize_japanese_numbers("十二月三十一日") == "12月31日"
+    assert normalize_japanese_numbers("二〇二五年") == "2025年"
+    # Pas d'unité : le texte reste intact
+    assert normalize_japanese_numbers("一部") == "一部"
+
+
+def test_normalize_dates_era():
+    """Test la conversion des ères japonaises"""
+    assert normalize_dates("令和元年") == "2019年"
+    assert normalize_dates("平成31年") == "2019年"
+
+
+def test_custom_pipeline():
+    """Test un pipeline personnalisé"""
+    assert canonicalize_question("ABC", steps=[str.lower]) == "abc"
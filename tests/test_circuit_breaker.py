@@ -0,0 +1,120 @@
+import time
+import pytest
+from sqlalchemy import exc as sa_exc
+from tenacity import RetryError, retry, stop_after_attempt
+from infrastructure.circuit_breaker import (
+    CLOSED,
+    HALF_OPEN,
+    OPEN,
+    CircuitBreaker,
+    CircuitOpenError,
+    is_db_failure,
+)
+
+
+def _fail():
+    raise ConnectionError("down")
+
+
+def _trip(breaker):
+    for _ in range(breaker.failure_threshold):
+        with pytest.raises(ConnectionError):
+            breaker.call(_fail)
+
+
+def test_opens_after_threshold_and_fails_fast():
+    """Test l'ouverture après N échecs puis le refus immédiat"""
+    breaker = CircuitBreaker("db", failure_threshold=2, reset_timeout=60)
+    _trip(breaker)
+    assert breaker.state == OPEN
+    calls = []
+    with pytest.raises(CircuitOpenError) as exc:
+        breaker.call(lambda: calls.append(1))
+    assert calls == []
+    assert exc.value.name == "db"
+    assert exc.value.retry_after > 0
+    assert breaker.stats()["rejected"] == 1
+    assert breaker.trips == 1
+
+
+def test_success_resets_failure_count():
+    """Test qu'un succès remet le compteur d'échecs consécutifs à zéro"""
+    breaker = CircuitBreaker("db", failure_threshold=2)
+    with pytest.raises(ConnectionError):
+        breaker.call(_fail)
+    assert breaker.call(lambda: "ok") == "ok"
+    with pytest.raises(ConnectionError):
+        breaker.call(_fail)
+    assert breaker.state == CLOSED
+
+
+def test_ignored_errors_do_not_trip():
+    """Test qu'une erreur hors disponibilité ne coupe pas le circuit"""
+    breaker = CircuitBreaker(
+        "db", failure_threshold=1, is_failure=lambda e: isinstance(e, ConnectionError)
+    )
+    with pytest.raises(ValueError):
+        breaker.call(lambda: int("x"))
+    assert breaker.state == CLOSED
+
+
+def test_half_open_trial():
+    """Test l'appel d'essai après le délai : succès -> fermé, échec -> ouvert"""
+    breaker = CircuitBreaker("llm", failure_threshold=1, reset_timeout=0.05)
+    _trip(breaker)
+    time.sleep(0.06)
+    assert breaker.state == HALF_OPEN
+    with pytest.raises(ConnectionError):
+        breaker.call(_fail)
+    assert breaker.state == OPEN
+
+    time.sleep(0.06)
+    assert breaker.call(lambda: "ok") == "ok"
+    assert breaker.state == CLOSED
+
+
+def test_half_open_allows_single_trial():
+    """Test qu'un seul appel d'essai passe pendant l'état half-open"""
+    breaker = CircuitBreaker("llm", failure_threshold=1, reset_timeout=0.01)
+    _trip(breaker)
+    time.sleep(0.02)
+    with breaker.guard():
+        with pytest.raises(CircuitOpenError):
+            breaker.call(lambda: "ok")
+    assert breaker.state == CLOSED
+
+
+def test_guard_around_abandoned_generator():
+    """Test qu'un générateur abandonné compte comme un succès"""
+    breaker = CircuitBreaker("db", failure_threshold=1, reset_timeout=0.01)
+
+    def _rows():
+        with breaker.guard():
+            yield 1
+            yield 2
+
+    _trip(breaker)
+    time.sleep(0.02)
+    rows = _rows()
+    assert next(rows) == 1
+    rows.close()
+    assert breaker.state == CLOSED
+
+
+def test_is_db_failure():
+    """Test la classification des erreurs Redshift"""
+    assert is_db_failure(sa_exc.OperationalError("SELECT 1", {}, Exception()))
+    assert is_db_failure(sa_exc.TimeoutError())
+    assert not is_db_failure(sa_exc.ProgrammingError("SELECT x", {}, Exception()))
+
+
+def test_is_db_failure_unwraps_retry_error():
+    """Test qu'une connexion épuisant ses essais tenacity compte comme un échec"""
+
+    @retry(stop=stop_after_attempt(1))
+    def _connect():
+        raise sa_exc.OperationalError("SELECT 1", {}, Exception())
+
+    with pytest.raises(RetryError) as exc:
+        _connect()
+    assert is_db_failure(exc.value)
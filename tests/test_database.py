@@ -75,3 +75,108 @@ def test_health_check_failure(mock_create_engine, mock_engine):
     # Puis simuler une erreur pour le health check
     mock_engine.connect.side_effect = Exception("Health check failed")
     assert db.health_check() is False
+
+
+def test_is_read_only_sql():
+    """Test la détection des requêtes en lecture seule"""
+    from infrastructure.database import is_read_only_sql
+
+    assert is_read_only_sql("WITH range_date AS (SELECT 1)\nSELECT * FROM t\nLIMIT 10;")
+    assert is_read_only_sql("-- commentaire\nselect update_date from t")
+    assert not is_read_only_sql("DELETE FROM sold_cars")
+    assert not is_read_only_sql("SELECT 1; DROP TABLE sold_cars")
+    assert not is_read_only_sql("WITH x AS (SELECT 1) INSERT INTO t SELECT * FROM x")
+    assert not is_read_only_sql("")
+
+
+def test_stream_query_chunks(mock_create_engine, mock_engine):
+    """Test la lecture par paquets via un curseur serveur"""
+    from infrastructure.database import DatabaseManager
+
+    db = DatabaseManager()
+    conn = mock_engine.connect.return_value.__enter__.return_value
+    result = conn.execution_options.return_value.exec_driver_sql.return_value
+    result.keys.return_value = ["prefecture_name", "count"]
+    result.fetchmany.side_effect = [[("東京都", 3), ("大阪府", 2)], [("北海道", 1)], []]
+
+    chunks = list(
+        db.stream_query("SELECT prefecture_name, count FROM t;", chunk_size=2)
+    )
+
+    assert chunks == [
+        (["prefecture_name", "count"], [("東京都", 3), ("大阪府", 2)]),
+        (["prefecture_name", "count"], [("北海道", 1)]),
+    ]
+    conn.execution_options.assert_called_once_with(
+        stream_results=True, max_row_buffer=2, no_parameters=True
+    )
+    conn.execution_options.return_value.exec_driver_sql.assert_called_once_with(
+        "SELECT prefecture_name, count FROM t"
+    )
+    result.fetchmany.assert_called_with(2)
+
+
+def test_stream_query_literals_are_not_parameters():
+    """Test que « :nom » et « % » dans un littéral ne sont pas des paramètres"""
+    from sqlalchemy import create_engine
+    from infrastructure.database import DatabaseManager
+
+    engine = create_engine("sqlite://")
+    with patch("infrastructure.database.create_engine", return_value=engine):
+        db = DatabaseManager()
+        chunks = list(db.stream_query("SELECT ' :x' AS label, '10%' AS rate;"))
+    assert chunks == [(["label", "rate"], [(" :x", "10%")])]
+
+
+def test_stream_query_rejects_writes(mock_create_engine, mock_engine):
+    """Test le refus des requêtes d'écriture"""
+    from infrastructure.database import DatabaseManager
+
+    db = DatabaseManager()
+    with pytest.raises(ValueError):
+        list(db.stream_query("DROP TABLE sold_cars"))
+
+
+def test_database_manager_is_lazy(mock_create_engine, mock_engine):
+    """Test que l'instanciation ne se connecte pas à Redshift"""
+    from infrastructure.database import DatabaseManager
+
+    db = DatabaseManager()
+    mock_create_engine.assert_not_called()
+    assert db.is_connected is False
+
+    # Connexion au premier accès, une seule fois
+    assert db.engine == mock_engine
+    assert db.engine == mock_engine
+    mock_create_engine.assert_called_once()
+    assert db.is_connected is True
+
+
+def test_database_warm_up_background(mock_create_engine, mock_engine):
+    """Test la connexion anticipée sur un thread dédié"""
+    from infrastructure.database import DatabaseManager
+
+    db = DatabaseManager()
+    db.warm_up()
+    db._warmup_thread.join(timeout=5)
+    assert db.is_connected is True
+    mock_create_engine.assert_called_once()
+
+
+def test_database_warm_up_failure_is_retried(
+    mock_create_engine, mock_engine, monkeypatch
+):
+    """Test qu'un warm-up échoué n'empêche pas une connexion ultérieure"""
+    from infrastructure.database import DatabaseManager
+
+    # Le retry tenacity est déjà appliqué : 2 tentatives, sans attente ici
+    monkeypatch.setattr(DatabaseManager._connect.retry, "sleep", lambda s: None)
+    mock_create_engine.side_effect = [
+        Exception("Redshift down"),
+        Exception("Redshift down"),
+        mock_engine,
+    ]
+    db = DatabaseManager()
+    db.warm_up(background=False)
+    assert db.is_connected is False
+    assert db.engine == mock_engine
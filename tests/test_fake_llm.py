@@ -0,0 +1,51 @@
+import time
+from unittest.mock import patch
+from infrastructure import llm
+from infrastructure.fake_llm import DEFAULT_SQL, FakeSQLChatModel
+from infrastructure.generation import clean_sql
+
+
+def test_invoke_returns_canned_sql():
+    """Test la réponse prédéfinie au format du prompt"""
+    model = FakeSQLChatModel(latency=0)
+    sql = clean_sql(model.invoke("question").content)
+    assert sql.startswith("WITH range_date AS (")
+    assert sql.endswith("LIMIT 10;")
+
+
+def test_responses_cycle():
+    """Test que les réponses sont servies à tour de rôle"""
+    model = FakeSQLChatModel(responses=["SELECT 1;", "SELECT 2;"], latency=0)
+    assert [model.invoke("q").content for _ in range(3)] == [
+        "SELECT 1;",
+        "SELECT 2;",
+        "SELECT 1;",
+    ]
+
+
+def test_latency():
+    """Test la latence simulée (premier token + tokens)"""
+    model = FakeSQLChatModel(responses=["SELECT 1 ;"], latency=0.05, token_latency=0.01)
+    start = time.perf_counter()
+    model.invoke("q")
+    assert time.perf_counter() - start >= 0.08
+
+
+def test_stream_tokens():
+    """Test le streaming token par token"""
+    model = FakeSQLChatModel(latency=0)
+    chunks = [chunk.content for chunk in model.stream("q")]
+    assert len(chunks) > 10
+    assert "".join(chunks) == DEFAULT_SQL
+
+
+def test_get_gemini_llm_fake_provider():
+    """Test que LLM_PROVIDER=fake substitue le modèle hors ligne"""
+    with (
+        patch.object(llm.settings, "llm_provider", "fake"),
+        patch.object(llm.settings, "fake_llm_latency", 0.2),
+    ):
+        model = llm.get_gemini_llm(llm.gemini_model_params({"temperature": 0.1}))
+    assert isinstance(model, FakeSQLChatModel)
+    assert model.latency == 0.2
+    assert model.temperature == 0.1
@@ -0,0 +1,175 @@
+import threading
+import time
+import pytest
+from unittest.mock import MagicMock, Mock, patch
+from infrastructure import fingerprint
+from infrastructure.cache import CacheManager
+from infrastructure.fingerprint import GenerationFingerprint
+from infrastructure.llm import sql_prompt
+from langchain_core.prompts import PromptTemplate
+
+PARAMS = {"model": "gemini-2.5-flash", "temperature": 0}
+
+
+@pytest.fixture
+def checksum():
+    """Mock de la somme de contrôle du schéma"""
+    with patch.object(fingerprint, "schema_checksum", return_value="v1") as mock:
+        yield mock
+
+
+def _wait_refresh(fp, timeout=1.0):
+    """Attend la fin du rafraîchissement en arrière-plan"""
+    deadline = time.time() + timeout
+    while fp._refreshing and time.time() < deadline:
+        time.sleep(0.01)
+
+
+def test_fingerprint_stable(checksum):
+    """Test qu'une empreinte est stable et que le schéma est mis en cache"""
+    fp = GenerationFingerprint(Mock(), "usedcar_dwh", ttl=600)
+    fp.refresh()
+    assert fp.current(PARAMS) == fp.current(PARAMS)
+    checksum.assert_called_once()
+
+
+def test_fingerprint_never_waits_for_redshift(checksum):
+    """Test qu'un catalogue lent ne bloque pas les appels (cache hits compris)"""
+    release = threading.Event()
+    checksum.side_effect = lambda engine, schema: release.wait(1) and "v2"
+    fp = GenerationFingerprint(Mock(), "usedcar_dwh", ttl=600)
+    fp._schema_checksum = "v1"
+
+    start = time.time()
+    bases = {fp.base() for _ in range(4)}
+    assert time.time() - start < 0.5
+    assert bases == {fp.base()}
+    # Un seul rafraîchissement en arrière-plan pour tous les appelants
+    assert checksum.call_count == 1
+
+    release.set()
+    _wait_refresh(fp)
+    assert fp._schema_checksum == "v2"
+    assert fp.base() not in bases
+
+
+def test_fingerprint_depends_on_model_params(checksum):
+    """Test que les paramètres du modèle changent l'espace de noms"""
+    fp = GenerationFingerprint(Mock(), "usedcar_dwh", ttl=600)
+    other = dict(PARAMS, temperature=0.2)
+    assert fp.current(PARAMS) != fp.current(other)
+    # La base (prompt + schéma) est partagée
+    assert fp.current(PARAMS).split(":")[0] == fp.current(other).split(":")[0]
+
+
+def test_fingerprint_depends_on_prompt(checksum):
+    """Test qu'un changement du prompt de la chaîne change l'empreinte"""
+    before = GenerationFingerprint(Mock(), "usedcar_dwh", ttl=600).current(PARAMS)
+    prompt = PromptTemplate.from_template("new prompt {input} {table_info} {top_k}")
+    fp = GenerationFingerprint(Mock(), "usedcar_dwh", ttl=600, prompt=prompt)
+    assert fp.current(PARAMS) != before
+    # Même gabarit, autre dialecte : autre prompt envoyé
+    other = GenerationFingerprint(
+        Mock(), "usedcar_dwh", ttl=600, prompt=sql_prompt("duckdb_like")
+    )
+    assert other.current(PARAMS) != before
+
+
+def test_fingerprint_schema_change_triggers_callback(checksum):
+    """Test qu'un changement de schéma appelle on_change avec les deux bases"""
+    on_change = Mock()
+    fp = GenerationFingerprint(Mock(), "usedcar_dwh", ttl=600, on_change=on_change)
+    fp.refresh()
+    before = fp.base()
+
+    checksum.return_value = "v2"
+    fp.refresh()
+    after = fp.base()
+
+    assert before != after
+    on_change.assert_called_once_with(before, after)
+
+
+def test_fingerprint_change_fires_once_under_concurrency(checksum):
+    """Test qu'un changement vu par des appels simultanés ne notifie qu'une fois"""
+    on_change = Mock()
+    fp = GenerationFingerprint(Mock(), "usedcar_dwh", ttl=600, on_change=on_change)
+    fp.refresh()
+    before = fp.base()
+    stop = threading.Event()
+
+    def _read():
+        while not stop.is_set():
+            fp.base()
+
+    threads = [threading.Thread(target=_read) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    checksum.return_value = "v2"
+    fp.refresh()
+    time.sleep(0.05)
+    stop.set()
+    for thread in threads:
+        thread.join(1)
+
+    after = fp.base()
+    on_change.assert_called_once_with(before, after)
+
+
+def test_fingerprint_first_checksum_is_not_a_change(checksum):
+    """Test qu'un démarrage à froid n'invalide pas les métadonnées du schéma"""
+    on_change = Mock()
+    fp = GenerationFingerprint(Mock(), "usedcar_dwh", ttl=600, on_change=on_change)
+    checksum.side_effect = Exception("Redshift down")
+    cold = fp.base()
+    _wait_refresh(fp)
+
+    checksum.side_effect = None
+    fp.refresh()
+    assert fp.base() != cold
+    on_change.assert_not_called()
+
+
+def test_fingerprint_keeps_last_checksum_on_error(checksum):
+    """Test que l'échec du catalogue ne refroidit pas le cache"""
+    fp = GenerationFingerprint(Mock(), "usedcar_dwh", ttl=600)
+    fp.refresh()
+    before = fp.base()
+    checksum.side_effect = Exception("Redshift down")
+    assert fp.refresh() is None
+    assert fp.base() == before
+
+
+def test_fingerprint_persisted_checksum_survives_restart(checksum):
+    """Test qu'un redémarrage pendant une panne garde le même espace de noms"""
+    store = CacheManager(sweep_interval=0)
+    fp = GenerationFingerprint(Mock(), "usedcar_dwh", ttl=600, store=store)
+    fp.refresh()
+    before = fp.base()
+
+    # Nouveau processus, Redshift injoignable
+    checksum.side_effect = Exception("Redshift down")
+    restarted = GenerationFingerprint(Mock(), "usedcar_dwh", ttl=600, store=store)
+    assert restarted.base() == before
+    _wait_refresh(restarted)
+    assert restarted.base() == before
+
+
+def test_fingerprint_without_store_uses_unknown(checksum):
+    """Test le repli sur la sentinelle quand aucune somme n'a jamais été lue"""
+    checksum.side_effect = Exception("Redshift down")
+    fp = GenerationFingerprint(Mock(), "usedcar_dwh", ttl=600)
+    fp.base()
+    _wait_refresh(fp)
+    assert fp._refresh_schema_checksum() == fingerprint.UNKNOWN_SCHEMA
+
+
+def test_schema_checksum_query():
+    """Test la somme de contrôle calculée depuis information_schema"""
+    engine = MagicMock()
+    conn = engine.connect.return_value.__enter__.return_value
+    conn.execute.return_value.fetchall.return_value = [("sold_cars", "id", "int")]
+    first = fingerprint.schema_checksum(engine, "usedcar_dwh")
+
+    conn.execute.return_value.fetchall.return_value = [("sold_cars", "id", "bigint")]
+    assert fingerprint.schema_checksum(engine, "usedcar_dwh") != first
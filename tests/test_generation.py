@@ -0,0 +1,352 @@
+import threading
+import time
+import pytest
+from unittest.mock import Mock, patch
+from infrastructure.cache import CacheManager
+from infrastructure import generation
+from sqlalchemy import exc as sa_exc
+from infrastructure.circuit_breaker import (
+    OPEN,
+    CircuitBreaker,
+    CircuitOpenError,
+    is_db_failure,
+)
+from infrastructure.llm import gemini_model_params
+from infrastructure.rate_limit import LocalRateLimiter, RateLimitExceeded
+from infrastructure.singleflight import SingleFlight
+from infrastructure.sql_templates import DateTemplateCache
+
+NAMESPACE = "base:params"
+PARAMS = {"model": "gemini-2.5-flash", "temperature": 0, "max_tokens": None}
+# Entrées du prompt produites par la première étape de la chaîne
+PREPARED = {"input": "question\nSQLQuery: ", "table_info": "CREATE TABLE t (id INT)"}
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    """Cache isolé pour chaque test, empreinte figée"""
+    cache = CacheManager(sweep_interval=0)
+    monkeypatch.setattr(generation, "cache_manager", cache)
+    monkeypatch.setattr(
+        generation, "sql_fingerprint", Mock(current=Mock(return_value=NAMESPACE))
+    )
+    monkeypatch.setattr(generation, "date_templates", DateTemplateCache(cache))
+    monkeypatch.setattr(generation, "llm_rate_limiter", LocalRateLimiter(0, 60))
+    monkeypatch.setattr(generation, "batch_rate_limiter", LocalRateLimiter(0, 60))
+    return cache
+
+
+def test_clean_sql():
+    """Test le nettoyage de la sortie du LLM"""
+    raw = "SQLQuery: ```sql\nSELECT 1;\n```"
+    assert generation.clean_sql(raw) == "SELECT 1;"
+
+
+def test_generate_sql_from_cache(cache):
+    """Test qu'une question en cache ne déclenche pas d'appel LLM"""
+    cache.cache_sql_result("question", "SELECT 1;", NAMESPACE)
+    with patch.object(generation, "_run_sql_chain") as mock_chain:
+        assert generation.generate_sql("question") == ("SELECT 1;", True)
+        mock_chain.assert_not_called()
+
+
+def test_generate_sql_miss_calls_llm_and_caches(cache):
+    """Test qu'un cache miss appelle le LLM puis met le résultat en cache"""
+    with patch.object(
+        generation, "_run_sql_chain", return_value="SELECT 2;"
+    ) as mock_chain:
+        assert generation.generate_sql("question") == ("SELECT 2;", False)
+        mock_chain.assert_called_once_with("question", gemini_model_params(), None)
+    assert cache.get_cached_sql_result("question", NAMESPACE) == "SELECT 2;"
+
+
+def test_generate_sql_empty_result_not_cached(cache):
+    """Test qu'un SQL vide n'est pas mis en cache"""
+    with patch.object(generation, "_run_sql_chain", return_value=""):
+        assert generation.generate_sql("question") == ("", False)
+    assert cache.get_cached_sql_result("question", NAMESPACE) is None
+
+
+def test_generate_sql_session_config(cache):
+    """Test que la configuration de session atteint le modèle et l'empreinte"""
+    with patch.object(
+        generation, "_run_sql_chain", return_value="SELECT 2;"
+    ) as mock_chain:
+        generation.generate_sql("question", {"temperature": 0.2, "max_tokens": 500})
+    params = mock_chain.call_args.args[1]
+    assert params["temperature"] == 0.2 and params["max_tokens"] == 500
+    fingerprint_params = generation.sql_fingerprint.current.call_args.args[0]
+    assert fingerprint_params["max_tokens"] == 500
+
+
+def test_run_sql_chain():
+    """Test l'appel de la chaîne LangChain"""
+    model = Mock()
+    model.invoke.return_value = "```sql\nSELECT 3;\n```"
+    with (
+        patch.object(generation, "connect_to_redshift"),
+        patch.object(generation, "get_sql_db"),
+        patch.object(generation.chain_pool, "chain"),
+        patch.object(generation, "_prepare_inputs", return_value=PREPARED) as prepare,
+        patch.object(generation, "_model_chain", return_value=model),
+        patch.object(generation.table_selector, "select", return_value=None),
+    ):
+        assert generation._run_sql_chain("question", PARAMS) == "SELECT 3;"
+    assert prepare.call_args.args[1] == {"question": "question"}
+    model.invoke.assert_called_once_with(PREPARED)
+
+
+def test_run_sql_chain_pruned_tables():
+    """Test que seules les tables sélectionnées sont passées à la chaîne"""
+    with (
+        patch.object(generation, "connect_to_redshift"),
+        patch.object(generation, "get_sql_db"),
+        patch.object(generation.chain_pool, "chain"),
+        patch.object(generation, "_prepare_inputs", return_value=PREPARED) as prepare,
+        patch.object(generation, "_model_chain"),
+        patch.object(generation.table_selector, "select", return_value=["sold_cars"]),
+    ):
+        generation._run_sql_chain("成約台数", PARAMS)
+    assert prepare.call_args.args[1] == {
+        "question": "成約台数",
+        "table_names_to_use": ["sold_cars"],
+    }
+
+
+def test_run_sql_chain_reflection_failure_opens_db_breaker(monkeypatch):
+    """Test qu'une réflexion du schéma en échec compte pour Redshift, pas Gemini"""
+    from langchain.chains import create_sql_query_chain
+    from langchain_core.language_models.fake_chat_models import FakeListChatModel
+    from benchmarks.demo_schema import create_demo_engine
+    from infrastructure.schema_cache import SchemaCache
+
+    db_breaker = CircuitBreaker("redshift", 2, 60, is_failure=is_db_failure)
+    llm_breaker = CircuitBreaker("gemini", 2, 60)
+    monkeypatch.setattr(generation, "db_breaker", db_breaker)
+    monkeypatch.setattr(generation, "llm_breaker", llm_breaker)
+    db = SchemaCache(ttl=600).get_db(create_demo_engine(), "usedcar_dwh")
+    model = FakeListChatModel(responses=["SELECT 1;"])
+    chain = create_sql_query_chain(model, db)
+    down = sa_exc.OperationalError("SELECT", {}, Exception("connection refused"))
+    with (
+        patch.object(generation, "connect_to_redshift"),
+        patch.object(generation, "get_sql_db", return_value=db),
+        patch.object(generation.chain_pool, "chain", return_value=chain),
+        patch.object(db, "get_table_info", side_effect=down),
+        patch.object(generation.table_selector, "select", return_value=None),
+    ):
+        for _ in range(2):
+            with pytest.raises(sa_exc.OperationalError):
+                generation._run_sql_chain("question", PARAMS)
+        with pytest.raises(CircuitOpenError):
+            generation._run_sql_chain("question", PARAMS)
+    assert db_breaker.state == OPEN
+    assert llm_breaker.stats()["failures"] == 0
+    assert model.i == 0
+
+
+def test_run_sql_chain_open_circuit_fails_fast(monkeypatch):
+    """Test qu'un disjoncteur LLM ouvert évite l'appel au modèle"""
+    breaker = CircuitBreaker("gemini", failure_threshold=1, reset_timeout=60)
+    breaker._on_failure(ConnectionError("down"))
+    monkeypatch.setattr(generation, "llm_breaker", breaker)
+    model = Mock()
+    with (
+        patch.object(generation, "connect_to_redshift"),
+        patch.object(generation, "get_sql_db"),
+        patch.object(generation.chain_pool, "chain"),
+        patch.object(generation, "_prepare_inputs", return_value=PREPARED),
+        patch.object(generation, "_model_chain", return_value=model),
+        patch.object(generation.table_selector, "select", return_value=None),
+        pytest.raises(CircuitOpenError),
+    ):
+        generation._run_sql_chain("question", PARAMS)
+    model.invoke.assert_not_called()
+
+
+def test_generate_sql_open_circuit_serves_default_config(cache, monkeypatch):
+    """Test le repli sur le SQL en cache de la configuration par défaut"""
+    monkeypatch.setattr(
+        generation,
+        "sql_fingerprint",
+        Mock(current=Mock(side_effect=lambda p: f"base:{p['max_tokens']}")),
+    )
+    cache.cache_sql_result("question", "SELECT 1;", "base:None")
+    # Réglages par défaut de l'onglet Paramètres, essayés en premier
+    cache.cache_sql_result("warm question", "SELECT 2;", "base:1000")
+    error = CircuitOpenError("gemini", 30)
+    with patch.object(generation, "_run_sql_chain", side_effect=error):
+        assert generation.generate_sql("question", {"max_tokens": 500}) == (
+            "SELECT 1;",
+            True,
+        )
+        assert generation.generate_sql("warm question", {"max_tokens": 500}) == (
+            "SELECT 2;",
+            True,
+        )
+        # Aucun SQL en cache pour cette question : l'erreur remonte
+        with pytest.raises(CircuitOpenError):
+            generation.generate_sql("other question", {"max_tokens": 500})
+
+
+def test_generate_sql_new_namespace_misses(cache):
+    """Test qu'une nouvelle empreinte ne sert pas le SQL de l'ancienne"""
+    cache.cache_sql_result("question", "SELECT old;", "old:params")
+    with patch.object(generation, "_run_sql_chain", return_value="SELECT new;"):
+        assert generation.generate_sql("question") == ("SELECT new;", False)
+
+
+def test_generate_sql_reuses_date_template(cache):
+    """Test qu'une question à d'autres dates réutilise le SQL sans LLM"""
+    sql = (
+        "WITH range_date AS (\n"
+        "  SELECT to_date('2025-05-01', 'yyyy-mm-dd') AS start_date,\n"
+        "         to_date('2025-05-07', 'yyyy-mm-dd') AS end_date\n"
+        ")\nSELECT 1\nLIMIT 10;"
+    )
+    with patch.object(generation, "_run_sql_chain", return_value=sql):
+        generation.generate_sql("2025年5月1日から5月7日までの成約台数")
+
+    with patch.object(generation, "_run_sql_chain") as mock_chain:
+        new_sql, from_cache = generation.generate_sql(
+            "2025年6月1日から6月7日までの成約台数"
+        )
+        mock_chain.assert_not_called()
+
+    assert from_cache is True
+    assert "to_date('2025-06-01', 'yyyy-mm-dd')" in new_sql
+    assert "to_date('2025-06-07', 'yyyy-mm-dd')" in new_sql
+    assert "2025-05" not in new_sql
+
+
+@pytest.mark.parametrize(
+    "chunks",
+    [
+        ["SQLQuery: ```sql\nSELECT 1\nLIMIT 10;\n```"],
+        ["SQLQuery: ``", "`s", "ql\nSELECT", " 1\nLIMIT 10;\n``", "`"],
+        list("SQLQuery: ```sql\nSELECT 1\nLIMIT 10;\n```"),
+    ],
+)
+def test_incremental_cleaner(chunks):
+    """Test que le nettoyage incrémental ne montre jamais de marqueur"""
+    cleaner = generation.IncrementalSQLCleaner()
+    partials = [cleaner.feed(chunk) for chunk in chunks]
+    assert not any("`" in p or "SQLQuery" in p for p in partials)
+    assert partials[-1] == "SELECT 1\nLIMIT 10;"
+    assert cleaner.finish() == generation.clean_sql("".join(chunks))
+
+
+def test_run_sql_chain_streaming():
+    """Test le streaming du SQL partiel via on_partial"""
+    streaming = Mock()
+    streaming.stream.return_value = iter(["```sql\nSELECT", " 4;", "\n```"])
+    partials = []
+    with (
+        patch.object(generation, "connect_to_redshift"),
+        patch.object(generation, "get_sql_db"),
+        patch.object(generation.chain_pool, "chain") as mock_chain,
+        patch.object(generation, "_prepare_inputs", return_value=PREPARED),
+        patch.object(generation, "_streaming_chain", return_value=streaming),
+        patch.object(generation.table_selector, "select", return_value=None),
+    ):
+        sql = generation._run_sql_chain("question", PARAMS, partials.append)
+    assert sql == "SELECT 4;"
+    assert partials == ["SELECT", "SELECT 4;"]
+    streaming.stream.assert_called_once_with(PREPARED)
+    mock_chain.return_value.invoke.assert_not_called()
+
+
+def test_streaming_chain_real_langchain():
+    """Test que la chaîne LangChain réelle produit bien des tokens en flux"""
+    from langchain.chains import create_sql_query_chain
+    from langchain_core.language_models.fake_chat_models import FakeListChatModel
+    from benchmarks.demo_schema import create_demo_engine
+    from infrastructure.schema_cache import SchemaCache
+
+    db = SchemaCache(ttl=600).get_db(create_demo_engine(), "usedcar_dwh")
+    llm = FakeListChatModel(responses=["```sql\nSELECT 1;\n```"])
+    chain = create_sql_query_chain(llm, db)
+    prepared = generation._prepare_inputs(
+        chain, {"question": "q", "table_names_to_use": ["calls"]}
+    )
+    assert "CREATE TABLE" in prepared["table_info"]
+    chunks = list(generation._streaming_chain(chain).stream(prepared))
+    assert len(chunks) > 1
+    assert generation.clean_sql("".join(chunks)) == "SELECT 1;"
+
+
+def test_generate_sql_streaming_from_cache(cache):
+    """Test qu'un cache hit ne passe pas par le streaming"""
+    cache.cache_sql_result("question", "SELECT 1;", NAMESPACE)
+    on_partial = Mock()
+    assert generation.generate_sql("question", None, on_partial) == ("SELECT 1;", True)
+    on_partial.assert_not_called()
+
+
+def test_generate_sql_rate_limited(cache, monkeypatch):
+    """Test que le quota de session bloque l'appel LLM, pas le cache"""
+    monkeypatch.setattr(
+        generation,
+        "llm_rate_limiter",
+        LocalRateLimiter(0, 60, session_requests=1, max_wait=0),
+    )
+    with patch.object(generation, "_run_sql_chain", return_value="SELECT 1;") as run:
+        generation.generate_sql("q1", session_id="s1")
+        with pytest.raises(RateLimitExceeded):
+            generation.generate_sql("q2", session_id="s1")
+        # Question en cache : pas de jeton consommé
+        assert generation.generate_sql("q1", session_id="s1") == ("SELECT 1;", True)
+        # Autre session : son propre seau
+        generation.generate_sql("q2", session_id="s2")
+    assert run.call_count == 2
+
+
+def test_generate_sql_follower_uses_own_quota(cache, monkeypatch):
+    """Test qu'un suiveur ne subit pas le quota de session du leader"""
+    flight = SingleFlight()
+    monkeypatch.setattr(generation, "sql_flight", flight)
+
+    def acquire(session_id, max_wait=None):
+        if session_id == "s1":
+            # Le leader attend que le suiveur l'ait rejoint avant d'échouer
+            deadline = time.monotonic() + 5
+            while flight.shared == 0 and time.monotonic() < deadline:
+                time.sleep(0.01)
+            raise RateLimitExceeded(60)
+
+    monkeypatch.setattr(
+        generation, "llm_rate_limiter", Mock(acquire=Mock(side_effect=acquire))
+    )
+    results = {}
+
+    def ask(session_id):
+        try:
+            results[session_id] = generation.generate_sql("q", session_id=session_id)
+        except RateLimitExceeded as e:
+            results[session_id] = e
+
+    with patch.object(generation, "_run_sql_chain", return_value="SELECT 1;") as run:
+        leader = threading.Thread(target=ask, args=("s1",))
+        leader.start()
+        while flight.in_flight() == 0:
+            time.sleep(0.01)
+        follower = threading.Thread(target=ask, args=("s2",))
+        follower.start()
+        leader.join(5)
+        follower.join(5)
+    assert flight.shared == 1
+    assert isinstance(results["s1"], RateLimitExceeded)
+    assert results["s2"] == ("SELECT 1;", False)
+    run.assert_called_once()
+
+
+def test_generate_sql_waits_for_token(cache, monkeypatch):
+    """Test qu'un appelant hors interface attend un jeton au lieu d'échouer"""
+    limiter = LocalRateLimiter(1, 1, max_wait=0)
+    monkeypatch.setattr(generation, "llm_rate_limiter", limiter)
+    with patch.object(generation, "_run_sql_chain", return_value="SELECT 1;"):
+        generation.generate_sql("q1")
+        with pytest.raises(RateLimitExceeded):
+            generation.generate_sql("q2")
+        assert generation.generate_sql("q2", max_wait=2) == ("SELECT 1;", False)
+    assert limiter.waited == 1
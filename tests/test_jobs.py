@@ -0,0 +1,78 @@
+import threading
+import time
+import pytest
+from unittest.mock import patch
+from infrastructure import jobs
+from infrastructure.jobs import DONE, FAILED, JobManager
+from infrastructure.rate_limit import RateLimitExceeded
+
+
+def _wait(manager, job_id, timeout=2.0):
+    deadline = time.time() + timeout
+    while not manager.get(job_id).finished:
+        assert time.time() < deadline
+        time.sleep(0.01)
+    return manager.get(job_id)
+
+
+def test_job_runs_in_background():
+    """Test qu'un travail produit le SQL et le SQL partiel hors du thread appelant"""
+    release = threading.Event()
+
+    def _generate(question, llm_config, on_partial, session_id=None):
+        on_partial("SELECT")
+        release.wait(1)
+        return "SELECT 1;", False
+
+    manager = JobManager(max_workers=2)
+    with (
+        patch.object(jobs, "generate_sql", side_effect=_generate),
+        patch.object(jobs.settings, "llm_streaming", True),
+    ):
+        job_id = manager.submit("question", session_id="s1")
+        assert not manager.get(job_id).finished
+        assert manager.stats()["pending"] + manager.stats()["running"] == 1
+        release.set()
+        job = _wait(manager, job_id)
+
+    assert job.status == DONE
+    assert job.sql == "SELECT 1;"
+    assert job.partial == "SELECT"
+    assert manager.stats()["done"] == 1
+
+
+def test_job_failure_is_kept():
+    """Test que l'erreur d'un travail est conservée pour l'interface"""
+    manager = JobManager(max_workers=1)
+    with patch.object(jobs, "generate_sql", side_effect=RateLimitExceeded(5)):
+        job = _wait(manager, manager.submit("question"))
+    assert job.status == FAILED
+    assert isinstance(job.error, RateLimitExceeded)
+
+
+def test_submit_reuses_running_job():
+    """Test qu'un double clic ne crée pas un second travail"""
+    release = threading.Event()
+    manager = JobManager(max_workers=1)
+    with patch.object(
+        jobs, "generate_sql", side_effect=lambda *a, **kw: release.wait(1) and ("", 0)
+    ):
+        first = manager.submit("question", session_id="s1")
+        assert manager.submit("question", session_id="s1") == first
+        other = manager.submit("question", session_id="s2")
+        assert other != first
+        release.set()
+        _wait(manager, first)
+        _wait(manager, other)
+
+
+@pytest.mark.parametrize("retention, kept", [(600, True), (0, False)])
+def test_finished_jobs_expire(retention, kept):
+    """Test l'oubli des travaux terminés après la durée de conservation"""
+    manager = JobManager(max_workers=1, retention=retention)
+    with patch.object(jobs, "generate_sql", return_value=("SELECT 1;", True)):
+        job_id = manager.submit("question")
+        _wait(manager, job_id)
+        time.sleep(0.01)
+        _wait(manager, manager.submit("other"))
+    assert (manager.get(job_id) is not None) is kept
@@ -0,0 +1,14 @@
+import json
+import os
+from infrastructure.json_file import write_json_atomic
+
+
+def test_write_json_atomic(tmp_path):
+    """Test l'écriture atomique : répertoire créé, aucun fichier temporaire restant"""
+    path = str(tmp_path / "cache" / "data.json")
+    write_json_atomic(path, {"question": "成約台数"})
+    write_json_atomic(path, {"question": "掲載台数"})
+    with open(path, encoding="utf-8") as f:
+        assert "掲載台数" in f.read()
+    assert json.load(open(path, encoding="utf-8")) == {"question": "掲載台数"}
+    assert os.listdir(tmp_path / "cache") == ["data.json"]
@@ -1,6 +1,12 @@
 import pytest
 from unittest.mock import Mock, patch
-from infrastructure.llm import get_gemini_llm, get_sql_db, create_sql_query_chain_only
+from infrastructure.llm import (
+    create_sql_query_chain_only,
+    gemini_model_params,
+    get_gemini_llm,
+    get_sql_db,
+    sql_prompt,
+)
 
 
 @pytest.fixture
@@ -18,20 +24,45 @@ def test_get_gemini_llm():
         assert mock_gemini.called
 
 
+def test_gemini_model_params_session_config():
+    """Test la surcharge par la configuration de session"""
+    params = gemini_model_params(
+        {"temperature": 0.15000000000000002, "max_tokens": 800}
+    )
+    assert params["temperature"] == 0.15
+    assert params["max_tokens"] == 800
+    assert gemini_model_params(None) == gemini_model_params({})
+
+
 def test_get_sql_db():
-    """Test la création de SQLDatabase"""
+    """Test que SQLDatabase est créé une seule fois par processus"""
     mock_engine = Mock()
-    with patch("infrastructure.llm.SQLDatabase") as mock_sql_db:
+    with (
+        patch("infrastructure.schema_cache.CachedSQLDatabase") as mock_sql_db,
+        patch("infrastructure.llm.schema_cache._databases", {}),
+    ):
         db = get_sql_db(mock_engine)
         assert db is not None
+        assert get_sql_db(mock_engine) is db
         mock_sql_db.assert_called_once()
 
 
 def test_create_sql_query_chain_only():
     """Test la création de la chaîne SQL"""
     mock_llm = Mock()
-    mock_db = Mock()
+    mock_db = Mock(dialect="redshift")
     with patch("infrastructure.llm.create_sql_query_chain") as mock_create_chain:
         chain = create_sql_query_chain_only(mock_llm, mock_db)
         assert chain is not None
-        mock_create_chain.assert_called_once_with(mock_llm, mock_db)
+        mock_create_chain.assert_called_once_with(
+            mock_llm, mock_db, prompt=sql_prompt("redshift")
+        )
+
+
+def test_sql_prompt_matches_langchain_default():
+    """Test que le prompt haché est celui que LangChain enverrait"""
+    from langchain.chains.sql_database.prompt import PROMPT, SQL_PROMPTS
+
+    assert sql_prompt("redshift").template == PROMPT.template
+    assert sql_prompt("redshift").partial_variables == {"dialect": "redshift"}
+    assert sql_prompt("postgresql").template == SQL_PROMPTS["postgresql"].template
@@ -0,0 +1,174 @@
+import threading
+import time
+import pytest
+from google.api_core import exceptions as google_exceptions
+from infrastructure.llm_calls import HedgedCaller, LLMTimeout, is_transient
+
+
+def _caller(**kwargs):
+    options = dict(timeout=1.0, max_attempts=3, retry_wait_max=0.01)
+    options.update(kwargs)
+    return HedgedCaller(**options)
+
+
+def _warm(caller, seconds=0.01, count=20):
+    """Historique de latences suffisant pour activer la couverture"""
+    for _ in range(count):
+        caller.latency.record(seconds)
+    caller.calls = count
+
+
+def test_is_transient():
+    """Test la classification des erreurs retentables"""
+    assert is_transient(TimeoutError())
+    assert is_transient(ConnectionError())
+    assert is_transient(google_exceptions.ServiceUnavailable("busy"))
+    assert is_transient(google_exceptions.ResourceExhausted("quota"))
+    assert not is_transient(google_exceptions.InvalidArgument("bad"))
+    assert not is_transient(ValueError())
+
+
+def test_call_returns_result():
+    """Test qu'un appel rapide est retourné et mesuré"""
+    caller = _caller()
+    assert caller.call(lambda: "SELECT 1;") == "SELECT 1;"
+    assert caller.latency.count == 1
+    assert caller.hedged == 0
+
+
+def test_call_retries_transient_errors():
+    """Test les nouvelles tentatives sur erreur transitoire"""
+    caller = _caller()
+    outcomes = [google_exceptions.ServiceUnavailable("busy"), "SELECT 1;"]
+
+    def _fn():
+        outcome = outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    assert caller.call(_fn) == "SELECT 1;"
+    assert caller.retries == 1
+
+
+def test_call_does_not_retry_permanent_errors():
+    """Test qu'une erreur définitive est remontée au premier essai"""
+    caller = _caller()
+    calls = []
+
+    def _fn():
+        calls.append(1)
+        raise ValueError("bad prompt")
+
+    with pytest.raises(ValueError):
+        caller.call(_fn)
+    assert len(calls) == 1
+
+
+def test_call_timeout_then_gives_up():
+    """Test le délai maximal par essai puis l'abandon après max_attempts"""
+    caller = _caller(timeout=0.05, max_attempts=2, hedge=False)
+    release = threading.Event()
+    with pytest.raises(LLMTimeout):
+        caller.call(lambda: release.wait(1))
+    release.set()
+    assert caller.timeouts == 2
+    assert caller.retries == 1
+
+
+def test_no_hedge_without_history():
+    """Test qu'aucune couverture n'est lancée avant d'avoir un p95"""
+    caller = _caller()
+    assert caller.hedge_delay() is None
+    _warm(caller)
+    assert caller.hedge_delay() == pytest.approx(caller.hedge_min_delay)
+
+
+def test_hedge_wins_over_slow_call():
+    """Test que la requête de couverture répond à la place d'un appel lent"""
+    caller = _caller(hedge_min_delay=0.02, hedge_budget=0.5)
+    _warm(caller)
+    release = threading.Event()
+    calls = []
+
+    def _fn():
+        calls.append(1)
+        if len(calls) == 1:
+            release.wait(1)
+            return "slow"
+        return "fast"
+
+    start = time.monotonic()
+    assert caller.call(_fn) == "fast"
+    release.set()
+    assert time.monotonic() - start < 0.5
+    assert caller.hedged == 1
+    assert caller.hedge_wins == 1
+
+
+def test_hedge_budget_limits_spend():
+    """Test que le budget borne la part d'appels doublés"""
+    caller = _caller(hedge_min_delay=0.01, hedge_budget=0.1)
+    _warm(caller)
+    for _ in range(10):
+        caller.call(lambda: time.sleep(0.03) or "SELECT 1;")
+    assert caller.hedged <= 0.1 * caller.calls
+    assert caller.hedged >= 1
+
+
+def test_stream_yields_all_chunks():
+    """Test que le flux est relu en entier après le premier morceau"""
+    caller = _caller()
+    assert list(caller.stream(lambda: iter(["SELECT", " 1", ";"]))) == [
+        "SELECT",
+        " 1",
+        ";",
+    ]
+    assert caller.first_token.count == 1
+    assert list(caller.stream(lambda: iter([]))) == []
+
+
+def test_stream_first_token_timeout():
+    """Test le délai maximal avant le premier morceau, puis l'abandon"""
+    caller = _caller(first_token_timeout=0.05, max_attempts=2, hedge=False)
+    release = threading.Event()
+
+    def _slow():
+        release.wait(1)
+        yield "SELECT 1;"
+
+    start = time.monotonic()
+    with pytest.raises(LLMTimeout):
+        list(caller.stream(_slow))
+    release.set()
+    assert time.monotonic() - start < 0.5
+    assert caller.timeouts == 2
+
+
+def test_stream_hedge_wins_first_token():
+    """Test que le flux de couverture gagne et que le flux lent est fermé"""
+    caller = _caller(hedge_min_delay=0.02, hedge_budget=0.5)
+    for _ in range(20):
+        caller.first_token.record(0.01)
+    caller.calls = 20
+    release = threading.Event()
+    opened, closed = [], []
+
+    def _open():
+        opened.append(1)
+        slow = len(opened) == 1
+        try:
+            if slow:
+                release.wait(1)
+            yield "slow" if slow else "fast"
+            yield ";"
+        finally:
+            closed.append(slow)
+
+    start = time.monotonic()
+    assert list(caller.stream(_open)) == ["fast", ";"]
+    assert time.monotonic() - start < 0.5
+    release.set()
+    time.sleep(0.05)
+    assert caller.hedge_wins == 1
+    assert sorted(closed) == [False, True]
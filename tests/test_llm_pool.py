@@ -0,0 +1,90 @@
+import threading
+import pytest
+from unittest.mock import Mock, patch
+from infrastructure import llm_pool
+from infrastructure.llm_pool import ChainPool
+
+PARAMS = {"model": "gemini-2.5-flash", "temperature": 0, "max_tokens": None}
+
+
+@pytest.fixture
+def factories():
+    """Mocks de création du client Gemini et de la chaîne"""
+    with (
+        patch.object(llm_pool, "get_gemini_llm", side_effect=lambda p: Mock()) as llm,
+        patch.object(
+            llm_pool, "create_sql_query_chain_only", side_effect=lambda l, d: Mock()
+        ) as chain,
+    ):
+        yield llm, chain
+
+
+def _db(schema="usedcar_dwh"):
+    return Mock(_schema=schema)
+
+
+def test_chain_reused(factories):
+    """Test que la même chaîne est rendue pour les mêmes paramètres"""
+    pool = ChainPool()
+    db = _db()
+    assert pool.chain(db, PARAMS) is pool.chain(db, PARAMS)
+    factories[0].assert_called_once_with(PARAMS)
+    factories[1].assert_called_once()
+
+
+def test_chain_keyed_by_params(factories):
+    """Test qu'une autre température donne un autre client"""
+    pool = ChainPool()
+    db = _db()
+    other = dict(PARAMS, temperature=0.5)
+    assert pool.chain(db, PARAMS) is not pool.chain(db, other)
+    assert factories[0].call_count == 2
+
+
+def test_chain_rebuilt_for_new_db_keeps_client(factories):
+    """Test qu'un SQLDatabase recréé reconstruit la chaîne, pas le client"""
+    pool = ChainPool()
+    first = pool.chain(_db(), PARAMS)
+    assert pool.chain(_db(), PARAMS) is not first
+    factories[0].assert_called_once()
+    assert factories[1].call_count == 2
+
+
+def test_llm_shared_across_threads(factories):
+    """Test qu'un seul client est créé sous accès concurrent"""
+    pool = ChainPool()
+    clients = []
+    threads = [
+        threading.Thread(target=lambda: clients.append(pool.llm(PARAMS)))
+        for _ in range(8)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len({id(c) for c in clients}) == 1
+    factories[0].assert_called_once()
+
+
+def test_lru_eviction(factories):
+    """Test que la configuration la moins récente est évincée avec ses chaînes"""
+    pool = ChainPool(max_clients=2)
+    db = _db()
+    first = pool.chain(db, PARAMS)
+    pool.chain(db, dict(PARAMS, max_tokens=500))
+    pool.chain(db, PARAMS)  # PARAMS redevient la plus récente
+    pool.chain(db, dict(PARAMS, max_tokens=800))
+    assert pool.evictions == 1
+    assert pool.chain(db, PARAMS) is first
+    assert factories[0].call_count == 3
+    pool.chain(db, dict(PARAMS, max_tokens=500))
+    assert factories[0].call_count == 4
+
+
+def test_clear(factories):
+    """Test que clear force la recréation"""
+    pool = ChainPool()
+    pool.llm(PARAMS)
+    pool.clear()
+    pool.llm(PARAMS)
+    assert factories[0].call_count == 2
@@ -0,0 +1,36 @@
+import pytest
+from infrastructure.metrics import LatencyHistogram
+
+
+def test_histogram_percentiles():
+    """Test les percentiles approchés de l'histogramme"""
+    histogram = LatencyHistogram()
+    for _ in range(90):
+        histogram.record(0.001)
+    for _ in range(10):
+        histogram.record(0.5)
+
+    assert histogram.count == 100
+    # Précision relative bornée par le facteur de croissance des seaux
+    assert 0.001 <= histogram.percentile(50) < 0.00125
+    assert 0.5 <= histogram.percentile(99) < 0.625
+
+
+def test_histogram_empty_and_overflow():
+    """Test un histogramme vide puis une valeur hors bornes"""
+    histogram = LatencyHistogram(max_value=1.0)
+    assert histogram.percentile(99) == 0.0
+    histogram.record(10.0)
+    assert histogram.percentile(99) == 1.0
+
+
+def test_histogram_snapshot_and_reset():
+    """Test le résumé en millisecondes et la remise à zéro"""
+    histogram = LatencyHistogram()
+    histogram.record(0.002)
+    snapshot = histogram.snapshot()
+    assert snapshot["count"] == 1
+    assert snapshot["p50_ms"] == pytest.approx(2.0, rel=0.25)
+
+    histogram.reset()
+    assert histogram.count == 0
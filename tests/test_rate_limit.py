@@ -0,0 +1,152 @@
+import threading
+import time
+import pytest
+from unittest.mock import Mock, patch
+from infrastructure import rate_limit
+from infrastructure.rate_limit import (
+    LocalRateLimiter,
+    RateLimitExceeded,
+    RedisRateLimiter,
+    TokenBucket,
+)
+
+
+def test_token_bucket_refill():
+    """Test la consommation puis la recharge d'un seau"""
+    bucket = TokenBucket(capacity=2, refill_per_second=1)
+    now = bucket.updated_at
+    for _ in range(2):
+        assert bucket.wait_time(now) == 0
+        bucket.take()
+    assert bucket.wait_time(now) == pytest.approx(1.0)
+    assert bucket.wait_time(now + 1) == 0
+
+
+def test_local_global_limit():
+    """Test que le seau global refuse au-delà du quota sans attente"""
+    limiter = LocalRateLimiter(requests=2, window=3600)
+    limiter.acquire()
+    limiter.acquire()
+    with pytest.raises(RateLimitExceeded) as exc:
+        limiter.acquire()
+    assert exc.value.retry_after > 0
+    assert limiter.rejected == 1
+
+
+def test_local_session_limit_isolated():
+    """Test qu'une session gourmande n'épuise pas le quota des autres"""
+    limiter = LocalRateLimiter(requests=100, window=3600, session_requests=1)
+    limiter.acquire("a")
+    with pytest.raises(RateLimitExceeded):
+        limiter.acquire("a")
+    limiter.acquire("b")
+
+
+def test_rejected_session_does_not_consume_global():
+    """Test qu'un refus de session ne débite pas le seau global"""
+    limiter = LocalRateLimiter(requests=2, window=3600, session_requests=1)
+    limiter.acquire("a")
+    with pytest.raises(RateLimitExceeded):
+        limiter.acquire("a")
+    limiter.acquire("b")
+
+
+def test_local_queueing():
+    """Test qu'un appel attend un jeton plutôt que d'être refusé"""
+    # 1 jeton puis recharge de 20 jetons/s
+    limiter = LocalRateLimiter(requests=1, window=0.05, max_wait=1)
+    limiter.acquire()
+    waited = limiter.acquire()
+    assert 0 < waited < 1
+    assert limiter.waited == 1
+
+
+def test_disabled():
+    """Test que requests=0 désactive le limiteur"""
+    limiter = LocalRateLimiter(requests=0, window=60)
+    for _ in range(100):
+        assert limiter.acquire("a") == 0
+
+
+def test_local_thread_safe():
+    """Test qu'exactement le quota passe sous accès concurrent"""
+    limiter = LocalRateLimiter(requests=10, window=3600)
+    granted = []
+
+    def _worker():
+        try:
+            limiter.acquire()
+            granted.append(1)
+        except RateLimitExceeded:
+            pass
+
+    threads = [threading.Thread(target=_worker) for _ in range(30)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(granted) == 10
+
+
+@pytest.fixture
+def redis_client():
+    """Serveur Redis simulé (fakeredis)"""
+    fakeredis = pytest.importorskip("fakeredis")
+    return fakeredis.FakeRedis()
+
+
+def test_redis_limit_shared_between_replicas(redis_client):
+    """Test que deux réplicas partagent le même quota"""
+    replicas = [
+        RedisRateLimiter(redis_client, requests=3, window=3600, prefix="t:")
+        for _ in range(2)
+    ]
+    replicas[0].acquire()
+    replicas[1].acquire()
+    replicas[0].acquire()
+    with pytest.raises(RateLimitExceeded):
+        replicas[1].acquire()
+
+
+def test_redis_refusal_rolls_back(redis_client):
+    """Test qu'un refus de session ne consomme pas le compteur global"""
+    limiter = RedisRateLimiter(
+        redis_client, requests=10, window=3600, session_requests=1, prefix="t:"
+    )
+    limiter.acquire("a")
+    for _ in range(3):
+        with pytest.raises(RateLimitExceeded):
+            limiter.acquire("a")
+    index = int(time.time() // 3600)
+    assert int(redis_client.get(f"t:ratelimit:global:{index}")) == 1
+
+
+def test_redis_sliding_window_counts_previous(redis_client):
+    """Test que la fenêtre précédente compte au prorata"""
+    limiter = RedisRateLimiter(redis_client, requests=5, window=3600, prefix="t:")
+    index = int(time.time() // 3600)
+    redis_client.set(f"t:ratelimit:global:{index - 1}", 1000)
+    with pytest.raises(RateLimitExceeded):
+        limiter.acquire()
+
+
+def test_redis_failure_falls_back_to_local():
+    """Test le repli sur le limiteur local quand Redis est injoignable"""
+    redis = pytest.importorskip("redis")
+    client = Mock()
+    client.pipeline.return_value.execute.side_effect = redis.ConnectionError("down")
+    limiter = RedisRateLimiter(client, requests=1, window=3600)
+    limiter.acquire()
+    with pytest.raises(RateLimitExceeded):
+        limiter.acquire()
+    # Redis n'est plus interrogé pendant retry_interval
+    assert client.pipeline.call_count == 1
+
+
+def test_create_rate_limiter():
+    """Test le choix de la variante selon la configuration"""
+    with patch.object(rate_limit.settings, "redis_url", None):
+        assert isinstance(rate_limit.create_rate_limiter(), LocalRateLimiter)
+    pytest.importorskip("redis")
+    with patch.object(rate_limit.settings, "redis_url", "redis://localhost:6379/0"):
+        assert isinstance(rate_limit.create_rate_limiter(), RedisRateLimiter)
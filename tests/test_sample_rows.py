@@ -0,0 +1,137 @@
+import threading
+import pytest
+from unittest.mock import Mock
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.pool import StaticPool
+from infrastructure.sample_rows import SampleRowStore
+
+
+@pytest.fixture
+def engine():
+    """Base SQLite en mémoire avec un schéma usedcar_dwh et un compteur de requêtes"""
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    with engine.begin() as conn:
+        conn.execute(text("ATTACH DATABASE ':memory:' AS usedcar_dwh"))
+        conn.execute(text("CREATE TABLE usedcar_dwh.cars (id INTEGER, name TEXT)"))
+        for i in range(5):
+            conn.execute(
+                text("INSERT INTO usedcar_dwh.cars VALUES (:id, :name)"),
+                {"id": i, "name": "x" * 200},
+            )
+        conn.execute(text("CREATE TABLE usedcar_dwh.shops (id INTEGER)"))
+    engine.statements = []
+    event.listen(
+        engine,
+        "before_cursor_execute",
+        lambda conn, cursor, statement, *args: engine.statements.append(statement),
+    )
+    return engine
+
+
+def test_refresh_all_tables(engine):
+    """Test que le rafraîchissement couvre toutes les tables du schéma"""
+    store = SampleRowStore(rows=2)
+    assert store.refresh(engine, "usedcar_dwh") == 2
+    assert store.refreshed_at is not None
+
+    engine.statements.clear()
+    block = store.block(engine, "usedcar_dwh", "cars")
+    assert engine.statements == []
+    assert block.startswith("\n\n/*\n2 rows from cars table:\nid\tname\n")
+    assert block.endswith("*/")
+
+
+def test_block_compact(engine):
+    """Test que le nombre de lignes et la longueur des valeurs sont bornés"""
+    store = SampleRowStore(rows=2)
+    block = store.block(engine, "usedcar_dwh", "cars")
+    lines = block.split("\n")[5:-1]
+    assert len(lines) == 2
+    assert all(len(line.split("\t")[1]) == 100 for line in lines)
+
+
+def test_block_fetched_once_on_miss(engine):
+    """Test qu'une table absente de l'instantané n'est lue qu'une fois"""
+    store = SampleRowStore(rows=3)
+    store.block(engine, "usedcar_dwh", "shops")
+    store.block(engine, "usedcar_dwh", "shops")
+    assert len([s for s in engine.statements if "LIMIT" in s]) == 1
+
+
+def test_disabled():
+    """Test que rows=0 désactive les exemples sans toucher la base"""
+    store = SampleRowStore(rows=0)
+    engine = Mock()
+    assert store.block(engine, "usedcar_dwh", "cars") == ""
+    assert store.refresh(engine, "usedcar_dwh") == 0
+    engine.connect.assert_not_called()
+
+
+def test_fetch_error_returns_empty_block():
+    """Test qu'une table illisible ne fait pas échouer la génération"""
+    engine = Mock()
+    engine.connect.side_effect = Exception("permission denied")
+    store = SampleRowStore(rows=3)
+    assert store.block(engine, "usedcar_dwh", "cars") == ""
+    # L'échec n'est pas gardé : la lecture suivante réessaie
+    assert store.block(engine, "usedcar_dwh", "cars") == ""
+    assert engine.connect.call_count == 2
+
+
+def test_refresh_failure_keeps_snapshot(engine):
+    """Test qu'un rafraîchissement pendant une coupure garde l'instantané"""
+    store = SampleRowStore(rows=2)
+    store.refresh(engine, "usedcar_dwh")
+    block = store.block(engine, "usedcar_dwh", "cars")
+
+    down = Mock()
+    down.connect.side_effect = Exception("connection refused")
+    with pytest.raises(Exception, match="connection refused"):
+        store.refresh(down, "usedcar_dwh", ["cars", "shops"])
+    assert store.block(engine, "usedcar_dwh", "cars") == block
+
+
+def test_refresh_keeps_block_of_failed_table(engine):
+    """Test qu'une table en échec garde son bloc, les autres sont rechargées"""
+    store = SampleRowStore(rows=2)
+    store.refresh(engine, "usedcar_dwh")
+    block = store.block(engine, "usedcar_dwh", "cars")
+    with engine.begin() as conn:
+        conn.execute(text("DROP TABLE usedcar_dwh.cars"))
+        conn.execute(text("INSERT INTO usedcar_dwh.shops VALUES (7)"))
+    assert store.refresh(engine, "usedcar_dwh", ["cars", "shops"]) == 1
+    assert store.block(engine, "usedcar_dwh", "cars") == block
+    assert "7" in store.block(engine, "usedcar_dwh", "shops")
+
+
+def test_invalidate(engine):
+    """Test que l'invalidation vide l'instantané"""
+    store = SampleRowStore(rows=3)
+    store.refresh(engine, "usedcar_dwh")
+    store.invalidate()
+    assert store.refreshed_at is None
+    engine.statements.clear()
+    store.block(engine, "usedcar_dwh", "cars")
+    assert engine.statements
+
+
+def test_start_refresh_background(engine):
+    """Test que le rafraîchissement s'exécute sur un thread dédié"""
+    store = SampleRowStore(rows=3)
+    done = threading.Event()
+    original = store.refresh
+
+    def _refresh(*args):
+        count = original(*args)
+        done.set()
+        return count
+
+    store.refresh = _refresh
+    store.start_refresh(lambda: engine, "usedcar_dwh", interval=3600)
+    assert done.wait(5)
+    store.stop()
+    assert store.block(engine, "usedcar_dwh", "cars")
@@ -0,0 +1,151 @@
+import threading
+import time
+import pytest
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.pool import StaticPool
+from infrastructure.sample_rows import SampleRowStore
+from infrastructure.schema_cache import CachedSQLDatabase, SchemaCache
+
+
+@pytest.fixture
+def engine():
+    """Base SQLite en mémoire avec un schéma usedcar_dwh et un compteur de requêtes"""
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    with engine.begin() as conn:
+        conn.execute(text("ATTACH DATABASE ':memory:' AS usedcar_dwh"))
+        conn.execute(text("CREATE TABLE usedcar_dwh.cars (id INTEGER, name TEXT)"))
+        conn.execute(text("INSERT INTO usedcar_dwh.cars VALUES (1, 'Prius')"))
+        conn.execute(text("CREATE TABLE usedcar_dwh.shops (id INTEGER)"))
+    engine.statements = []
+    event.listen(
+        engine,
+        "before_cursor_execute",
+        lambda conn, cursor, statement, *args: engine.statements.append(statement),
+    )
+    return engine
+
+
+def test_get_db_reused(engine):
+    """Test que l'instance SQLDatabase est partagée jusqu'au TTL"""
+    cache = SchemaCache(ttl=600)
+    db = cache.get_db(engine, "usedcar_dwh")
+    assert isinstance(db, CachedSQLDatabase)
+    assert cache.get_db(engine, "usedcar_dwh") is db
+
+
+def test_table_info_memoized(engine):
+    """Test que table_info ne réinterroge pas la base une fois en cache"""
+    cache = SchemaCache(ttl=600)
+    db = cache.get_db(engine, "usedcar_dwh")
+    info = db.get_table_info()
+    assert "CREATE TABLE usedcar_dwh.cars" in info and "Prius" in info
+    engine.statements.clear()
+    assert cache.get_db(engine, "usedcar_dwh").get_table_info() == info
+    assert engine.statements == []
+
+
+def test_table_info_by_table_names(engine):
+    """Test que la clé dépend des tables demandées, pas de leur ordre"""
+    cache = SchemaCache(ttl=600)
+    db = cache.get_db(engine, "usedcar_dwh")
+    info = db.get_table_info(["shops", "cars"])
+    assert db.get_table_info(["cars", "shops"]) == info
+    assert "cars" not in db.get_table_info(["shops"])
+
+
+def test_table_info_expires(engine):
+    """Test qu'un TTL nul force le recalcul"""
+    cache = SchemaCache(ttl=0)
+    calls = []
+    cache.table_info("usedcar_dwh", None, lambda: calls.append(1) or "info")
+    cache.table_info("usedcar_dwh", None, lambda: calls.append(1) or "info")
+    assert len(calls) == 2
+
+
+def test_sample_rows_from_snapshot(engine):
+    """Test que les lignes d'exemple viennent de l'instantané en mémoire"""
+    store = SampleRowStore(rows=3)
+    store.refresh(engine, "usedcar_dwh")
+    cache = SchemaCache(ttl=600, sample_store=store)
+    engine.statements.clear()
+    info = cache.get_db(engine, "usedcar_dwh").get_table_info(["cars"])
+    assert "3 rows from cars table:\nid\tname\n1\tPrius" in info
+    assert not any("LIMIT" in statement for statement in engine.statements)
+
+
+def test_invalidate(engine):
+    """Test que l'invalidation oublie l'instance et le texte en cache"""
+    cache = SchemaCache(ttl=600)
+    db = cache.get_db(engine, "usedcar_dwh")
+    db.get_table_info()
+    cache.invalidate()
+    assert cache.get_db(engine, "usedcar_dwh") is not db
+    assert cache.table_info("usedcar_dwh", None, lambda: "fresh") == "fresh"
+
+
+def test_persisted_to_disk(engine, tmp_path):
+    """Test que table_info survit au redémarrage via le fichier"""
+    path = str(tmp_path / "schema.json")
+    info = (
+        SchemaCache(ttl=600, path=path).get_db(engine, "usedcar_dwh").get_table_info()
+    )
+
+    restarted = SchemaCache(ttl=600, path=path)
+    engine.statements.clear()
+    assert restarted.get_db(engine, "usedcar_dwh").get_table_info() == info
+    # Pas de réflexion des colonnes : la DDL vient du fichier
+    assert not any("table_xinfo" in statement for statement in engine.statements)
+
+
+def test_corrupted_file_ignored(tmp_path):
+    """Test qu'un fichier illisible ne bloque pas le démarrage"""
+    path = tmp_path / "schema.json"
+    path.write_text("not json")
+    cache = SchemaCache(ttl=600, path=str(path))
+    assert cache.table_info("usedcar_dwh", None, lambda: "info") == "info"
+
+
+def test_table_info_compute_outside_lock():
+    """Test qu'une table froide ne bloque pas les autres et n'est calculée qu'une fois"""
+    cache = SchemaCache(ttl=600)
+    cache.table_info("usedcar_dwh", ["shops"], lambda: "DDL shops")
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def _slow():
+        calls.append(1)
+        started.set()
+        release.wait(1)
+        return "DDL cars"
+
+    threads = [
+        threading.Thread(target=cache.table_info, args=("usedcar_dwh", ["cars"], _slow))
+        for _ in range(3)
+    ]
+    for thread in threads:
+        thread.start()
+    assert started.wait(1)
+    start = time.monotonic()
+    assert cache.table_info("usedcar_dwh", ["shops"], _slow) == "DDL shops"
+    assert time.monotonic() - start < 0.1
+    release.set()
+    for thread in threads:
+        thread.join(1)
+    assert calls == [1]
+    assert cache.table_info("usedcar_dwh", ["cars"], _slow) == "DDL cars"
+
+
+def test_table_info_not_kept_after_invalidate():
+    """Test qu'un calcul commencé avant une invalidation n'est pas mémorisé"""
+    cache = SchemaCache(ttl=600)
+
+    def _compute():
+        cache.invalidate()
+        return "DDL obsolète"
+
+    assert cache.table_info("usedcar_dwh", ["cars"], _compute) == "DDL obsolète"
+    assert cache.table_info("usedcar_dwh", ["cars"], lambda: "DDL") == "DDL"
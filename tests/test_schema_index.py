@@ -0,0 +1,89 @@
+import pytest
+from unittest.mock import Mock, patch
+from sqlalchemy import exc as sa_exc
+from benchmarks.demo_schema import SCHEMA, create_demo_engine
+from infrastructure import schema_index
+from infrastructure.schema_index import SchemaIndex, TableSelector, tokenize
+
+
+@pytest.fixture(scope="module")
+def engine():
+    """Schéma de démonstration usedcar_dwh"""
+    return create_demo_engine()
+
+
+def test_tokenize_ngrams():
+    """Test les n-grammes japonais et les mots ASCII entiers"""
+    tokens = tokenize("成約台数 sold_cars")
+    assert {"成約", "約台", "台数", "成約台"} <= set(tokens)
+    assert {"sold", "cars"} <= set(tokens)
+
+
+def test_tokenize_normalizes_width():
+    """Test que les caractères pleine chasse sont normalisés"""
+    assert "price" in tokenize("ＰＲＩＣＥ")
+
+
+def test_index_ranks_relevant_table():
+    """Test que la table décrite par la question est classée première"""
+    index = SchemaIndex(
+        {"sold_cars": "sold_cars 成約 販売", "calls": "calls 電話 問い合わせ"}
+    )
+    assert index.search("電話の件数", top_k=2) == ["calls"]
+
+
+def test_index_no_match():
+    """Test qu'une question sans rapport ne sélectionne aucune table"""
+    index = SchemaIndex({"sold_cars": "sold_cars 成約"})
+    assert index.search("天気", top_k=3) == []
+
+
+def test_selector_example_question(engine):
+    """Test l'élagage sur la question d'exemple de l'interface"""
+    selector = TableSelector(top_k=5)
+    tables = selector.select(
+        engine,
+        SCHEMA,
+        "2025年5月1日から5月7日までの都道府県別の成約台数と掲載台数を集計して。",
+    )
+    assert {"sold_cars", "display_cars"} <= set(tables)
+    assert len(tables) <= 5
+    assert not any(t.startswith(("mst_", "log_", "tmp_", "stg_")) for t in tables)
+
+
+def test_selector_index_built_once(engine):
+    """Test que l'index n'est construit qu'une fois par processus"""
+    selector = TableSelector(top_k=3)
+    with patch.object(
+        schema_index, "build_documents", wraps=schema_index.build_documents
+    ) as build:
+        selector.select(engine, SCHEMA, "成約台数")
+        selector.select(engine, SCHEMA, "掲載台数")
+    build.assert_called_once()
+
+
+def test_selector_disabled():
+    """Test que top_k=0 garde le schéma complet"""
+    assert TableSelector(top_k=0).select(Mock(), SCHEMA, "成約台数") is None
+
+
+def test_selector_failure_keeps_full_schema():
+    """Test qu'une erreur de catalogue n'empêche pas la génération"""
+    with patch.object(schema_index, "build_documents", side_effect=Exception("down")):
+        assert TableSelector(top_k=3).select(Mock(), SCHEMA, "成約台数") is None
+
+
+def test_register_synonyms(engine, monkeypatch):
+    """Test qu'un synonyme ajouté rend une table trouvable"""
+    monkeypatch.setattr(schema_index, "SYNONYMS", {})
+    schema_index.register_synonyms("calls", ["コールセンター"])
+    tables = TableSelector(top_k=1).select(engine, SCHEMA, "コールセンターの件数")
+    assert tables == ["calls"]
+
+
+def test_selector_redshift_down_propagates():
+    """Test qu'une coupure de Redshift remonte au disjoncteur de l'appelant"""
+    down = sa_exc.OperationalError("SELECT", {}, Exception("connection refused"))
+    with patch.object(schema_index, "build_documents", side_effect=down):
+        with pytest.raises(sa_exc.OperationalError):
+            TableSelector(top_k=3).select(Mock(), SCHEMA, "成約台数")
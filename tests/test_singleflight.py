@@ -0,0 +1,92 @@
+import threading
+import time
+import pytest
+from infrastructure.singleflight import SingleFlight
+
+
+def test_single_flight_coalesces_concurrent_calls():
+    """Test que les appels simultanés d'une même clé n'exécutent qu'une fois"""
+    flight = SingleFlight()
+    calls = []
+    results = []
+    start = threading.Barrier(8)
+
+    def compute():
+        calls.append(1)
+        time.sleep(0.2)
+        return "SELECT 1"
+
+    def worker():
+        start.wait()
+        results.append(flight.do("sql:key", compute))
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(calls) == 1
+    assert results == ["SELECT 1"] * 8
+    assert flight.in_flight() == 0
+    assert flight.stats() == {"in_flight": 0, "waiters": 0, "shared": 7}
+
+
+def test_single_flight_stats_waiters():
+    """Test le nombre d'appelants en attente pendant l'exécution du leader"""
+    flight = SingleFlight()
+    release = threading.Event()
+    started = threading.Event()
+
+    def compute():
+        started.set()
+        release.wait(1)
+        return 1
+
+    leader = threading.Thread(target=flight.do, args=("key", compute))
+    leader.start()
+    started.wait(1)
+    follower = threading.Thread(target=flight.do, args=("key", compute))
+    follower.start()
+    deadline = time.time() + 1
+    while flight.stats()["waiters"] < 1 and time.time() < deadline:
+        time.sleep(0.01)
+    assert flight.stats() == {"in_flight": 1, "waiters": 1, "shared": 1}
+    release.set()
+    leader.join()
+    follower.join()
+    assert flight.stats()["waiters"] == 0
+
+
+def test_single_flight_propagates_errors():
+    """Test que l'exception du leader est remontée à tous les appelants"""
+    flight = SingleFlight()
+    started = threading.Event()
+    errors = []
+
+    def failing():
+        started.set()
+        time.sleep(0.1)
+        raise ValueError("LLM down")
+
+    def follower():
+        started.wait()
+        try:
+            flight.do("key", failing)
+        except ValueError as e:
+            errors.append(e)
+
+    t = threading.Thread(target=follower)
+    t.start()
+    with pytest.raises(ValueError):
+        flight.do("key", failing)
+    t.join()
+
+    assert len(errors) == 1
+
+
+def test_single_flight_runs_again_after_completion():
+    """Test qu'une nouvelle exécution a lieu une fois la précédente terminée"""
+    flight = SingleFlight()
+    assert flight.do("key", lambda: 1) == 1
+    assert flight.do("key", lambda: 2) == 2
@@ -0,0 +1,93 @@
+from datetime import date
+import pytest
+from infrastructure.cache import CacheManager
+from infrastructure.sql_templates import (
+    DateTemplateCache,
+    extract_dates,
+    is_templatable,
+)
+
+SQL = """WITH range_date AS (
+  SELECT
+    to_date('2025-05-01', 'yyyy-mm-dd') AS start_date,
+    to_date('2025-05-07', 'yyyy-mm-dd') AS end_date
+)
+SELECT prefecture_name, COUNT(*)
+FROM sold_cars
+LIMIT 10;"""
+
+
+@pytest.fixture
+def templates():
+    """Gabarits adossés à un cache isolé"""
+    return DateTemplateCache(CacheManager(sweep_interval=0))
+
+
+def test_extract_dates_inherits_year():
+    """Test l'extraction des dates et l'héritage de l'année"""
+    template, dates = extract_dates("2025年5月1日から5月7日までの台数")
+    assert template == "{d0}から{d1}までの台数"
+    assert dates == [date(2025, 5, 1), date(2025, 5, 7)]
+    # La date recule : l'année héritée passe à la suivante
+    _, dates = extract_dates("2025年12月25日から1月5日までの台数")
+    assert dates == [date(2025, 12, 25), date(2026, 1, 5)]
+
+
+def test_extract_dates_rejects_unresolvable():
+    """Test les questions sans date exploitable"""
+    assert extract_dates("先月の台数") is None
+    assert extract_dates("5月1日の台数") is None
+    assert extract_dates("2025年2月30日の台数") is None
+
+
+def test_is_templatable():
+    """Test la détection des SQL dont les dates sont substituables"""
+    dates = [date(2025, 5, 1), date(2025, 5, 7)]
+    assert is_templatable(SQL, dates) is True
+    # Date dérivée (fin + 1 jour) : substitution impossible
+    assert is_templatable(SQL.replace("2025-05-07", "2025-05-08"), dates) is False
+    # Année en clair ailleurs dans la requête
+    assert is_templatable(SQL + "\n-- 2025", dates) is False
+
+
+def test_reuse_substitutes_dates(templates):
+    """Test la substitution des littéraux de range_date"""
+    assert templates.remember("2025年5月1日から5月7日までの台数。", SQL) is True
+
+    sql = templates.reuse("２０２５年６月１０日から６月１２日までの台数")
+    assert "to_date('2025-06-10', 'yyyy-mm-dd')" in sql
+    assert "to_date('2025-06-12', 'yyyy-mm-dd')" in sql
+    assert "2025-05" not in sql
+    assert templates.hits == 1
+
+
+def test_reuse_shifted_dates_single_pass(templates):
+    """Test qu'une date reprise d'une autre position n'est pas réécrite en chaîne"""
+    templates.remember("2025年5月1日から5月7日までの台数", SQL)
+    sql = templates.reuse("2025年5月7日から5月10日までの台数")
+    assert "to_date('2025-05-07', 'yyyy-mm-dd') AS start_date" in sql
+    assert "to_date('2025-05-10', 'yyyy-mm-dd') AS end_date" in sql
+
+
+def test_reuse_across_year_end(templates):
+    """Test une période à cheval sur deux années (année héritée avancée)"""
+    templates.remember("2025年5月1日から5月7日までの台数", SQL)
+    sql = templates.reuse("2025年12月25日から1月5日までの台数")
+    assert "to_date('2025-12-25', 'yyyy-mm-dd') AS start_date" in sql
+    assert "to_date('2026-01-05', 'yyyy-mm-dd') AS end_date" in sql
+
+
+def test_reuse_rejects_inverted_period(templates):
+    """Test qu'une période inversée n'est pas servie depuis le gabarit"""
+    templates.remember("2025年5月1日から5月7日までの台数", SQL)
+    assert templates.reuse("2025年5月7日から2025年5月1日までの台数") is None
+    assert templates.reuse("2025年12月25日から2025年1月5日までの台数") is None
+    assert templates.hits == 0
+
+
+def test_reuse_other_question_or_namespace_misses(templates):
+    """Test qu'une autre question ou une autre empreinte ne réutilise rien"""
+    templates.remember("2025年5月1日から5月7日までの台数", SQL, "v1")
+    assert templates.reuse("2025年6月1日から6月7日までの掲載台数", "v1") is None
+    assert templates.reuse("2025年6月1日から6月7日までの台数", "v2") is None
+    assert templates.reuse("2025年6月1日から6月7日までの台数", "v1") is not None
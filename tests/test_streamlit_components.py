@@ -1,5 +1,6 @@
 """Tests des composants Streamlit"""
 
+from unittest.mock import patch
 from ui.components.main_content import set_example_question
 
 
@@ -8,3 +9,150 @@ def test_set_example_question():
     example = "Question exemple"
     set_example_question(example)
     assert example == "Question exemple"
+
+
+def test_render_cache_metrics():
+    """Test l'affichage des métriques du cache dans la sidebar"""
+    import streamlit as st
+    from ui.components import sidebar
+
+    with patch.object(sidebar, "get_text", side_effect=lambda key, **kw: key):
+        sidebar.render_cache_metrics()
+
+    assert st.metric.call_count == 2
+    st.caption.assert_called_once()
+
+
+def test_execute_sql_query_renders_chunks():
+    """Test l'affichage incrémental des paquets de résultats"""
+    import streamlit as st
+    from ui.components import main_content
+
+    chunks = [(["a"], [(1,), (2,)]), (["a"], [(3,)])]
+    with (
+        patch.object(main_content, "get_text", side_effect=lambda key, **kw: key),
+        patch.object(
+            main_content.db_manager, "stream_query", return_value=iter(chunks)
+        ),
+        patch("streamlit.empty") as mock_empty,
+    ):
+        main_content.execute_sql_query("SELECT a FROM t")
+
+    table = mock_empty.return_value
+    # Un rendu par paquet reçu
+    assert table.dataframe.call_count == 2
+    assert len(table.dataframe.call_args[0][0]) == 3
+
+
+class _SessionState(dict):
+    """session_state minimal avec accès par attribut"""
+
+    __getattr__ = dict.get
+    __setattr__ = dict.__setitem__
+
+
+def test_generate_sql_query_submits_job():
+    """Test que la génération est soumise sans bloquer le script"""
+    from ui.components import main_content
+
+    state = _SessionState(llm_config={"temperature": 0.2})
+    with (
+        patch.object(
+            main_content.job_manager, "submit", return_value="job-1"
+        ) as submit,
+        patch.object(main_content.question_log, "record") as record,
+        patch("streamlit.session_state", state),
+    ):
+        main_content.generate_sql_query("question")
+
+    record.assert_called_once_with("question")
+    submit.assert_called_once_with("question", {"temperature": 0.2}, session_id=None)
+    assert state["generation_job"] == "job-1"
+
+
+def test_poll_generation_job_shows_partial_sql():
+    """Test que le SQL partiel d'un travail en cours est affiché"""
+    from ui.components import main_content
+    from infrastructure.jobs import RUNNING, GenerationJob
+
+    job = GenerationJob("question")
+    job.status = RUNNING
+    job.partial = "SELECT 1"
+    state = _SessionState(generation_job=job.id)
+    with (
+        patch.object(main_content, "get_text", side_effect=lambda key, **kw: key),
+        patch.object(main_content.job_manager, "get", return_value=job),
+        patch("streamlit.session_state", state),
+        patch("streamlit.code") as mock_code,
+        patch("streamlit.rerun") as mock_rerun,
+    ):
+        main_content._poll_generation_job()
+
+    mock_code.assert_called_once_with("SELECT 1 ▌", language="sql")
+    mock_rerun.assert_not_called()
+    assert state["generation_job"] == job.id
+
+
+def test_poll_generation_job_applies_result():
+    """Test que le résultat survit au rerun : session mise à jour, message unique"""
+    from ui.components import main_content
+    from infrastructure.jobs import DONE, GenerationJob
+
+    job = GenerationJob("question")
+    job.status, job.sql = DONE, "SELECT 1;"
+    state = _SessionState(generation_job=job.id)
+    with (
+        patch.object(main_content, "get_text", side_effect=lambda key, **kw: key),
+        patch.object(main_content.job_manager, "get", return_value=job),
+        patch("streamlit.session_state", state),
+        patch("streamlit.rerun") as mock_rerun,
+        patch("streamlit.success") as mock_success,
+    ):
+        main_content._poll_generation_job()
+        mock_rerun.assert_called_once()
+        main_content._render_generation_notice()
+        main_content._render_generation_notice()
+
+    assert state["generated_sql"] == "SELECT 1;"
+    assert state["generation_job"] is None
+    assert state["query_history"][0]["question"] == "question"
+    mock_success.assert_called_once_with("success_generated")
+
+
+def test_poll_generation_job_circuit_open():
+    """Test l'avertissement quand Gemini est coupé"""
+    from ui.components import main_content
+    from infrastructure.jobs import FAILED, GenerationJob
+
+    job = GenerationJob("question")
+    job.status = FAILED
+    job.error = main_content.CircuitOpenError("gemini", 12)
+    state = _SessionState(generation_job=job.id)
+    with (
+        patch.object(main_content, "get_text", side_effect=lambda key, **kw: key),
+        patch.object(main_content.job_manager, "get", return_value=job),
+        patch("streamlit.session_state", state),
+        patch("streamlit.rerun"),
+    ):
+        main_content._poll_generation_job()
+
+    assert state["generation_notice"] == ("warning", "service_unavailable")
+    assert "generated_sql" not in state
+
+
+def test_render_system_info_circuit_state():
+    """Test l'affichage de l'état des disjoncteurs dans la sidebar"""
+    from ui.components import sidebar
+    from infrastructure.circuit_breaker import CircuitBreaker
+
+    breaker = CircuitBreaker("redshift", failure_threshold=1, reset_timeout=60)
+    breaker._on_failure(ConnectionError("down"))
+    with (
+        patch.object(sidebar, "get_text", side_effect=lambda key, **kw: key),
+        patch("streamlit.metric") as mock_metric,
+    ):
+        sidebar.render_circuit_metric("DB", breaker)
+
+    mock_metric.assert_called_once_with(
+        "DB", "🔴", "circuit_open", delta_color="inverse"
+    )
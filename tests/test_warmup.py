@@ -0,0 +1,147 @@
+import json
+import threading
+import pytest
+from unittest.mock import Mock, patch
+from infrastructure import fingerprint, warmup
+from infrastructure.circuit_breaker import CircuitOpenError
+from infrastructure.fingerprint import GenerationFingerprint
+from infrastructure.llm import DEFAULT_LLM_CONFIG
+from infrastructure.warmup import (
+    EXAMPLE_QUESTIONS,
+    CacheWarmer,
+    QuestionLog,
+)
+
+
+@pytest.fixture(autouse=True)
+def known_schema():
+    """Somme du schéma disponible (aucune connexion à Redshift)"""
+    with patch.object(warmup, "sql_fingerprint") as fp:
+        fp.refresh.return_value = "v1"
+        yield fp
+
+
+def test_question_log_counts_canonical_forms():
+    """Test que les variantes d'une question sont comptées ensemble"""
+    log = QuestionLog()
+    log.record("成約台数を集計して")
+    log.record("成約台数を集計して。")
+    log.record("掲載台数を集計して")
+    assert log.top(1) == ["成約台数を集計して。"]
+    assert len(log.top(5)) == 2
+
+
+def test_question_log_persisted(tmp_path):
+    """Test que le journal survit au redémarrage"""
+    path = str(tmp_path / "questions.json")
+    log = QuestionLog(path, save_interval=0)
+    log.record("question a")
+    log.record("question b")
+    log.record("question b")
+
+    assert QuestionLog(path).top(2) == ["question b", "question a"]
+    assert len(json.load(open(path, encoding="utf-8"))) == 2
+
+
+def test_question_log_bounded():
+    """Test que les questions les plus rares sont oubliées au-delà de la limite"""
+    log = QuestionLog(max_entries=2)
+    log.record("question a")
+    log.record("question a")
+    log.record("question b")
+    log.record("question c")
+    assert log.top(5) == ["question a", "question c"]
+
+
+def test_warmer_questions_examples_first():
+    """Test l'ordre : exemples puis questions fréquentes, sans doublon"""
+    log = QuestionLog()
+    example = next(iter(EXAMPLE_QUESTIONS.values()))
+    log.record("question fréquente")
+    log.record(example)
+    questions = CacheWarmer(log, top_n=5).questions()
+    assert questions[: len(EXAMPLE_QUESTIONS)] == list(EXAMPLE_QUESTIONS.values())
+    assert questions[len(EXAMPLE_QUESTIONS) :] == ["question fréquente"]
+
+
+def test_warmer_run_generates_and_pauses():
+    """Test le préchargement : quota global attendu et pause après chaque appel LLM"""
+    log = QuestionLog()
+    warmer = CacheWarmer(log, top_n=0, interval=0.5, max_wait=60)
+    results = iter([("SELECT 1;", True), ("SELECT 2;", False)])
+    with (
+        patch.object(
+            warmup, "generate_sql", side_effect=lambda *a, **kw: next(results)
+        ) as gen,
+        patch.object(warmer._stop, "wait") as wait,
+    ):
+        assert warmer.run() == {"cached": 1, "generated": 1, "failed": 0}
+    # Même espace de noms que les sessions aux réglages par défaut
+    assert all(c.args[1] == DEFAULT_LLM_CONFIG for c in gen.call_args_list)
+    assert all(c.kwargs == {"max_wait": 60} for c in gen.call_args_list)
+    wait.assert_called_once_with(0.5)
+
+
+def test_warmer_budget_limits_llm_calls():
+    """Test que le budget borne les appels LLM, pas les questions en cache"""
+    log = QuestionLog()
+    for i in range(5):
+        log.record(f"question {i}")
+    warmer = CacheWarmer(log, top_n=5, interval=0, budget=3)
+    results = iter([("SELECT 1;", True)] * 2 + [("SELECT 2;", False)] * 10)
+    with patch.object(
+        warmup, "generate_sql", side_effect=lambda *a, **kw: next(results)
+    ) as gen:
+        assert warmer.run() == {"cached": 2, "generated": 3, "failed": 0}
+    assert gen.call_count == 5
+
+
+def test_warmer_stops_when_dependency_down():
+    """Test l'arrêt du préchargement quand Gemini est coupé"""
+    warmer = CacheWarmer(QuestionLog(), top_n=0, interval=0)
+    with patch.object(
+        warmup, "generate_sql", side_effect=CircuitOpenError("gemini", 30)
+    ) as gen:
+        assert warmer.run() == {"cached": 0, "generated": 0, "failed": 0}
+    gen.assert_called_once()
+
+
+def test_warmer_waits_for_schema_checksum(known_schema):
+    """Test que le SQL préchargé est rangé sous la somme réelle, pas l'inconnue"""
+    fp = GenerationFingerprint(Mock(), "usedcar_dwh", ttl=600)
+    known_schema.refresh.side_effect = fp.refresh
+    namespaces = []
+
+    def _generate(*args, **kwargs):
+        namespaces.append(fp.base())
+        return "SELECT 1;", False
+
+    warmer = CacheWarmer(QuestionLog(), top_n=0, interval=0)
+    with (
+        patch.object(fingerprint, "schema_checksum", return_value="v1"),
+        patch.object(warmup, "generate_sql", side_effect=_generate),
+    ):
+        warmer.run()
+        assert namespaces and set(namespaces) == {fp.base()}
+    assert fp._schema_checksum == "v1"
+
+
+def test_warmer_skipped_without_schema_checksum(known_schema):
+    """Test qu'aucune génération n'est lancée si la somme du schéma est illisible"""
+    known_schema.refresh.return_value = None
+    with patch.object(warmup, "generate_sql") as gen:
+        counts = CacheWarmer(QuestionLog(), top_n=0, interval=0).run()
+    assert counts == {"cached": 0, "generated": 0, "failed": 0}
+    gen.assert_not_called()
+
+
+def test_warmer_starts_once():
+    """Test qu'un seul préchargement est lancé par processus"""
+    warmer = CacheWarmer(QuestionLog(), top_n=0, interval=0)
+    done = threading.Event()
+    with patch.object(warmer, "run", side_effect=done.set) as run:
+        warmer.start()
+        warmer.start()
+        assert done.wait(1)
+        warmer._thread.join(1)
+    run.assert_called_once()
@@ -1,26 +1,47 @@
+import pandas as pd
 import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
 
 from langue.translator import get_text
-from infrastructure.cache import cache_manager
-from infrastructure.database import connect_to_redshift
-from infrastructure.llm import get_sql_db, get_gemini_llm, create_sql_query_chain_only
+from infrastructure.batch import (
+    dedupe_questions,
+    expand_results,
+    iter_batch,
+    parse_questions,
+    results_to_csv,
+)
+from infrastructure.circuit_breaker import CircuitOpenError
+from infrastructure.database import db_manager
+from infrastructure.jobs import job_manager
+from infrastructure.llm import DEFAULT_LLM_CONFIG
+from infrastructure.rate_limit import RateLimitExceeded
+from infrastructure.settings import settings
+from infrastructure.warmup import EXAMPLE_QUESTIONS, question_log
 
 
 def render_main_content():
     """Affiche le contenu principal de l'application"""
 
     # Navigation par onglets
-    tab1, tab2, tab3 = st.tabs(
-        [get_text("tab_generator"), get_text("tab_history"), get_text("tab_settings")]
+    tab1, tab2, tab3, tab4 = st.tabs(
+        [
+            get_text("tab_generator"),
+            get_text("tab_batch"),
+            get_text("tab_history"),
+            get_text("tab_settings"),
+        ]
     )
 
     with tab1:
         render_sql_generator()
 
     with tab2:
-        render_query_history()
+        render_batch()
 
     with tab3:
+        render_query_history()
+
+    with tab4:
         render_advanced_settings()
 
 
@@ -45,22 +66,14 @@ def render_sql_generator():
     with col2:
         st.markdown(f"### {get_text('examples_title')}")
 
-        st.button(
-            get_text("example_prefecture_sales"),
-            use_container_width=True,
-            on_click=set_example_question,
-            args=(
-                "2025年5月1日から5月7日までの都道府県別の成約台数と掲載台数を集計して。",
-            ),
-        )
-        st.button(
-            get_text("example_city_label"),
-            use_container_width=True,
-            on_click=set_example_question,
-            args=(
-                "2025年5月1日時点で北海道の市区町村ごとのクライアント数をラベル（市・区・町・村・不明）別に集計して。",
-            ),
-        )
+        # Questions préchargées dans le cache au démarrage
+        for label, example in EXAMPLE_QUESTIONS.items():
+            st.button(
+                get_text(label),
+                use_container_width=True,
+                on_click=set_example_question,
+                args=(example,),
+            )
 
     # Boutons d'action
     col1, col2, col3 = st.columns([2, 1, 1])
@@ -87,76 +100,126 @@ def render_sql_generator():
             # Recharger l’interface proprement
             st.rerun()
 
-    # Génération SQL
+    # Génération SQL en arrière-plan
     if generate_clicked and question:
         generate_sql_query(question)
 
+    # Travail en cours : suivi par un fragment, y compris après un rerun
+    if st.session_state.get("generation_job"):
+        render_generation_job()
+    _render_generation_notice()
+
     # Affichage du résultat
     if "generated_sql" in st.session_state and st.session_state.generated_sql:
         render_sql_result(st.session_state.generated_sql)
 
 
+def _add_to_history(question, sql):
+    """Ajoute une entrée en tête de l'historique de la session"""
+    if "query_history" not in st.session_state:
+        st.session_state.query_history = []
+
+    st.session_state.query_history.insert(
+        0,
+        {
+            "question": question,
+            "sql": sql,
+            "timestamp": str(st.session_state.get("current_time", "now")),
+        },
+    )
+
+
+def _session_id():
+    """Identifiant de la session Streamlit (quota par session)"""
+    ctx = get_script_run_ctx()
+    return ctx.session_id if ctx is not None else None
+
+
 def generate_sql_query(question):
-    """Génère la requête SQL sans exécution via LangChain SQL Chain + cache"""
-    try:
-        with st.spinner(get_text("generating")):
-            cached_sql = cache_manager.get_cached_sql_result(question)
-
-            if cached_sql:
-                st.session_state.generated_sql = cached_sql
-
-                # Historique
-                if "query_history" not in st.session_state:
-                    st.session_state.query_history = []
-
-                st.session_state.query_history.insert(
-                    0,
-                    {
-                        "question": question,
-                        "sql": cached_sql,
-                        "timestamp": str(st.session_state.get("current_time", "now")),
-                    },
-                )
-
-                st.success(get_text("success_cache"))
-                return
-
-            engine = connect_to_redshift()
-            db = get_sql_db(engine)
-            llm = get_gemini_llm()
-
-            sql_chain = create_sql_query_chain_only(llm, db)
-            result = sql_chain.invoke({"question": question})
-            cleaned_sql = (
-                result.replace("```sql", "")
-                .replace("```", "")
-                .replace("SQLQuery:", "")
-                .strip()
-            )
+    """
+    Soumet la génération au pool partagé ; le script n'attend pas la réponse
+    (cache + single-flight : les sessions qui posent la même question en même
+    temps partagent un seul appel LLM)
+    """
+    # Fréquences des questions : base du préchargement au prochain démarrage
+    question_log.record(question)
+    st.session_state.generation_job = job_manager.submit(
+        question, st.session_state.get("llm_config"), session_id=_session_id()
+    )
 
-            if cleaned_sql:
-                st.session_state.generated_sql = cleaned_sql
-                cache_manager.cache_sql_result(question, cleaned_sql)
 
-                if "query_history" not in st.session_state:
-                    st.session_state.query_history = []
+def _poll_generation_job():
+    """État du travail en cours : SQL partiel, puis résultat à la fin"""
+    job = job_manager.get(st.session_state.get("generation_job"))
+    if job is None:
+        # Travail expiré : rien à reprendre
+        st.session_state.generation_job = None
+        return
 
-                st.session_state.query_history.insert(
-                    0,
-                    {
-                        "question": question,
-                        "sql": cleaned_sql,
-                        "timestamp": str(st.session_state.get("current_time", "now")),
-                    },
-                )
+    if not job.finished:
+        st.caption(get_text("generating"))
+        if job.partial:
+            # SQL affiché dès les premiers tokens au lieu d'attendre la réponse
+            st.markdown(f"### {get_text('sql_generated')}")
+            st.code(job.partial + " ▌", language="sql")
+        return
 
-                st.success(get_text("success_generated"))
+    st.session_state.generation_job = None
+    _apply_job_result(job)
+    # Rendu complet : le SQL final est affiché par render_sql_result
+    st.rerun()
 
-            else:
-                st.error(get_text("error_generation"))
 
-    except Exception as e:
-        st.error(f"{get_text('error_generation')}: {str(e)}")
+# Rafraîchi seul, sans relancer la page, tant que le travail n'est pas terminé
+render_generation_job = st.fragment(run_every=settings.job_poll_interval)(
+    _poll_generation_job
+)
+
+
+def _apply_job_result(job):
+    """Résultat du travail dans la session, avec le message à afficher"""
+    error = job.error
+    if error is None and job.sql:
+        st.session_state.generated_sql = job.sql
+        _add_to_history(job.question, job.sql)
+        notice = (
+            "success",
+            get_text("success_cache" if job.from_cache else "success_generated"),
+        )
+    elif error is None:
+        notice = ("error", get_text("error_generation"))
+    elif isinstance(error, RateLimitExceeded):
+        notice = (
+            "warning",
+            get_text("rate_limited", seconds=int(error.retry_after) + 1),
+        )
+    elif isinstance(error, CircuitOpenError):
+        notice = ("warning", _unavailable_text(error))
+    else:
+        notice = ("error", f"{get_text('error_generation')}: {str(error)}")
+    st.session_state.generation_notice = notice
+
+
+def _render_generation_notice():
+    """Message de fin de génération, affiché une seule fois"""
+    notice = st.session_state.get("generation_notice")
+    if notice:
+        st.session_state.generation_notice = None
+        level, message = notice
+        getattr(st, level)(message)
+
+
+def _unavailable_text(error):
+    return get_text(
+        "service_unavailable",
+        service=error.name.capitalize(),
+        seconds=int(error.retry_after) + 1,
+    )
+
+
+def _warn_unavailable(error):
+    """Dépendance coupée par son disjoncteur : message sans attente"""
+    st.warning(_unavailable_text(error))
 
 
 def render_sql_result(sql):
@@ -183,8 +246,118 @@ def render_sql_result(sql):
     # Suppression du bouton Copier (inutile car st.code a déjà la fonction)
 
     with col3:
-        if st.button(get_text("execute_button"), use_container_width=True):
-            st.info(get_text("execute_button_info"))
+        execute_clicked = st.button(
+            get_text("execute_button"), use_container_width=True
+        )
+
+    # Résultats affichés sous les boutons, sur toute la largeur
+    if execute_clicked:
+        execute_sql_query(sql)
+
+
+def execute_sql_query(sql):
+    """Exécute le SQL sur Redshift et affiche les lignes au fil des paquets"""
+    st.markdown(f"### {get_text('results_title')}")
+
+    table = st.empty()
+    status = st.empty()
+    rows = []
+    max_rows = settings.query_max_display_rows
+
+    try:
+        # Premier paquet affiché dès sa réception, sans attendre la fin
+        for columns, chunk in db_manager.stream_query(sql):
+            rows.extend(chunk[: max_rows - len(rows)])
+            table.dataframe(
+                pd.DataFrame(rows, columns=columns), use_container_width=True
+            )
+            status.caption(get_text("rows_loaded", count=len(rows)))
+
+            # Arrêt de la lecture : le curseur serveur est fermé
+            if len(rows) >= max_rows:
+                status.warning(get_text("rows_truncated", count=max_rows))
+                break
+
+        if not rows:
+            status.info(get_text("no_rows"))
+
+    except CircuitOpenError as e:
+        _warn_unavailable(e)
+
+    except Exception as e:
+        st.error(f"{get_text('execution_error')}: {str(e)}")
+
+
+def render_batch():
+    """Génération SQL d'une liste de questions (texte ou CSV)"""
+    st.markdown(f"### {get_text('tab_batch')}")
+    st.caption(get_text("batch_help"))
+
+    uploaded = st.file_uploader(get_text("batch_upload"), type=["csv", "txt"])
+    text = st.text_area(
+        get_text("batch_questions_label"), height=200, key="batch_input"
+    )
+
+    if uploaded is not None:
+        content = uploaded.getvalue().decode("utf-8-sig")
+        questions = parse_questions(
+            content, is_csv=uploaded.name.lower().endswith(".csv")
+        )
+    else:
+        questions = parse_questions(text)
+
+    if st.button(
+        get_text("batch_run"),
+        type="primary",
+        use_container_width=True,
+        disabled=not questions,
+    ):
+        if len(questions) > settings.batch_max_questions:
+            st.error(get_text("batch_too_many", max=settings.batch_max_questions))
+        else:
+            run_batch_generation(questions)
+
+    results = st.session_state.get("batch_results")
+    if results:
+        st.dataframe(pd.DataFrame(results), use_container_width=True)
+        st.download_button(
+            label=get_text("batch_download"),
+            data=results_to_csv(results),
+            file_name="batch_sql.csv",
+            mime="text/csv",
+            use_container_width=True,
+        )
+
+
+def run_batch_generation(questions):
+    """Lance le lot et affiche la progression ligne par ligne"""
+    unique, mapping = dedupe_questions(questions)
+    st.caption(get_text("batch_deduped", total=len(questions), unique=len(unique)))
+
+    progress = st.progress(0.0)
+    table = st.empty()
+    results = [None] * len(unique)
+
+    # Les threads du pool génèrent, seul le thread du script touche à l'interface
+    batch = iter_batch(unique, st.session_state.get("llm_config"), _session_id())
+    for done, (index, row) in enumerate(batch, start=1):
+        results[index] = row
+        progress.progress(
+            done / len(unique),
+            text=get_text("batch_progress", done=done, total=len(unique)),
+        )
+        table.dataframe(
+            pd.DataFrame([r for r in results if r is not None]),
+            use_container_width=True,
+        )
+
+    table.empty()
+    st.session_state.batch_results = expand_results(questions, mapping, results)
+    errors = sum(1 for r in results if r["error"])
+    if errors:
+        st.warning(get_text("batch_errors", count=errors))
+    else:
+        st.success(get_text("batch_done", count=len(unique)))
 
 
 def render_query_history():
@@ -223,7 +396,7 @@ def render_advanced_settings():
             get_text("temperature_label"),
             min_value=0.0,
             max_value=0.3,  # Limité pour SQL
-            value=0.0,  # Valeur officielle recommandée
+            value=DEFAULT_LLM_CONFIG["temperature"],  # Valeur officielle recommandée
             step=0.05,
             help="**Recommandation officielle : 0.0 pour SQL**\n\n"
             "• 0.0 = Déterministe, résultats cohérents (RECOMMANDÉ)\n"
@@ -237,7 +410,7 @@ def render_advanced_settings():
             get_text("max_tokens_label"),
             min_value=500,
             max_value=2000,
-            value=1000,  # Valeur officielle recommandée
+            value=DEFAULT_LLM_CONFIG["max_tokens"],  # Valeur officielle recommandée
             step=100,
             help="**Recommandation officielle : 1000 tokens**\n\n"
             "• 500-800 = Requêtes SQL simples\n"
@@ -270,5 +443,5 @@ def render_advanced_settings():
     with col2:
         if st.button(get_text("reset_params"), use_container_width=True):
             # Reset aux valeurs optimales recommandées
-            st.session_state.llm_config = {"temperature": 0.0, "max_tokens": 1000}
+            st.session_state.llm_config = dict(DEFAULT_LLM_CONFIG)
             st.success(get_text("params_reset"))
@@ -4,6 +4,12 @@ Panneau latéral (sidebar) pour configuration et paramètres
 
 import streamlit as st
 from langue.translator import get_text, set_language, get_available_languages
+from infrastructure.cache import cache_manager
+from infrastructure.circuit_breaker import HALF_OPEN, OPEN, db_breaker, llm_breaker
+from infrastructure.jobs import job_manager
+
+# Pastille affichée pour chaque état de disjoncteur
+_CIRCUIT_ICONS = {OPEN: "🔴", HALF_OPEN: "🟡"}
 
 
 def render_sidebar():
@@ -97,10 +103,16 @@ def render_system_info():
     col1, col2 = st.columns(2)
 
     with col1:
-        st.metric("🗄️ DB", "🟢", "OK")
+        render_circuit_metric("🗄️ DB", db_breaker)
 
     with col2:
-        st.metric("🤖 LLM", "🟢", "OK")
+        render_circuit_metric("🤖 LLM", llm_breaker)
+
+    # Pool de génération partagé par les sessions
+    st.caption(get_text("jobs_details", **job_manager.stats()))
+
+    # Métriques du cache SQL
+    render_cache_metrics()
 
     # Bouton de test
     if st.button("🔍 " + get_text("connection_test"), use_container_width=True):
@@ -113,3 +125,47 @@ def render_system_info():
 
     # Version info
     st.caption("v1.0.0 | TextToSQL Streamlit")
+
+
+def render_circuit_metric(label, breaker):
+    """État d'un disjoncteur (fermé, ouvert, en essai)"""
+    state = breaker.state
+    st.metric(
+        label,
+        _CIRCUIT_ICONS.get(state, "🟢"),
+        get_text(f"circuit_{state}"),
+        delta_color="off" if state != OPEN else "inverse",
+    )
+
+
+def render_cache_metrics():
+    """Statistiques du cache SQL (hit rate, taille, latences)"""
+    stats = cache_manager.stats()
+    lookups = stats["hits"] + stats["misses"]
+
+    col1, col2 = st.columns(2)
+
+    with col1:
+        st.metric(
+            get_text("cache_hit_rate"),
+            f"{stats['hit_rate']:.0%}",
+            f"{stats['hits']}/{lookups}",
+            delta_color="off",
+        )
+
+    with col2:
+        st.metric(
+            get_text("cache_entries"),
+            stats["entries"],
+            f"{stats['bytes'] / (1024 * 1024):.1f} MB",
+            delta_color="off",
+        )
+
+    st.caption(
+        get_text(
+            "cache_details",
+            p95=f"{stats['get_latency']['p95_ms']:.2f}",
+            evictions=stats["evictions"],
+            expirations=stats["expirations"] + stats["expired_reclaimed"],
+        )
+    )